@@ -14,12 +14,26 @@
 # You should have received a copy of the GNU General Public License along
 # with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Main application classes for a craft-application."""
+import argparse
+import importlib
+import sys
 from dataclasses import dataclass, field
 from importlib import metadata
-from typing import Optional, Type, final
+from typing import Any, Dict, List, Optional, Sequence, Type, Union, final
+
+import craft_cli
+from craft_cli import (
+    ArgumentParsingError,
+    CraftError,
+    EmitterMode,
+    ProvideHelpException,
+    emit,
+)
 
 from craft_application import models
 
+_VERSION_OPTIONS = ("-V", "--version")
+
 
 @final
 @dataclass(frozen=True)
@@ -34,7 +48,199 @@ class AppMetadata:
     def __post_init__(self) -> None:
         setter = super().__setattr__
         setter("version", metadata.version(self.name))
-        md = metadata.metadata(self.name)
-        print(md)
         if self.summary is None:
+            md = metadata.metadata(self.name)
             setter("summary", md["summary"])
+
+
+@final
+@dataclass(frozen=True)
+class LazyCommand:
+    """A command that is only imported when it is run or its full help is shown.
+
+    The name and help message are enough for the application's help and for
+    choosing the command to run, so the module implementing the command (and
+    everything that module imports) is left alone until it's needed.
+
+    :param name: The command's name on the command line.
+    :param help_msg: The one-line help message for the command.
+    :param import_path: Where the command class is, as ``package.module:Class``.
+    :param common: Whether this is a common command, listed first in the help.
+    :param hidden: Whether to leave this command out of the help.
+    """
+
+    name: str
+    help_msg: str
+    import_path: str
+    common: bool = False
+    hidden: bool = False
+
+    def load(self) -> Type[craft_cli.BaseCommand]:
+        """Import the class implementing this command."""
+        module_name, _, class_name = self.import_path.partition(":")
+        if not module_name or not class_name:
+            raise ValueError(
+                f"Invalid import path for command {self.name!r}: "
+                f"{self.import_path!r} is not in the form 'module:Class'"
+            )
+        command_class = getattr(importlib.import_module(module_name), class_name)
+        if command_class.name != self.name:
+            raise ValueError(
+                f"Command {self.name!r} is imported from {self.import_path!r}, "
+                f"which is the {command_class.name!r} command"
+            )
+        return command_class  # type: ignore[no-any-return]
+
+    def proxy(self) -> Type[craft_cli.BaseCommand]:
+        """Get a command class that imports the real command when instantiated."""
+        lazy_command = self
+
+        class _LazyCommandProxy(craft_cli.BaseCommand):
+            name = lazy_command.name
+            help_msg = lazy_command.help_msg
+            common = lazy_command.common
+            hidden = lazy_command.hidden
+
+            def __init__(self, config: Optional[Dict[str, Any]]) -> None:
+                self._command = lazy_command.load()(config)
+                self.overview = self._command.overview
+                super().__init__(config)
+
+            def fill_parser(self, parser: argparse.ArgumentParser) -> None:
+                self._command.fill_parser(parser)  # type: ignore[arg-type]
+
+            def run(self, parsed_args: argparse.Namespace) -> Optional[int]:
+                return self._command.run(parsed_args)
+
+        _LazyCommandProxy.__qualname__ = f"LazyCommand({self.name!r})"
+        return _LazyCommandProxy
+
+
+CommandType = Union[LazyCommand, Type[craft_cli.BaseCommand]]
+
+
+def _version_requested(dispatcher: craft_cli.Dispatcher, args: List[str]) -> bool:
+    """Determine whether the version option is given before the command name.
+
+    The dispatcher isn't asked, because it would take the option from anywhere
+    in the command line, including the command's own arguments.
+    """
+    takes_value = {
+        option
+        for argument in dispatcher.global_arguments
+        if argument.type == "option"
+        for option in (argument.short_option, argument.long_option)
+        if option is not None
+    }
+    arguments = iter(args)
+    for arg in arguments:
+        if arg in _VERSION_OPTIONS:
+            return True
+        if arg in takes_value:
+            next(arguments, None)
+        elif not arg.startswith("-"):
+            return False
+    return False
+
+
+@final
+@dataclass(frozen=True)
+class CommandGroup:
+    """A group of commands, as shown together in the application's help."""
+
+    name: str
+    commands: Sequence[CommandType]
+
+
+class Application:
+    """Run a craft application's commands.
+
+    Commands may be given either as command classes or as :class:`LazyCommand`
+    objects. Lazy commands are only imported when they're run or when help for
+    that specific command is requested, so ``--version``, ``--help`` and every
+    other command don't pay for importing them.
+
+    Commands are instantiated with a config dictionary containing the
+    application's metadata as ``app``.
+
+    :param app: The application's metadata.
+    :param command_groups: The groups of commands the application has.
+    """
+
+    def __init__(
+        self, app: AppMetadata, command_groups: Sequence[CommandGroup]
+    ) -> None:
+        self.app = app
+        self.command_groups = command_groups
+
+    def _get_dispatcher(self) -> craft_cli.Dispatcher:
+        """Get a dispatcher for this application's commands."""
+        groups = [
+            craft_cli.CommandGroup(
+                group.name,
+                [
+                    command.proxy() if isinstance(command, LazyCommand) else command
+                    for command in group.commands
+                ],
+            )
+            for group in self.command_groups
+        ]
+        return craft_cli.Dispatcher(
+            self.app.name,
+            groups,
+            summary=self.app.summary or "",
+            extra_global_args=[
+                craft_cli.GlobalArgument(
+                    "version",
+                    "flag",
+                    *_VERSION_OPTIONS,
+                    "Show the application version and exit",
+                )
+            ],
+        )
+
+    def run(self, argv: Optional[List[str]] = None) -> int:
+        """Run the command given on the command line.
+
+        :param argv: The command line arguments, without the program name.
+            Defaults to ``sys.argv[1:]``.
+        :returns: The exit code for the application.
+        """
+        args = sys.argv[1:] if argv is None else argv
+        emit.init(
+            EmitterMode.BRIEF,
+            self.app.name,
+            f"Starting {self.app.name}, version {self.app.version}",
+        )
+        dispatcher = self._get_dispatcher()
+        try:
+            if _version_requested(dispatcher, args):
+                emit.message(f"{self.app.name} {self.app.version}")
+                return_code = 0
+            else:
+                dispatcher.pre_parse_args(args)
+                dispatcher.load_command({"app": self.app})
+                return_code = dispatcher.run() or 0
+        except ProvideHelpException as err:
+            print(err, file=sys.stderr)
+            emit.ended_ok()
+            return 0
+        except ArgumentParsingError as err:
+            print(err, file=sys.stderr)
+            emit.ended_ok()
+            return 64  # Command line usage error, as in sysexits.h
+        except KeyboardInterrupt as err:
+            error = CraftError("Interrupted.")
+            error.__cause__ = err
+            emit.error(error)
+            return 130
+        except CraftError as err:
+            emit.error(err)
+            return err.retcode
+        except Exception as err:  # noqa: BLE001
+            error = CraftError(f"{self.app.name} internal error: {err!r}")
+            error.__cause__ = err
+            emit.error(error)
+            return 70  # Internal software error, as in sysexits.h
+        emit.ended_ok()
+        return return_code
@@ -0,0 +1,308 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""An indexed, in-memory catalog of projects.
+
+Rather than looping over every project to answer a query, the catalog keeps
+hash indexes of the projects with each name, effective base, version and part
+plugin. Names, bases and versions are also stored as columns of integer codes,
+so that filtering on a predicate only calls it once per distinct value.
+"""
+from __future__ import annotations
+
+import array
+from collections.abc import Hashable
+from typing import Any, Callable, Iterable, Iterator, Union, cast
+
+from craft_application.models import Project, ProjectHeader, VersionIndex
+
+CatalogEntry = Union[Project, ProjectHeader]
+
+FIELDS = ("name", "effective_base", "version")
+
+
+class _Column:
+    """A dictionary-encoded column of values, with an index of rows by value.
+
+    Each row stores the code of its value, and ``None`` is always code 0. The
+    codes of values that no row has any more are reused for new values.
+    """
+
+    def __init__(self) -> None:
+        self.codes = array.array("L")
+        self.values: list[Any] = [None]
+        self._value_codes: dict[Any, int] = {None: 0}
+        self._free_codes: list[int] = []
+        self.rows: dict[Any, set[int]] = {}
+
+    def set(self, row: int, value: Any) -> None:
+        code = self._value_codes.get(value)
+        if code is None:
+            if self._free_codes:
+                code = self._free_codes.pop()
+                self.values[code] = value
+            else:
+                code = len(self.values)
+                self.values.append(value)
+            self._value_codes[value] = code
+        if row == len(self.codes):
+            self.codes.append(code)
+        else:
+            self.codes[row] = code
+        self.rows.setdefault(value, set()).add(row)
+
+    def clear(self, row: int) -> None:
+        code = self.codes[row]
+        value = self.values[code]
+        rows = self.rows[value]
+        rows.discard(row)
+        if not rows:
+            del self.rows[value]
+            if code:
+                del self._value_codes[value]
+                self.values[code] = None
+                self._free_codes.append(code)
+        self.codes[row] = 0
+
+    def get(self, row: int) -> Any:
+        return self.values[self.codes[row]]
+
+    def matching(self, predicate: Callable[[Any], bool]) -> list[int]:
+        """Get the rows whose values match a predicate, in order."""
+        codes = {self._value_codes[value] for value in self.rows if predicate(value)}
+        if not codes:
+            return []
+        return [row for row, code in enumerate(self.codes) if code in codes]
+
+
+class ProjectCatalog:
+    """An in-memory catalog of projects and project headers.
+
+    Each entry added to the catalog is given a row number, which stays the same
+    until the entry is removed. Row numbers of removed entries are reused.
+
+    Effective bases that aren't hashable (or are missing) are catalogued as
+    ``None``. Plugins are those named by the ``plugin`` key of each part, so
+    project headers have none.
+
+    :param projects: The initial projects and project headers.
+    """
+
+    def __init__(self, projects: Iterable[CatalogEntry] = ()) -> None:
+        self._entries: list[CatalogEntry | None] = []
+        self._free: list[int] = []
+        self._columns = {field: _Column() for field in FIELDS}
+        self._plugins: dict[str, set[int]] = {}
+        self._row_plugins: dict[int, set[str]] = {}
+        self._versions: dict[Any, VersionIndex] = {}
+        self.update(projects)
+
+    def __len__(self) -> int:
+        return len(self._entries) - len(self._free)
+
+    def __iter__(self) -> Iterator[CatalogEntry]:
+        return (entry for entry in self._entries if entry is not None)
+
+    def __contains__(self, row: object) -> bool:
+        return (
+            isinstance(row, int)
+            and 0 <= row < len(self._entries)
+            and self._entries[row] is not None
+        )
+
+    def __getitem__(self, row: int) -> CatalogEntry:
+        entry = self._entries[row] if 0 <= row < len(self._entries) else None
+        if entry is None:
+            raise KeyError(row)
+        return entry
+
+    def add(self, project: CatalogEntry) -> int:
+        """Add a project or project header to the catalog.
+
+        :param project: The project to add.
+        :returns: The project's row number.
+        """
+        if self._free:
+            row = self._free.pop()
+            self._entries[row] = project
+        else:
+            row = len(self._entries)
+            self._entries.append(project)
+
+        name = project.name
+        version = project.version
+        self._columns["name"].set(row, name)
+        self._columns["effective_base"].set(row, _effective_base(project))
+        self._columns["version"].set(row, version)
+        if version is not None:
+            self._versions.setdefault(name, VersionIndex()).add(version)
+
+        plugins = _plugins(project)
+        if plugins:
+            self._row_plugins[row] = plugins
+            for plugin in plugins:
+                self._plugins.setdefault(plugin, set()).add(row)
+        return row
+
+    def update(self, projects: Iterable[CatalogEntry]) -> list[int]:
+        """Add several projects or project headers to the catalog.
+
+        :param projects: The projects to add.
+        :returns: The projects' row numbers.
+        """
+        return [self.add(project) for project in projects]
+
+    def remove(self, row: int) -> CatalogEntry:
+        """Remove an entry from the catalog.
+
+        :param row: The entry's row number.
+        :returns: The removed project or project header.
+        :raises KeyError: If there is no entry in that row.
+        """
+        entry = self[row]
+        name = self._columns["name"].get(row)
+        version = self._columns["version"].get(row)
+        if version is not None:
+            versions = self._versions[name]
+            versions.discard(version)
+            if not versions:
+                del self._versions[name]
+        for column in self._columns.values():
+            column.clear(row)
+        for plugin in self._row_plugins.pop(row, ()):
+            rows = self._plugins[plugin]
+            rows.discard(row)
+            if not rows:
+                del self._plugins[plugin]
+
+        self._entries[row] = None
+        self._free.append(row)
+        return entry
+
+    def find_rows(
+        self,
+        *,
+        name: str | None = None,
+        effective_base: Hashable | None = None,
+        version: str | None = None,
+        plugin: str | None = None,
+    ) -> list[int]:
+        """Find the rows of the entries that have all of the given values.
+
+        Arguments that are ``None`` aren't used to filter the entries.
+
+        :returns: The matching row numbers, sorted.
+        """
+        candidates = [
+            self._columns[field].rows.get(value, set())
+            for field, value in (
+                ("name", name),
+                ("effective_base", effective_base),
+                ("version", version),
+            )
+            if value is not None
+        ]
+        if plugin is not None:
+            candidates.append(self._plugins.get(plugin, set()))
+        if not candidates:
+            return [row for row, entry in enumerate(self._entries) if entry is not None]
+        candidates.sort(key=len)
+        return sorted(candidates[0].intersection(*candidates[1:]))
+
+    def find(
+        self,
+        *,
+        name: str | None = None,
+        effective_base: Hashable | None = None,
+        version: str | None = None,
+        plugin: str | None = None,
+    ) -> list[CatalogEntry]:
+        """Find the entries that have all of the given values.
+
+        Arguments that are ``None`` aren't used to filter the entries.
+
+        :returns: The matching entries, in row order.
+        """
+        rows = self.find_rows(
+            name=name, effective_base=effective_base, version=version, plugin=plugin
+        )
+        return [self._entries[row] for row in rows]  # type: ignore[misc]
+
+    def where(self, field: str, predicate: Callable[[Any], bool]) -> list[CatalogEntry]:
+        """Find the entries whose value of a field matches a predicate.
+
+        The predicate is called once for each distinct value of the field
+        rather than once for each entry, so it mustn't depend on the entry.
+
+        :param field: One of ``name``, ``effective_base`` or ``version``.
+        :param predicate: A function of the field's value.
+        :returns: The matching entries, in row order.
+        """
+        rows = self._column(field).matching(predicate)
+        entries = (self._entries[row] for row in rows)
+        # Removed rows are left with a value of None, which may also match.
+        return [entry for entry in entries if entry is not None]
+
+    def latest(self, name: str) -> CatalogEntry | None:
+        """Get the entry with the newest version of a project.
+
+        Entries without a version are ignored. If several entries have the
+        newest version, the one in the highest row is returned.
+
+        :param name: The project's name.
+        :returns: The newest entry, or None if there is no versioned entry.
+        """
+        versions = self._versions.get(name)
+        if versions is None:
+            return None
+        rows = self.find_rows(name=name, version=versions.latest())
+        return self._entries[rows[-1]]
+
+    def field_values(self, field: str) -> dict[Any, int]:
+        """Get the distinct values of a field and how many entries have each.
+
+        :param field: One of ``name``, ``effective_base``, ``version`` or
+            ``plugin``.
+        :returns: A dictionary mapping each value to the number of entries.
+        """
+        index = self._plugins if field == "plugin" else self._column(field).rows
+        return {value: len(rows) for value, rows in index.items()}
+
+    def _column(self, field: str) -> _Column:
+        try:
+            return self._columns[field]
+        except KeyError:
+            raise ValueError(f"Unknown catalog field: {field!r}") from None
+
+
+def _effective_base(project: CatalogEntry) -> Hashable | None:
+    try:
+        base = project.effective_base
+    except RuntimeError:
+        return None
+    try:
+        hash(base)
+    except TypeError:
+        return None
+    return cast(Hashable, base)
+
+
+def _plugins(project: CatalogEntry) -> set[str]:
+    parts = getattr(project, "parts", None) or {}
+    return {
+        part["plugin"]
+        for part in parts.values()
+        if isinstance(part, dict) and isinstance(part.get("plugin"), str)
+    }
@@ -19,11 +19,16 @@ All errors should inherit from CraftError.
 """
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 import pydantic
 from craft_cli import CraftError
 
 from craft_application.util.error_formatting import format_pydantic_errors
 
+if TYPE_CHECKING:  # pragma: no cover
+    from craft_application.util.yaml import YamlPositions
+
 
 class ProjectFileMissingError(CraftError, FileNotFoundError):
     """Error finding project file."""
@@ -38,13 +43,18 @@ class CraftValidationError(CraftError):
         error: pydantic.ValidationError,
         *,
         file_name: str = "yaml file",
+        positions: YamlPositions | None = None,
         **kwargs: str | bool | int,
     ) -> "CraftValidationError":
         """Convert this error from a pydantic ValidationError.
 
         :param error: The pydantic error to convert
         :param file_name: An optional file name of the malformed yaml file
+        :param positions: The positions of values in the yaml file, recorded by
+            safe_yaml_load, used to annotate each error with its location
         :param kwargs: additional keyword arguments get passed to CraftError
         """
-        message = format_pydantic_errors(error.errors(), file_name=file_name)
+        message = format_pydantic_errors(
+            error.errors(), file_name=file_name, positions=positions
+        )
         return cls(message, **kwargs)  # type: ignore[arg-type]
@@ -0,0 +1,674 @@
+# This file is part of craft_application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""A language server for project files.
+
+The server speaks the Language Server Protocol over stdio and publishes
+validation errors in open project files as diagnostics.
+
+Validation is incremental. A project file is split into blocks, one for each
+top-level key and one for each part, and every block is parsed and validated
+on its own. The results are cached by the block's text, so after an edit only
+the blocks that changed are parsed and validated again, and only the edited
+lines are split into blocks again. Files that can't be split safely, such as
+those using anchors and aliases, are parsed and validated as a whole, as are
+all files for project models whose field validators use the values of other
+fields.
+"""
+from __future__ import annotations
+
+import dataclasses
+import io
+import json
+import re
+import sys
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    NamedTuple,
+)
+
+import pydantic
+import yaml
+from pydantic.error_wrappers import ErrorWrapper
+
+from craft_application import __version__, errors
+from craft_application.models import Project, streaming
+from craft_application.util import YamlPositions, safe_yaml_load
+from craft_application.util.error_formatting import format_pydantic_error
+
+_SEVERITY_ERROR = 1
+_TEXT_DOCUMENT_SYNC_INCREMENTAL = 2
+_METHOD_NOT_FOUND = -32601
+_INTERNAL_ERROR = -32603
+_SERVER_NOT_INITIALIZED = -32002
+_MESSAGE_TYPE_ERROR = 1
+_MAX_UTF16_CODE_UNIT = 0xFFFF
+
+# Documents containing any of these can't be split into independent blocks:
+# directives and document markers, top-level sequences and flow collections,
+# complex keys, and anchors or aliases.
+_UNSPLITTABLE = re.compile(
+    r"^(?:---|\.\.\.|%|[-\[{?])|(?:^|[\s\[{,])[&*][\w-]", re.MULTILINE
+)
+_BLOCK_START = re.compile(r"[^\s#]")
+# Line breaks other than "\n" and "\r\n", which editors count lines by.
+_OTHER_LINE_BREAK = re.compile(r"\r(?!\n)|[\x0b\x0c\x1c-\x1e\x85\u2028\u2029]")
+
+
+class Diagnostic(NamedTuple):
+    """A problem in a document, at a 0-based line and column."""
+
+    line: int
+    column: int
+    message: str
+
+    def moved(self, lines: int, columns: int = 0) -> Diagnostic:
+        """Get this diagnostic, moved by some lines and columns."""
+        return Diagnostic(self.line + lines, self.column + columns, self.message)
+
+
+@dataclasses.dataclass(frozen=True)
+class _Block:
+    """Some consecutive lines of a document, dedented by ``indent`` columns.
+
+    The kind is ``top-level`` for a top-level key, ``parts`` for the lines of
+    the ``parts`` key before its first part, or ``part`` for a part.
+    """
+
+    start: int
+    indent: int
+    text: str
+    kind: str = "top-level"
+
+
+@dataclasses.dataclass(frozen=True)
+class _BlockResult:
+    """The result of parsing and validating a block."""
+
+    values: dict[str, Any]
+    keys: list[str]
+    diagnostics: list[Diagnostic]
+    parsed: bool = True
+
+
+class ProjectDocument:
+    """An open project file and the result of validating it.
+
+    :param text: The initial content of the file.
+    :param project_class: The project model to validate the file with.
+    """
+
+    def __init__(self, text: str, project_class: type[Project] = Project) -> None:
+        self.text = text
+        self.project_class = project_class
+        self.project: Project | None = None
+        self._results: dict[tuple[str, str], _BlockResult] = {}
+        # The blocks of the last version validated, how many lines it had, and
+        # the lines edited since: (start, end before the edits, end after).
+        self._layout: list[_Block] | None = None
+        self._line_count = 0
+        self._edited: tuple[int, int, int] | None = None
+        self._fields = {
+            field.alias: field for field in project_class.__fields__.values()
+        }
+        if project_class.__config__.allow_population_by_field_name:
+            for field in project_class.__fields__.values():
+                self._fields.setdefault(field.name, field)
+        names = list(project_class.__fields__)
+        self._order = {
+            key: names.index(field.name) for key, field in self._fields.items()
+        }
+        self._parts_field = project_class.__fields__["parts"]
+        self._has_root_validators = bool(
+            project_class.__pre_root_validators__
+            or project_class.__post_root_validators__
+        )
+        self._uses_values = streaming.uses_values(project_class)
+
+    def apply_change(self, change: dict[str, Any]) -> None:
+        """Apply an LSP content change event to the document.
+
+        :param change: A ``TextDocumentContentChangeEvent``, either replacing a
+            range of the document or the whole document.
+        """
+        if "range" not in change:
+            self.text = change["text"]
+            self._layout = None
+            return
+        start = self._offset(change["range"]["start"])
+        end = self._offset(change["range"]["end"])
+        removed = self.text.count("\n", start, end)
+        self.text = self.text[:start] + change["text"] + self.text[end:]
+        line = change["range"]["start"]["line"]
+        self._mark_edited(
+            line, line + removed + 1, line + change["text"].count("\n") + 1
+        )
+
+    def validate(self) -> list[Diagnostic]:
+        """Validate the document, reusing the results for unchanged blocks.
+
+        If the document is valid, :attr:`project` is set to the project it
+        describes.
+
+        :returns: The problems found in the document.
+        """
+        results: dict[tuple[str, str], _BlockResult] = {}
+        values: dict[str, Any] = {}
+        diagnostics: list[Diagnostic] = []
+
+        def add(kind: str, block: _Block, seen: set[str]) -> dict[str, Any]:
+            key = (kind, block.text)
+            result = self._results.get(key) or self._check(kind, block.text)
+            results[key] = result
+            diagnostics.extend(
+                diagnostic.moved(block.start, block.indent)
+                for diagnostic in result.diagnostics
+            )
+            for name in result.keys:
+                check_duplicate(name, block, seen)
+            return result.values
+
+        def check_duplicate(name: str, block: _Block, seen: set[str]) -> None:
+            if name in seen:
+                message = f"found duplicate key {name!r}"
+                diagnostics.append(Diagnostic(block.start, block.indent, message))
+            seen.add(name)
+
+        lines = self.text.splitlines(keepends=True)
+        blocks = None if self._uses_values else self._split(lines)
+        self._layout, self._line_count, self._edited = blocks, len(lines), None
+        seen_keys: set[str] = set()
+        seen_parts: set[str] = set()
+        if blocks is None:
+            values.update(add("document", _Block(0, 0, self.text), seen_keys))
+        for block in blocks or []:
+            if block.kind == "parts":
+                check_duplicate(self._parts_field.alias, block, seen_keys)
+                values["parts"] = {}
+            elif block.kind == "part":
+                values["parts"].update(add("part", block, seen_parts).get("parts", {}))
+            else:
+                values.update(add("top-level", block, seen_keys))
+
+        # Only keep the results that are still in use.
+        self._results = results
+        if all(result.parsed for result in results.values()):
+            diagnostics.extend(self._check_required(seen_keys))
+        if not diagnostics and self._has_root_validators:
+            diagnostics.extend(self._check_root(values))
+
+        self.project = None
+        if not diagnostics:
+            self.project = self.project_class.construct(**values)
+        return sorted(diagnostics)
+
+    def _mark_edited(self, start: int, end: int, new_end: int) -> None:
+        """Record that the lines from ``start`` to ``end`` were replaced.
+
+        :param new_end: The end of the lines that replaced them.
+        """
+        if self._edited is not None:
+            edited_start, edited_end, edited_new_end = self._edited
+            # Join the edits, taking the end back to the last version validated.
+            joined_end = max(end, edited_new_end)
+            new_end = joined_end + new_end - end
+            end = joined_end - (edited_new_end - edited_end)
+            start = min(start, edited_start)
+        self._edited = (start, end, new_end)
+
+    def _split(self, lines: list[str]) -> list[_Block] | None:
+        """Split the document into blocks for its top-level keys and parts.
+
+        Only the edited lines are split again if the last version validated
+        could be split.
+        """
+        if self._layout is not None and self._edited is None:
+            return self._layout
+        if self._layout is not None and self._edited is not None:
+            blocks = self._split_edited(lines, self._layout, self._edited)
+            if blocks is not None:
+                return blocks
+        blocks = _split_document(self.text)
+        if blocks is None:
+            return None
+        return [part for block in blocks for part in self._split_parts(block)]
+
+    def _split_edited(
+        self, lines: list[str], layout: list[_Block], edited: tuple[int, int, int]
+    ) -> list[_Block] | None:
+        """Split the edited lines, reusing the blocks of the last version.
+
+        :param layout: The blocks of the last version validated.
+        :param edited: The lines edited since, as recorded by ``_mark_edited``.
+        :returns: The blocks, or None if the edit changed how the document is
+            split outside the edited blocks.
+        """
+        start, end, new_end = edited
+        if not layout or start < layout[0].start:
+            return None
+        first = max(i for i, block in enumerate(layout) if block.start <= start)
+        last = max(i for i, block in enumerate(layout) if block.start < end)
+        kinds = {block.kind for block in layout[first : last + 1]}
+        if len(kinds) != 1 or "parts" in kinds:
+            return None
+
+        shift = new_end - end
+        region_start = layout[first].start
+        region_end = len(lines)
+        if last + 1 < len(layout):
+            following = layout[last + 1]
+            region_end = following.start + shift
+            # Check that the lines after the edit are still where they were.
+            lines_after = self._line_count - following.start
+            if len(lines) - region_end != lines_after or not following.text.startswith(
+                lines[region_end][following.indent :]
+            ):
+                return None
+        text = "".join(lines[region_start:region_end])
+        if not text or _UNSPLITTABLE.search(text) or _OTHER_LINE_BREAK.search(text):
+            return None
+
+        blocks: list[_Block] | None
+        if "part" in kinds:
+            indent = layout[first].indent
+            blocks = _split_indented(
+                lines[region_start:region_end], region_start, indent
+            )
+        elif _BLOCK_START.match(text):
+            top_level = _split_document(text, region_start) or []
+            blocks = [part for block in top_level for part in self._split_parts(block)]
+        else:
+            blocks = None
+        if not blocks or blocks[0].start != region_start:
+            return None
+        following_blocks = layout[last + 1 :]
+        if shift:
+            following_blocks = [
+                _Block(block.start + shift, block.indent, block.text, block.kind)
+                for block in following_blocks
+            ]
+        return [*layout[:first], *blocks, *following_blocks]
+
+    def _split_parts(self, block: _Block) -> list[_Block]:
+        """Split a ``parts`` block into its first lines and a block for each part.
+
+        :returns: The blocks, or just the block itself if it isn't a ``parts``
+            block that can be split.
+        """
+        lines = block.text.splitlines(keepends=True)
+        header = lines[0].split("#", 1)[0].rstrip()
+        if header != f"{self._parts_field.alias}:":
+            return [block]
+        parts = _split_indented(lines[1:], block.start + 1)
+        if not parts:
+            return [block]
+        length = parts[0].start - block.start
+        return [
+            _Block(block.start, 0, "".join(lines[:length]), "parts"),
+            *parts,
+        ]
+
+    def _check(self, kind: str, text: str) -> _BlockResult:
+        """Parse and validate a block."""
+        positions = YamlPositions()
+        try:
+            data = safe_yaml_load(io.StringIO(text), positions=positions)
+        except yaml.MarkedYAMLError as exc:
+            mark = exc.problem_mark or exc.context_mark
+            line, column = (mark.line, mark.column) if mark else (0, 0)
+            message = f"{exc.context or ''} {exc.problem or ''}".strip()
+            return _BlockResult(
+                {}, [], [Diagnostic(line, column, message)], parsed=False
+            )
+        except (yaml.YAMLError, errors.CraftValidationError) as exc:
+            return _BlockResult({}, [], [Diagnostic(0, 0, str(exc))], parsed=False)
+        if not isinstance(data, dict):
+            message = "Project data is not a dictionary"
+            return _BlockResult({}, [], [Diagnostic(0, 0, message)], parsed=False)
+
+        if kind == "part":
+            data = {self._parts_field.alias: data}
+            return self._validate(data, positions, ("parts",), list(data["parts"]))
+        return self._validate(data, positions, (), [str(key) for key in data])
+
+    def _validate(
+        self,
+        data: dict[str, Any],
+        positions: YamlPositions,
+        strip: tuple[str, ...],
+        keys: list[str],
+    ) -> _BlockResult:
+        """Validate each top-level field of some project data.
+
+        Fields are validated in the order the model declares them, each with
+        the values of the fields validated before it, as pydantic does.
+
+        :param strip: A prefix of error locations that isn't in ``positions``.
+        """
+        values: dict[str, Any] = {}
+        wrappers: list[ErrorWrapper] = []
+        for key, value in sorted(
+            data.items(), key=lambda item: self._order.get(item[0], len(self._order))
+        ):
+            field = self._fields.get(key)
+            if field is None:
+                if (
+                    not isinstance(key, str)
+                    or self.project_class.__config__.extra == pydantic.Extra.forbid
+                ):
+                    wrappers.append(
+                        ErrorWrapper(pydantic.errors.ExtraError(), loc=str(key))
+                    )
+                else:
+                    values[key] = value
+                continue
+            validated, error = field.validate(
+                value, values, loc=field.alias, cls=self.project_class
+            )
+            if error:
+                wrappers.append(error)  # type: ignore[arg-type]
+            else:
+                values[field.name] = validated
+
+        diagnostics = []
+        if wrappers:
+            exc = pydantic.ValidationError(wrappers, self.project_class)
+            for error_dict in exc.errors():
+                loc = error_dict["loc"][len(strip) :]
+                line, column = positions.find(loc) or (1, 1)
+                message = format_pydantic_error(error_dict["loc"], error_dict["msg"])
+                diagnostics.append(Diagnostic(line - 1, column - 1, message[2:]))
+        return _BlockResult(values, keys, diagnostics)
+
+    def _check_required(self, keys: set[str]) -> list[Diagnostic]:
+        """Check that the document has every required field.
+
+        :param keys: The top-level keys in the document.
+        """
+        return [
+            Diagnostic(0, 0, format_pydantic_error([field.alias], "field required")[2:])
+            for field in self.project_class.__fields__.values()
+            if field.required and not keys & {field.alias, field.name}
+        ]
+
+    def _check_root(self, values: dict[str, Any]) -> list[Diagnostic]:
+        """Run root validators, which need the whole project."""
+        try:
+            self.project_class(**values)
+        except pydantic.ValidationError as exc:
+            return [
+                Diagnostic(0, 0, format_pydantic_error(error["loc"], error["msg"])[2:])
+                for error in exc.errors()
+            ]
+        return []
+
+    def _offset(self, position: dict[str, int]) -> int:
+        """Convert an LSP position to an offset in the text."""
+        lines = self.text.split("\n", position["line"])
+        if len(lines) <= position["line"]:
+            return len(self.text)
+        offset = len(self.text) - len(lines[-1])
+        end = self.text.find("\n", offset)
+        line = self.text[offset : end if end != -1 else len(self.text)]
+        return offset + _utf16_to_index(line, position["character"])
+
+
+def _split_document(text: str, start: int = 0) -> list[_Block] | None:
+    """Split a document into a block for each top-level key.
+
+    :param start: The line that the text starts at.
+    """
+    if _UNSPLITTABLE.search(text) or _OTHER_LINE_BREAK.search(text):
+        return None
+    lines = text.splitlines(keepends=True)
+    starts: list[int] = []
+    for index, line in enumerate(lines):
+        if _BLOCK_START.match(line):
+            starts.append(index)
+        elif not starts and line.strip() and not line.lstrip().startswith("#"):
+            # Indented content before the first key.
+            return None
+    return [
+        _Block(start + first, 0, "".join(lines[first:end]))
+        for first, end in zip(starts, [*starts[1:], len(lines)])
+    ]
+
+
+def _split_indented(
+    lines: list[str], start: int, indent: int = 0
+) -> list[_Block] | None:
+    """Split lines into a block for each key indented by ``indent`` columns.
+
+    :param start: The line that the lines start at.
+    :param indent: The indentation of the keys, or 0 to use that of the first.
+    :returns: The blocks, dedented, or None if a line is indented less than
+        the keys or with a tab.
+    """
+    starts: list[int] = []
+    dedented: list[str] = []
+    for index, line in enumerate(lines):
+        content = line.lstrip(" ")
+        if not content.strip() or content.startswith("#"):
+            dedented.append(content)
+            continue
+        leading = len(line) - len(content)
+        indent = indent or leading
+        if leading < indent or content.startswith("\t"):
+            return None
+        if leading == indent:
+            starts.append(index)
+        dedented.append(line[indent:])
+    return [
+        _Block(start + first, indent, "".join(dedented[first:end]), "part")
+        for first, end in zip(starts, [*starts[1:], len(lines)])
+    ]
+
+
+def _utf16_to_index(line: str, units: int) -> int:
+    """Convert a UTF-16 offset, as used by LSP, into an index in a string."""
+    if line.isascii():
+        return min(units, len(line))
+    count = 0
+    for index, character in enumerate(line):
+        if count >= units:
+            return index
+        count += 2 if ord(character) > _MAX_UTF16_CODE_UNIT else 1
+    return len(line)
+
+
+def _index_to_utf16(line: str, index: int) -> int:
+    """Convert an index in a string into a UTF-16 offset."""
+    if line.isascii():
+        return index
+    return len(line[:index].encode("utf-16-le")) // 2
+
+
+class LanguageServer:
+    """A language server for project files, using JSON-RPC over streams.
+
+    :param project_class: The project model to validate files with.
+    :param reader: The stream to read messages from, usually stdin.
+    :param writer: The stream to write messages to, usually stdout.
+    """
+
+    def __init__(
+        self,
+        project_class: type[Project] = Project,
+        *,
+        reader: BinaryIO,
+        writer: BinaryIO,
+    ) -> None:
+        self.project_class = project_class
+        self.documents: dict[str, ProjectDocument] = {}
+        self._reader = reader
+        self._writer = writer
+        self._initialized = False
+        self._shutdown = False
+        self._handlers: dict[str, Callable[[dict[str, Any]], Any]] = {
+            "initialize": self._initialize,
+            "shutdown": self._shutdown_request,
+            "textDocument/didOpen": self._did_open,
+            "textDocument/didChange": self._did_change,
+            "textDocument/didClose": self._did_close,
+        }
+
+    def serve(self) -> int:
+        """Handle messages until the client exits.
+
+        :returns: The exit code: 0 if the client shut the server down first.
+        """
+        while True:
+            message = self._read()
+            if message is None or message.get("method") == "exit":
+                return 0 if self._shutdown else 1
+            self.handle(message)
+
+    def handle(self, message: dict[str, Any]) -> None:
+        """Handle a single request or notification."""
+        method = message.get("method", "")
+        handler = self._handlers.get(method)
+        is_request = "id" in message
+        if not self._initialized and method != "initialize":
+            if is_request:
+                self._respond_error(
+                    message["id"], _SERVER_NOT_INITIALIZED, "Server not initialized"
+                )
+            return
+        if handler is None:
+            if is_request:
+                self._respond_error(
+                    message["id"], _METHOD_NOT_FOUND, f"Unknown method {method!r}"
+                )
+            return
+        try:
+            result = handler(message.get("params") or {})
+        except Exception as exc:  # noqa: BLE001 (a bad message mustn't stop the server)
+            error = f"Error handling {method!r}: {exc!r}"
+            if is_request:
+                self._respond_error(message["id"], _INTERNAL_ERROR, error)
+            else:
+                self._notify(
+                    "window/logMessage",
+                    {"type": _MESSAGE_TYPE_ERROR, "message": error},
+                )
+            return
+        if is_request:
+            self._send({"jsonrpc": "2.0", "id": message["id"], "result": result})
+
+    def _initialize(self, _params: dict[str, Any]) -> dict[str, Any]:
+        self._initialized = True
+        return {
+            "capabilities": {
+                "textDocumentSync": {
+                    "openClose": True,
+                    "change": _TEXT_DOCUMENT_SYNC_INCREMENTAL,
+                }
+            },
+            "serverInfo": {"name": "craft-application", "version": __version__},
+        }
+
+    def _shutdown_request(self, _params: dict[str, Any]) -> None:
+        self._shutdown = True
+
+    def _did_open(self, params: dict[str, Any]) -> None:
+        item = params["textDocument"]
+        document = ProjectDocument(item["text"], self.project_class)
+        self.documents[item["uri"]] = document
+        self._publish(item["uri"], document, item.get("version"))
+
+    def _did_change(self, params: dict[str, Any]) -> None:
+        item = params["textDocument"]
+        document = self.documents[item["uri"]]
+        for change in params["contentChanges"]:
+            document.apply_change(change)
+        self._publish(item["uri"], document, item.get("version"))
+
+    def _did_close(self, params: dict[str, Any]) -> None:
+        uri = params["textDocument"]["uri"]
+        self.documents.pop(uri, None)
+        self._notify("textDocument/publishDiagnostics", {"uri": uri, "diagnostics": []})
+
+    def _publish(
+        self, uri: str, document: ProjectDocument, version: int | None
+    ) -> None:
+        lines = document.text.splitlines()
+        diagnostics = []
+        for diagnostic in document.validate():
+            line = lines[diagnostic.line] if diagnostic.line < len(lines) else ""
+            start = _index_to_utf16(line, diagnostic.column)
+            end = max(_index_to_utf16(line, len(line)), start)
+            diagnostics.append(
+                {
+                    "range": {
+                        "start": {"line": diagnostic.line, "character": start},
+                        "end": {"line": diagnostic.line, "character": end},
+                    },
+                    "severity": _SEVERITY_ERROR,
+                    "source": "craft-application",
+                    "message": diagnostic.message,
+                }
+            )
+        params: dict[str, Any] = {"uri": uri, "diagnostics": diagnostics}
+        if version is not None:
+            params["version"] = version
+        self._notify("textDocument/publishDiagnostics", params)
+
+    def _notify(self, method: str, params: dict[str, Any]) -> None:
+        self._send({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def _respond_error(self, message_id: Any, code: int, message: str) -> None:
+        error = {"code": code, "message": message}
+        self._send({"jsonrpc": "2.0", "id": message_id, "error": error})
+
+    def _read(self) -> dict[str, Any] | None:
+        """Read a message, or return None at the end of the stream."""
+        length = None
+        while True:
+            header = self._reader.readline()
+            if not header:
+                return None
+            header = header.strip()
+            if not header:
+                break
+            name, _, value = header.decode("ascii").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value.strip())
+        if length is None:
+            return None
+        return json.loads(self._reader.read(length).decode("utf-8"))  # type: ignore[no-any-return]
+
+    def _send(self, message: dict[str, Any]) -> None:
+        body = json.dumps(message, separators=(",", ":")).encode("utf-8")
+        self._writer.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii"))
+        self._writer.write(body)
+        self._writer.flush()
+
+
+def main(project_class: type[Project] = Project) -> int:
+    """Run a language server on stdio.
+
+    :param project_class: The project model to validate files with.
+    :returns: The exit code.
+    """
+    server = LanguageServer(
+        project_class, reader=sys.stdin.buffer, writer=sys.stdout.buffer
+    )
+    return server.serve()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    sys.exit(main())
@@ -0,0 +1,312 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""An SQLite-backed index of metadata files.
+
+Metadata files are written into every build output. Rather than globbing and
+parsing all of them to answer a query, the index stores each file's top-level
+fields in an SQLite database and only re-reads files that have changed.
+"""
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import io
+import json
+import pathlib
+import sqlite3
+from typing import Any, Generic, Iterable, Iterator, Mapping, TypeVar
+
+import pydantic
+import yaml
+
+from craft_application import errors
+from craft_application.models import BaseMetadata
+from craft_application.util import safe_yaml_load
+
+_MetadataType = TypeVar("_MetadataType", bound=BaseMetadata)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fields (
+    file_id INTEGER NOT NULL REFERENCES files (id) ON DELETE CASCADE,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (file_id, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS fields_by_value ON fields (key, value);
+"""
+
+
+@dataclasses.dataclass
+class IndexUpdate:
+    """The result of updating a metadata index.
+
+    Each attribute is a list of the paths that had that outcome.
+    """
+
+    added: list[pathlib.Path] = dataclasses.field(default_factory=list)
+    updated: list[pathlib.Path] = dataclasses.field(default_factory=list)
+    unchanged: list[pathlib.Path] = dataclasses.field(default_factory=list)
+    removed: list[pathlib.Path] = dataclasses.field(default_factory=list)
+    failed: dict[pathlib.Path, str] = dataclasses.field(default_factory=dict)
+
+
+class MetadataIndex(Generic[_MetadataType]):
+    """An index of metadata files stored in an SQLite database.
+
+    Files are only re-read if their modification time or size changed, and
+    only re-parsed if their content hash changed.
+
+    :param database: The path to the database file, or ``":memory:"``.
+    :param metadata_class: The metadata model to validate and export files as.
+    """
+
+    def __init__(
+        self,
+        database: pathlib.Path | str,
+        metadata_class: type[_MetadataType] = BaseMetadata,  # type: ignore[assignment]
+    ) -> None:
+        self._metadata_class = metadata_class
+        self._connection = sqlite3.connect(str(database))
+        self._connection.execute("PRAGMA foreign_keys = ON")
+        self._connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> MetadataIndex[_MetadataType]:
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        (count,) = self._connection.execute("SELECT count(*) FROM files").fetchone()
+        return int(count)
+
+    def close(self) -> None:
+        """Close the underlying database."""
+        self._connection.close()
+
+    def update(self, paths: Iterable[pathlib.Path]) -> IndexUpdate:
+        """Add or refresh metadata files in the index.
+
+        Files that cannot be read or validated are recorded as failed and
+        removed from the index.
+
+        :param paths: The metadata files to index.
+        :returns: A summary of the changes made to the index.
+        """
+        result = IndexUpdate()
+        with self._connection:
+            for path in paths:
+                self._update_file(path.resolve(), result)
+        return result
+
+    def update_directory(
+        self, directory: pathlib.Path, pattern: str = "**/*.yaml"
+    ) -> IndexUpdate:
+        """Synchronise the index with the metadata files in a directory.
+
+        Indexed files inside the directory that no longer match the pattern are
+        removed from the index.
+
+        :param directory: The directory to search.
+        :param pattern: A glob pattern for metadata files within the directory.
+        :returns: A summary of the changes made to the index.
+        """
+        directory = directory.resolve()
+        paths = sorted(path for path in directory.glob(pattern) if path.is_file())
+        result = self.update(paths)
+
+        current = {str(path.resolve()) for path in paths}
+        prefix = str(directory / "")
+        stale = [
+            path
+            for (path,) in self._connection.execute(
+                "SELECT path FROM files WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix),
+            )
+            if path not in current
+        ]
+        result.removed.extend(self.remove(pathlib.Path(path) for path in stale))
+        return result
+
+    def remove(self, paths: Iterable[pathlib.Path]) -> list[pathlib.Path]:
+        """Remove files from the index.
+
+        :param paths: The metadata files to remove.
+        :returns: The paths that were in the index.
+        """
+        removed = []
+        with self._connection:
+            for path in paths:
+                cursor = self._connection.execute(
+                    "DELETE FROM files WHERE path = ?", (str(path.resolve()),)
+                )
+                if cursor.rowcount:
+                    removed.append(path)
+        return removed
+
+    def find(self, fields: Mapping[str, Any]) -> list[pathlib.Path]:
+        """Find the metadata files whose top-level fields have the given values.
+
+        :param fields: Field names, as written in the files, and the values
+            they must be equal to.
+        :returns: The matching file paths, sorted.
+        """
+        conditions = ["1"]
+        parameters: list[str] = []
+        for key, value in fields.items():
+            conditions.append(
+                "id IN (SELECT file_id FROM fields WHERE key = ? AND value = ?)"
+            )
+            parameters.extend((key, _encode(value)))
+        rows = self._connection.execute(
+            f"SELECT path FROM files WHERE {' AND '.join(conditions)} ORDER BY path",
+            parameters,
+        )
+        return [pathlib.Path(path) for (path,) in rows]
+
+    def field_values(self, field: str) -> dict[Any, int]:
+        """Get the distinct values of a top-level field and how often they appear.
+
+        :param field: The name of the field, as written in the files.
+        :returns: A dictionary mapping each value to the number of files with it.
+        """
+        rows = self._connection.execute(
+            "SELECT value, count(*) FROM fields WHERE key = ? GROUP BY value",
+            (field,),
+        )
+        return {_decode_key(value): count for value, count in rows}
+
+    def export(
+        self, paths: Iterable[pathlib.Path] | None = None
+    ) -> Iterator[tuple[pathlib.Path, _MetadataType]]:
+        """Load indexed metadata without reading the original files.
+
+        :param paths: The files to export. Defaults to every indexed file.
+        :returns: An iterator of each file's path and its metadata.
+        """
+        if paths is None:
+            rows: Iterable[tuple[str, str]] = self._connection.execute(
+                "SELECT path, data FROM files ORDER BY path"
+            ).fetchall()
+        else:
+            rows = [
+                row
+                for path in paths
+                for row in self._connection.execute(
+                    "SELECT path, data FROM files WHERE path = ?",
+                    (str(path.resolve()),),
+                )
+            ]
+        for path, data in rows:
+            yield pathlib.Path(path), self._metadata_class.unmarshal(json.loads(data))
+
+    def _update_file(self, path: pathlib.Path, result: IndexUpdate) -> None:
+        row = self._connection.execute(
+            "SELECT id, mtime_ns, size, sha256 FROM files WHERE path = ?", (str(path),)
+        ).fetchone()
+        try:
+            stat = path.stat()
+            if row and (row[1], row[2]) == (stat.st_mtime_ns, stat.st_size):
+                result.unchanged.append(path)
+                return
+            content = path.read_bytes()
+        except OSError as exc:
+            self._record_failure(path, str(exc), result)
+            return
+
+        digest = hashlib.sha256(content).hexdigest()
+        if row and row[3] == digest:
+            self._connection.execute(
+                "UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                (stat.st_mtime_ns, stat.st_size, row[0]),
+            )
+            result.unchanged.append(path)
+            return
+
+        try:
+            data = self._load(path, content)
+        except (
+            errors.CraftValidationError,
+            yaml.YAMLError,
+            TypeError,
+            UnicodeDecodeError,
+        ) as exc:
+            self._record_failure(path, str(exc), result)
+            return
+
+        if row:
+            self._connection.execute(
+                "UPDATE files SET mtime_ns = ?, size = ?, sha256 = ?, data = ? "
+                "WHERE id = ?",
+                (stat.st_mtime_ns, stat.st_size, digest, _encode(data), row[0]),
+            )
+            self._connection.execute("DELETE FROM fields WHERE file_id = ?", (row[0],))
+            file_id = row[0]
+            result.updated.append(path)
+        else:
+            cursor = self._connection.execute(
+                "INSERT INTO files (path, mtime_ns, size, sha256, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (str(path), stat.st_mtime_ns, stat.st_size, digest, _encode(data)),
+            )
+            file_id = cursor.lastrowid
+            result.added.append(path)
+        self._connection.executemany(
+            "INSERT INTO fields (file_id, key, value) VALUES (?, ?, ?)",
+            ((file_id, key, _encode(value)) for key, value in data.items()),
+        )
+
+    def _load(self, path: pathlib.Path, content: bytes) -> dict[str, Any]:
+        """Parse and validate a metadata file's content."""
+        data = safe_yaml_load(io.StringIO(content.decode()))
+        try:
+            metadata = self._metadata_class.unmarshal(data)
+        except pydantic.ValidationError as err:
+            raise errors.CraftValidationError.from_pydantic(
+                err, file_name=path.name
+            ) from err
+        return metadata.marshal()
+
+    def _record_failure(
+        self, path: pathlib.Path, message: str, result: IndexUpdate
+    ) -> None:
+        self._connection.execute("DELETE FROM files WHERE path = ?", (str(path),))
+        result.failed[path] = message
+
+
+def _encode(value: Any) -> str:
+    """Encode a value as canonical JSON.
+
+    Values that JSON can't represent, such as YAML timestamps, are stored as
+    strings.
+    """
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _decode_key(value: str) -> Any:
+    """Decode a JSON value, converting containers to hashable types."""
+    decoded = json.loads(value)
+    if isinstance(decoded, (dict, list)):
+        return value
+    return decoded
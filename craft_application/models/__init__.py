@@ -17,6 +17,7 @@
 
 from craft_application.models.base import CraftBaseConfig, CraftBaseModel
 from craft_application.models.constraints import (
+    BulkValidation,
     ProjectName,
     ProjectTitle,
     SummaryStr,
@@ -24,17 +25,21 @@ from craft_application.models.constraints import (
     VersionStr,
 )
 from craft_application.models.metadata import BaseMetadata
-from craft_application.models.project import Project
+from craft_application.models.project import Project, ProjectHeader
+from craft_application.models.versions import VersionIndex
 
 
 __all__ = [
     "BaseMetadata",
+    "BulkValidation",
     "CraftBaseConfig",
     "CraftBaseModel",
     "Project",
+    "ProjectHeader",
     "ProjectName",
     "ProjectTitle",
     "SummaryStr",
     "UniqueStrList",
+    "VersionIndex",
     "VersionStr",
 ]
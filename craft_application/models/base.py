@@ -16,16 +16,51 @@
 """Base pydantic model for *craft applications."""
 from __future__ import annotations
 
+import builtins
+import contextlib
+import functools
+import io
+import json
 import pathlib
-from typing import Any, TypeVar
+from collections.abc import Collection, Mapping
+from typing import TYPE_CHECKING, Any, NamedTuple, TypeVar, cast
 
 import pydantic
 import yaml
 
 from craft_application import errors
-from craft_application.util import safe_yaml_load
+from craft_application.models import streaming
+from craft_application.models.compiler import compile_validator
+from craft_application.util import (
+    YamlPositions,
+    freeze,
+    looks_like_json,
+    safe_json_load,
+    safe_yaml_load,
+    safe_yaml_load_items,
+    thaw,
+)
 
 _ModelType = TypeVar("_ModelType", bound="CraftBaseModel")
+_FrozenModelType = TypeVar("_FrozenModelType", bound="_FrozenModel")
+
+
+class _LoadOptions(NamedTuple):
+    """How to validate a model loaded from a file.
+
+    ``validated`` holds already validated items of dictionary fields, by field
+    name, to add to the ones in the file; models with validators that use other
+    fields' values validate them again along with the rest of their data, so
+    these may be unvalidated for such models. ``lazy`` holds the names of
+    dictionary fields whose items are only validated once they are used (see
+    :class:`streaming.LazyItems`); models that can't be validated from a stream
+    validate every item at once.
+    """
+
+    fail_fast: bool = False
+    error_positions: bool = False
+    validated: Mapping[str, Mapping[str, Any]] | None = None
+    lazy: Collection[str] = ()
 
 
 def _alias_generator(s: str) -> str:
@@ -47,6 +82,33 @@ class CraftBaseModel(pydantic.BaseModel):
 
     Config = CraftBaseConfig
 
+    @classmethod
+    def frozen_class(cls: type[_ModelType]) -> type[_ModelType]:
+        """Get the frozen variant of this model class.
+
+        The frozen variant is a subclass of this class whose instances can't be
+        modified, and whose field values are converted to immutable containers
+        (see :func:`craft_application.util.freeze`). This makes them hashable,
+        so they can be used as dictionary keys, in ``functools.lru_cache``, and
+        shared between threads.
+        """
+        return _frozen_class(cls)
+
+    def freeze(self: _ModelType) -> _ModelType:
+        """Get a frozen copy of this model.
+
+        The copy is not validated again, as its values were already validated.
+        """
+        frozen_class = _frozen_class(type(self))
+        return frozen_class.construct(
+            set(self.__fields_set__),
+            **{name: freeze(value) for name, value in self.__dict__.items()},
+        )
+
+    def thaw(self: _ModelType) -> _ModelType:
+        """Get a mutable version of this model, or the model itself if mutable."""
+        return self
+
     def marshal(self) -> dict[str, str | list[str] | dict[str, Any]]:
         """Convert to a dictionary."""
         return self.dict(by_alias=True, exclude_unset=True)
@@ -56,7 +118,8 @@ class CraftBaseModel(pydantic.BaseModel):
         """Create and populate a new model object from dictionary data.
 
         The unmarshal method validates entries in the input dictionary, populating
-        the corresponding fields in the data object.
+        the corresponding fields in the data object. Validation uses a validator
+        compiled for this class, which gives the same results as pydantic.
         :param data: The dictionary data to unmarshal.
         :return: The newly created object.
         :raise TypeError: If data is not a dictionary.
@@ -64,19 +127,276 @@ class CraftBaseModel(pydantic.BaseModel):
         if not isinstance(data, dict):
             raise TypeError("Project data is not a dictionary")
 
-        return cls(**data)
+        return compile_validator(cls)(data)
 
     @classmethod
-    def from_yaml_file(cls: type[_ModelType], path: pathlib.Path) -> _ModelType:
-        """Instantiate this model from a YAML file."""
-        with path.open() as file:
-            data = safe_yaml_load(file)
+    def from_yaml_file(
+        cls: type[_ModelType],
+        path: pathlib.Path,
+        *,
+        fail_fast: bool = False,
+        error_positions: bool = False,
+    ) -> _ModelType:
+        """Instantiate this model from a YAML file.
+
+        Each top-level field, and each item of a dictionary field such as
+        ``parts``, is validated as soon as it has been parsed rather than once
+        the whole file has been parsed.
+
+        Files containing a JSON object are parsed as JSON, which is much faster
+        and gives the same result.
+
+        :param path: The YAML file to read.
+        :param fail_fast: Whether to stop reading the file at the first
+            validation error. Otherwise the whole file is read and validated,
+            and every error is reported.
+        :param error_positions: Whether to annotate validation errors with
+            their line and column in the file. Positions are only recorded
+            while parsing if this is set.
+        :returns: The validated model.
+        :raises TypeError: If the file doesn't contain a dictionary.
+        :raises CraftValidationError: If the file isn't valid.
+        """
+        options = _LoadOptions(fail_fast=fail_fast, error_positions=error_positions)
+        return cls._from_yaml_text(path.read_text(), path.name, options)
+
+    @classmethod
+    def from_json_file(
+        cls: type[_ModelType],
+        path: pathlib.Path,
+        *,
+        fail_fast: bool = False,
+        error_positions: bool = False,
+    ) -> _ModelType:
+        """Instantiate this model from a JSON file.
+
+        Validation errors are the same as for the same content in a YAML file.
+
+        :param path: The JSON file to read.
+        :param fail_fast: Whether to stop at the first validation error.
+        :param error_positions: Whether to annotate validation errors with
+            their line and column in the file.
+        :returns: The validated model.
+        :raises ValueError: If the file isn't valid JSON.
+        :raises TypeError: If the file doesn't contain a dictionary.
+        :raises CraftValidationError: If the file contains a duplicate key,
+            exceeds a resource limit, or isn't valid.
+        """
+        text = path.read_text()
+        data = safe_json_load(io.StringIO(text))
+        options = _LoadOptions(fail_fast=fail_fast, error_positions=error_positions)
+        return cls._from_data(data, text, path.name, options)
+
+    @classmethod
+    def _from_yaml_text(
+        cls: type[_ModelType], text: str, file_name: str, options: _LoadOptions
+    ) -> _ModelType:
+        """Instantiate this model from the content of a YAML file."""
+        if looks_like_json(text):
+            try:
+                data = safe_json_load(io.StringIO(text))
+            except (ValueError, errors.CraftValidationError):
+                pass  # Not JSON after all, or YAML would give a better error.
+            else:
+                return cls._from_data(data, text, file_name, options)
+
+        positions = YamlPositions() if options.error_positions else None
         try:
-            return cls.unmarshal(data)
+            if not _streams(cls, options):
+                data = safe_yaml_load(io.StringIO(text), positions=positions)
+                return cls._unmarshal_with(data, options.validated)
+            items = safe_yaml_load_items(
+                io.StringIO(text), split=streaming.split_keys(cls), positions=positions
+            )
+            try:
+                return streaming.validate_items(
+                    cls,
+                    items,
+                    fail_fast=options.fail_fast,
+                    validated=options.validated,
+                    lazy=options.lazy,
+                    on_error=functools.partial(
+                        errors.CraftValidationError.from_pydantic,
+                        file_name=file_name,
+                        positions=positions,
+                    ),
+                )
+            except TypeError as type_error:
+                raise TypeError("Project data is not a dictionary") from type_error
         except pydantic.ValidationError as err:
-            raise errors.CraftValidationError.from_pydantic(err, file_name=path.name)
+            raise errors.CraftValidationError.from_pydantic(
+                err, file_name=file_name, positions=positions
+            )
+
+    @classmethod
+    def _from_data(
+        cls: type[_ModelType],
+        data: Any,
+        text: str,
+        file_name: str,
+        options: _LoadOptions,
+    ) -> _ModelType:
+        """Validate data loaded from a file, in the same way as from_yaml_file."""
+        to_error = functools.partial(
+            _validation_error,
+            text=text if options.error_positions else None,
+            file_name=file_name,
+        )
+        try:
+            if not _streams(cls, options):
+                return cls._unmarshal_with(data, options.validated)
+            if not isinstance(data, dict):
+                raise TypeError("Project data is not a dictionary")
+            items = streaming.dict_items(data, streaming.split_keys(cls))
+            return streaming.validate_items(
+                cls,
+                items,
+                fail_fast=options.fail_fast,
+                validated=options.validated,
+                lazy=options.lazy,
+                on_error=to_error,
+            )
+        except pydantic.ValidationError as err:
+            raise to_error(err)
+
+    @classmethod
+    def _unmarshal_with(
+        cls: type[_ModelType],
+        data: Any,
+        validated: Mapping[str, Mapping[str, Any]] | None,
+    ) -> _ModelType:
+        """Unmarshal data, adding already validated items to it first."""
+        if validated and isinstance(data, dict):
+            data = streaming.merge_items(cls, data, validated)
+        return cls.unmarshal(data)
 
     def to_yaml_file(self, path: pathlib.Path) -> None:
         """Write this model to a YAML file."""
         with path.open("wt") as file:
             yaml.safe_dump(self.marshal(), file)
+
+    def to_json_file(self, path: pathlib.Path) -> None:
+        """Write this model to a JSON file."""
+        with path.open("wt") as file:
+            json.dump(self.marshal(), file, indent=2)
+            file.write("\n")
+
+
+def _streams(model: type[CraftBaseModel], options: _LoadOptions) -> bool:
+    """Determine whether to validate a model from a stream of items.
+
+    Otherwise the model is validated at once, including the items in
+    ``options.validated``.
+    """
+    if not streaming.is_streamable(model):
+        return False
+    return not options.validated or not streaming.uses_values(model)
+
+
+def _validation_error(
+    error: pydantic.ValidationError, *, text: str | None, file_name: str
+) -> errors.CraftValidationError:
+    """Convert a validation error, finding the positions of values in the text.
+
+    Errors are rare, so positions are only found when they are needed, and only
+    if the text is given.
+    """
+    positions = None
+    if text is not None:
+        positions = YamlPositions()
+        with contextlib.suppress(yaml.YAMLError, errors.CraftValidationError):
+            safe_yaml_load(io.StringIO(text), positions=positions)
+    return errors.CraftValidationError.from_pydantic(
+        error, file_name=file_name, positions=positions
+    )
+
+
+if TYPE_CHECKING:
+    _FrozenBase = CraftBaseModel
+else:
+    # Frozen classes also inherit from the mutable class, after this one.
+    _FrozenBase = object
+
+
+class _FrozenModel(_FrozenBase):
+    """Methods for frozen model classes, which are created by ``_frozen_class``."""
+
+    __mutable_class__: type[CraftBaseModel]
+    _structural_hash: int | None
+
+    def __init__(self, **data: Any) -> None:
+        super().__init__(**data)
+        self.__dict__.update(
+            (name, freeze(value)) for name, value in self.__dict__.items()
+        )
+
+    def __hash__(self) -> int:
+        structural_hash = self._structural_hash
+        if structural_hash is None:
+            structural_hash = hash((type(self), frozenset(self.__dict__.items())))
+            object.__setattr__(self, "_structural_hash", structural_hash)
+        return structural_hash
+
+    def __eq__(self, other: object) -> bool:
+        if self is other:
+            return True
+        if type(other) is not type(self):
+            return super().__eq__(other)
+        other_hash = other._structural_hash  # type: ignore[attr-defined]
+        if self._structural_hash is not None and other_hash is not None:
+            if self._structural_hash != other_hash:
+                return False
+        return self.__dict__ == other.__dict__
+
+    def dict(self, **kwargs: Any) -> builtins.dict[str, Any]:
+        """Generate a dictionary of the model, with the same types as if mutable."""
+        return cast("builtins.dict[str, Any]", thaw(super().dict(**kwargs)))
+
+    def _copy_and_set_values(
+        self: _FrozenModelType,
+        values: builtins.dict[str, Any],
+        fields_set: set[str],
+        *,
+        deep: bool,
+    ) -> _FrozenModelType:
+        frozen_values = {name: freeze(value) for name, value in values.items()}
+        copied = super()._copy_and_set_values(frozen_values, fields_set, deep=deep)
+        # The copy may have different values, so its hash can't be reused.
+        object.__setattr__(copied, "_structural_hash", None)
+        return copied
+
+    def freeze(self: _ModelType) -> _ModelType:
+        """Get a frozen copy of this model, which is the model itself."""
+        return self
+
+    def thaw(self: _ModelType) -> _ModelType:
+        """Get a mutable copy of this model."""
+        # Frozen models are typed as their mutable class, which this returns.
+        mutable_class = cast(_FrozenModel, self).__mutable_class__
+        return cast(
+            _ModelType,
+            mutable_class.construct(
+                set(self.__fields_set__),
+                **{name: thaw(value) for name, value in self.__dict__.items()},
+            ),
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _frozen_class(cls: type[_ModelType]) -> type[_ModelType]:
+    """Create the frozen variant of a model class."""
+    if _FrozenModel in cls.__mro__:
+        return cls
+
+    config = type("Config", (cls.__config__,), {"allow_mutation": False})
+    name = f"Frozen{cls.__name__}"
+    namespace = {
+        "__module__": cls.__module__,
+        "__qualname__": name,
+        "__doc__": cls.__doc__,
+        "__mutable_class__": cls,
+        "__hash__": _FrozenModel.__hash__,
+        "Config": config,
+        "_structural_hash": pydantic.PrivateAttr(None),
+    }
+    return cast("type[_ModelType]", type(name, (_FrozenModel, cls), namespace))
@@ -0,0 +1,369 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Compiled validators for craft-application models.
+
+Pydantic walks a generic chain of validators for every field on every
+instantiation. For the field types used by craft-application models, most of
+that chain is a no-op for well-formed input. This module generates a
+specialised validation function per model class that checks the common,
+well-formed cases inline.
+
+The compiled function only ever takes its fast path when the result is
+known to be identical to pydantic's. Values it doesn't recognise are handed to
+pydantic's own per-field validation, and any validation error causes the whole
+input to be re-validated by pydantic so that errors are exactly the same.
+"""
+from __future__ import annotations
+
+import functools
+import re
+from typing import Any, Callable, Pattern, TypeVar
+
+import pydantic
+from pydantic.fields import SHAPE_DICT, SHAPE_SINGLETON, ModelField
+
+_ModelType = TypeVar("_ModelType", bound=pydantic.BaseModel)
+_MISSING = object()
+_IMMUTABLE_DEFAULTS = (type(None), bool, int, float, str)
+
+
+def compile_validator(
+    model: type[_ModelType],
+) -> Callable[[dict[str, Any]], _ModelType]:
+    """Get a compiled validation function for a model class.
+
+    The function takes the same data as the model's constructor (as a dict)
+    and returns a model instance or raises the same ``pydantic.ValidationError``
+    that instantiating the model would. Compilation happens once per class.
+
+    :param model: The pydantic model class to compile.
+    :returns: A function that validates a dictionary into a model instance.
+    """
+    return _compile(model)
+
+
+@functools.lru_cache(maxsize=None)
+def _compile(model: type[_ModelType]) -> Callable[[dict[str, Any]], _ModelType]:
+    if not is_compilable(model):
+        return functools.partial(_instantiate, model)
+    return _ValidatorBuilder(model).build()
+
+
+def _instantiate(model: type[_ModelType], data: dict[str, Any]) -> _ModelType:
+    return model(**data)
+
+
+def is_compilable(model: type[pydantic.BaseModel]) -> bool:
+    """Determine whether a model only uses behaviour the compiler reproduces.
+
+    Models with root validators need to see all of their data at once, and
+    models that customise their construction or validate their defaults need
+    pydantic to create them. The same models can't be validated from a stream
+    of items, so :func:`craft_application.models.streaming.is_streamable` uses
+    this too.
+    """
+    config = model.__config__
+    return (
+        model.__init__ is pydantic.BaseModel.__init__  # type: ignore[misc]
+        and model.__new__ is pydantic.BaseModel.__new__
+        and not model.__pre_root_validators__
+        and not model.__post_root_validators__
+        and not model.__custom_root_type__
+        and not config.validate_all
+    )
+
+
+class _ValidatorBuilder:
+    """Generate the source code for a model's validation function."""
+
+    def __init__(self, model: type[pydantic.BaseModel]) -> None:
+        self._model = model
+        self._config = model.__config__
+        self._namespace: dict[str, Any] = {
+            "_MISSING": _MISSING,
+            "cls": model,
+            "fallback": functools.partial(_instantiate, model),
+            "new_model": functools.partial(model.__new__, model),
+            "set_attribute": object.__setattr__,
+        }
+        self._lines: list[str] = []
+
+    def build(self) -> Callable[[dict[str, Any]], Any]:
+        """Build the validation function."""
+        check_extra = self._config.extra is not pydantic.Extra.ignore
+        self._emit(1, "values = {}")
+        self._emit(1, "fields_set = set()")
+        if check_extra:
+            self._emit(1, "names_used = set()")
+        for index, field in enumerate(self._model.__fields__.values()):
+            self._emit_field(index, field, check_extra=check_extra)
+        if check_extra:
+            self._emit_extra()
+        self._emit(1, "model = new_model()")
+        self._emit(1, "set_attribute(model, '__dict__', values)")
+        self._emit(1, "set_attribute(model, '__fields_set__', fields_set)")
+        self._emit(1, "model._init_private_attributes()")
+        self._emit(1, "return model")
+
+        source = "\n".join(["def validate(data):", *self._lines])
+        code = compile(
+            source, f"<compiled validator for {self._model.__name__}>", "exec"
+        )
+        exec(code, self._namespace)  # noqa: S102 (source is generated above)
+        validate = self._namespace["validate"]
+        validate.__doc__ = f"Validate a dictionary into a {self._model.__name__}."
+        return validate  # type: ignore[no-any-return]
+
+    def _emit(self, indent: int, line: str) -> None:
+        self._lines.append("    " * indent + line)
+
+    def _emit_field(self, index: int, field: ModelField, *, check_extra: bool) -> None:
+        name = field.name
+        alias = field.alias
+        self._namespace[f"field_{index}"] = field
+        self._emit(1, f"# {name}")
+        self._emit(1, f"value = data.get({alias!r}, _MISSING)")
+        if field.alt_alias and self._config.allow_population_by_field_name:
+            self._emit(1, "if value is _MISSING:")
+            self._emit(2, f"value = data.get({name!r}, _MISSING)")
+            if check_extra:
+                self._emit(2, "if value is not _MISSING:")
+                self._emit(3, f"names_used.add({name!r})")
+                self._emit(1, "else:")
+                self._emit(2, f"names_used.add({alias!r})")
+        elif check_extra:
+            self._emit(1, "if value is not _MISSING:")
+            self._emit(2, f"names_used.add({alias!r})")
+
+        self._emit(1, "if value is _MISSING:")
+        if field.required:
+            self._emit(2, "return fallback(data)")
+        elif field.validate_always:
+            self._emit(2, f"value = field_{index}.get_default()")
+            self._emit_generic(2, index, field)
+        elif field.default_factory is None and isinstance(
+            field.default, _IMMUTABLE_DEFAULTS
+        ):
+            # The default is shared rather than copied, as it can't be changed.
+            self._namespace[f"default_{index}"] = field.default
+            self._emit(2, f"values[{name!r}] = default_{index}")
+        else:
+            self._emit(2, f"values[{name!r}] = field_{index}.get_default()")
+        self._emit(1, "else:")
+        self._emit(2, f"fields_set.add({name!r})")
+
+        if _is_any_field(field):
+            self._emit(2, f"values[{name!r}] = value")
+        elif _is_plain_str_field(field, self._config):
+            self._emit_plain_str(index, field)
+        elif _is_constrained_str_field(field):
+            self._emit_constrained_str(index, field)
+        elif _is_dict_of_dicts_field(field):
+            self._emit_dict_of_dicts(index, field)
+        else:
+            self._emit_generic(2, index, field)
+
+    def _emit_generic(self, indent: int, index: int, field: ModelField) -> None:
+        """Validate a field value using pydantic's own field validation."""
+        self._emit(
+            indent,
+            f"value, errors = field_{index}.validate("
+            f"value, values, loc={field.alias!r}, cls=cls)",
+        )
+        self._emit(indent, "if errors:")
+        self._emit(indent + 1, "return fallback(data)")
+        self._emit(indent, f"values[{field.name!r}] = value")
+
+    def _emit_none_check(self, index: int, field: ModelField) -> None:
+        if field.allow_none:
+            self._emit(2, "elif value is None:")
+            self._emit(3, f"values[{field.name!r}] = None")
+        self._emit(2, "else:")
+        self._emit_generic(3, index, field)
+
+    def _emit_plain_str(self, index: int, field: ModelField) -> None:
+        self._emit(2, "if value.__class__ is str:")
+        self._emit(3, f"values[{field.name!r}] = value")
+        self._emit_none_check(index, field)
+
+    def _emit_constrained_str(self, index: int, field: ModelField) -> None:
+        type_ = field.type_
+        config = self._config
+        min_length = (
+            type_.min_length
+            if type_.min_length is not None
+            else config.min_anystr_length
+        )
+        max_length = (
+            type_.max_length
+            if type_.max_length is not None
+            else config.max_anystr_length
+        )
+
+        conditions: list[str] = []
+        if min_length:
+            conditions.append(f"len(string) >= {min_length}")
+        if max_length is not None:
+            conditions.append(f"len(string) <= {max_length}")
+        if type_.regex:
+            self._namespace[f"match_{index}"] = _compile_pattern(type_.regex).match
+            conditions.append(f"match_{index}(string) is not None")
+
+        self._emit(2, "if value.__class__ is str:")
+        self._emit(3, "string = value")
+        if type_.strip_whitespace or config.anystr_strip_whitespace:
+            self._emit(3, "string = string.strip()")
+        if type_.to_upper or config.anystr_upper:
+            self._emit(3, "string = string.upper()")
+        if type_.to_lower or config.anystr_lower:
+            self._emit(3, "string = string.lower()")
+        self._emit(3, f"if {' and '.join(conditions) or 'True'}:")
+        self._emit(4, f"values[{field.name!r}] = string")
+        self._emit(3, "else:")
+        self._emit_generic(4, index, field)
+        self._emit_none_check(index, field)
+
+    def _emit_dict_of_dicts(self, index: int, field: ModelField) -> None:
+        """Validate a ``Dict[str, Dict[str, Any]]`` field with item validators."""
+        item_field = field.sub_fields[0]  # type: ignore[index]
+        self._namespace[f"item_field_{index}"] = item_field
+        self._namespace[f"item_config_{index}"] = item_field.model_config
+        validators = item_field.post_validators or []
+        for number, validator in enumerate(validators):
+            self._namespace[f"item_validator_{index}_{number}"] = validator
+
+        self._emit(2, "valid = value.__class__ is dict")
+        self._emit(2, "if valid:")
+        self._emit(3, "result = {}")
+        self._emit(3, "for key, item in value.items():")
+        self._emit(
+            4,
+            "if key.__class__ is not str or item.__class__ is not dict "
+            "or not all(item_key.__class__ is str for item_key in item):",
+        )
+        self._emit(5, "valid = False")
+        self._emit(5, "break")
+        self._emit(4, "item = dict(item)")
+        if validators:
+            self._emit(4, "try:")
+            for number in range(len(validators)):
+                self._emit(
+                    5,
+                    f"item = item_validator_{index}_{number}("
+                    f"cls, item, values, item_field_{index}, item_config_{index})",
+                )
+            self._emit(4, "except (ValueError, TypeError, AssertionError):")
+            self._emit(5, "return fallback(data)")
+        self._emit(4, "result[key] = item")
+        self._emit(2, "if valid:")
+        self._emit(3, f"values[{field.name!r}] = result")
+        self._emit(2, "else:")
+        self._emit_generic(3, index, field)
+
+    def _emit_extra(self) -> None:
+        self._emit(1, "extra = data.keys() - names_used")
+        self._emit(1, "if extra:")
+        if self._config.extra is not pydantic.Extra.allow:
+            self._emit(2, "return fallback(data)")
+            return
+        # Non-string keys and reserved names get pydantic's own error.
+        self._emit(
+            2,
+            "if not all(isinstance(key, str) for key in extra) "
+            "or '__pydantic_self__' in extra:",
+        )
+        self._emit(3, "return fallback(data)")
+        self._emit(2, "fields_set |= extra")
+        self._emit(2, "for key in extra:")
+        self._emit(3, "values[key] = data[key]")
+
+
+def _compile_pattern(regex: str | Pattern[str]) -> Pattern[str]:
+    return re.compile(regex) if isinstance(regex, str) else regex
+
+
+def _is_simple(field: ModelField) -> bool:
+    """Determine whether a field has no validators beyond its type's."""
+    return (
+        field.shape == SHAPE_SINGLETON
+        and not field.sub_fields
+        and not field.pre_validators
+        and not field.post_validators
+        and not field.class_validators
+    )
+
+
+def _is_any_field(field: ModelField) -> bool:
+    return _is_simple(field) and field.type_ in (Any, object) and not field.validators
+
+
+def _is_plain_str_field(field: ModelField, config: type[pydantic.BaseConfig]) -> bool:
+    return (
+        _is_simple(field)
+        and field.type_ is str
+        and not config.anystr_strip_whitespace
+        and not config.anystr_upper
+        and not config.anystr_lower
+        and not config.min_anystr_length
+        and config.max_anystr_length is None
+    )
+
+
+def _is_constrained_str_field(field: ModelField) -> bool:
+    type_ = field.type_
+    return (
+        _is_simple(field)
+        and isinstance(type_, type)
+        and issubclass(type_, pydantic.ConstrainedStr)
+        and _same_method(type_, "__get_validators__")
+        and _same_method(type_, "validate")
+        and not type_.curtail_length
+    )
+
+
+def _same_method(type_: type, name: str) -> bool:
+    """Check that a ConstrainedStr subclass doesn't override a classmethod."""
+    method = getattr(type_, name).__func__
+    return method is getattr(pydantic.ConstrainedStr, name).__func__  # type: ignore[no-any-return]
+
+
+def _is_dict_of_dicts_field(field: ModelField) -> bool:
+    if (
+        field.shape != SHAPE_DICT
+        or field.pre_validators
+        or field.post_validators
+        or not field.key_field
+        or not _is_plain_key(field.key_field)
+        or not field.sub_fields
+        or len(field.sub_fields) != 1
+    ):
+        return False
+    item_field = field.sub_fields[0]
+    if (
+        item_field.shape != SHAPE_DICT
+        or item_field.pre_validators
+        or item_field.allow_none
+        or not item_field.key_field
+        or not _is_plain_key(item_field.key_field)
+        or not item_field.sub_fields
+        or len(item_field.sub_fields) != 1
+    ):
+        return False
+    return _is_any_field(item_field.sub_fields[0])
+
+
+def _is_plain_key(key_field: ModelField) -> bool:
+    return key_field.type_ is str and len(key_field.validators) == 1
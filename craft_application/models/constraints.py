@@ -14,12 +14,106 @@
 # You should have received a copy of the GNU Lesser General Public License along
 # with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Constrained pydantic types for *craft applications."""
+import dataclasses
+import functools
 import re
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple, Type
 
+import pydantic
 from pydantic import ConstrainedList, ConstrainedStr, StrictStr
+from pydantic.fields import ModelField
 
 
-class ProjectName(ConstrainedStr):
+@dataclasses.dataclass(frozen=True)
+class BulkValidation:
+    """The result of validating many values of a constrained type at once.
+
+    :param values: The validated value of each input, or ``None`` if invalid.
+    :param accepted: A byte for each input, which is 1 if it is valid.
+    :param errors: The error message for each invalid input, by its index.
+    """
+
+    values: List[Optional[str]]
+    accepted: bytearray
+    errors: Dict[int, str]
+
+    @property
+    def all_valid(self) -> bool:
+        """Whether every input is valid."""
+        return not self.errors
+
+
+class _BulkValidatedStr(ConstrainedStr):
+    """A constrained string that can validate many values at once."""
+
+    @classmethod
+    def validate_many(cls, values: Iterable[Any]) -> BulkValidation:
+        """Validate many values, with the same results as validating each one.
+
+        Plain strings are checked with a single regular expression match each,
+        rather than pydantic's chain of validators. Anything else, and any
+        string that fails that check, is validated by pydantic so that values
+        and error messages are exactly the same.
+
+        :param values: The values to validate.
+        :returns: The validated values, which are valid, and why others aren't.
+        """
+        items = list(values)
+        pattern = _bulk_pattern(cls)
+        match = pattern.match if pattern else None
+        strip = cls.strip_whitespace
+        field = _single_value_field(cls)
+        validated: List[Optional[str]] = [None] * len(items)
+        accepted = bytearray(len(items))
+        errors: Dict[int, str] = {}
+        for index, value in enumerate(items):
+            if match is not None and type(value) is str:
+                candidate = value.strip() if strip else value
+                if match(candidate) is not None:
+                    validated[index] = candidate
+                    accepted[index] = 1
+                    continue
+            result, error = field.validate(value, {}, loc="value")
+            if error:
+                errors[index] = str(error.exc)  # type: ignore[union-attr]
+            else:
+                validated[index] = result
+                accepted[index] = 1
+        return BulkValidation(validated, accepted, errors)
+
+
+@functools.lru_cache(maxsize=None)
+def _bulk_pattern(cls: Type[ConstrainedStr]) -> Optional[Pattern[str]]:
+    """Get a pattern that matches the valid (stripped) strings of a type.
+
+    The length limits are checked by a lookahead, so that each string is
+    checked by a single match. Returns None for types that transform values
+    beyond stripping them.
+    """
+    if cls.to_upper or cls.to_lower or cls.curtail_length:
+        return None
+    min_length = cls.min_length or 0
+    max_length = "" if cls.max_length is None else cls.max_length
+    length = rf"(?=[\s\S]{{{min_length},{max_length}}}\Z)"
+    if not cls.regex:
+        return re.compile(length)
+    regex = re.compile(cls.regex)
+    return re.compile(f"{length}(?:{regex.pattern})", regex.flags)
+
+
+@functools.lru_cache(maxsize=None)
+def _single_value_field(cls: Type[ConstrainedStr]) -> ModelField:
+    """Get a field that validates one value of a type as pydantic would."""
+    return ModelField.infer(
+        name="value",
+        value=pydantic.fields.Required,
+        annotation=cls,
+        class_validators=None,
+        config=pydantic.BaseConfig,
+    )
+
+
+class ProjectName(_BulkValidatedStr):
     """A constrained string for describing a project name.
 
     Project name rules:
@@ -33,10 +127,12 @@ class ProjectName(ConstrainedStr):
     max_length = 40
     strict = True
     strip_whitespace = True
-    regex = re.compile(r"^([a-z0-9][a-z0-9-]?)?[a-z]+([a-z0-9-]?[a-z0-9])*$")
+    # Each character after the first letter can only be matched one way, so
+    # invalid names fail in linear time rather than backtracking exponentially.
+    regex = re.compile(r"^([a-z0-9][a-z0-9-]?)?[a-z](-?[a-z0-9])*$")
 
 
-class ProjectTitle(StrictStr):
+class ProjectTitle(_BulkValidatedStr, StrictStr):
     """A constrained string for describing a project title."""
 
     min_length = 2
@@ -44,7 +140,7 @@ class ProjectTitle(StrictStr):
     strip_whitespace = True
 
 
-class SummaryStr(ConstrainedStr):
+class SummaryStr(_BulkValidatedStr):
     """A constrained string for a short summary of a project."""
 
     strip_whitespace = True
@@ -62,9 +158,82 @@ class UniqueStrList(ConstrainedList):
     unique_items = True
 
 
-class VersionStr(ConstrainedStr):
+class VersionStr(_BulkValidatedStr):
     """A valid version string."""
 
     max_length = 32
     strip_whitespace = True
     regex = re.compile(r"^[a-zA-Z0-9](?:[a-zA-Z0-9:.+~-]*[a-zA-Z0-9+~])?$")
+
+    @staticmethod
+    def sort_key(version: str) -> "VersionKey":
+        """Get a key that sorts versions in the same order as Debian versions.
+
+        A version is split into an epoch (the digits before the first ``:``,
+        if any), an upstream version and a revision (after the last ``-``,
+        if any). Numbers compare numerically, and ``~`` sorts before anything,
+        even the end of a version, so that ``1.0~rc1`` sorts before ``1.0``.
+        Letters sort before other characters. Keys are cached, so sorting or
+        searching the same versions again doesn't parse them again.
+
+        :param version: The version, which should be a valid VersionStr.
+        :returns: A key that can be compared with the keys of other versions.
+        """
+        return _version_key(version)
+
+
+# The segments of an upstream version or revision, as parsed by
+# _version_part_key.
+_PartKey = Tuple[Tuple[Tuple[int, ...], int], ...]
+# An epoch, followed by the upstream version and the revision.
+VersionKey = Tuple[int, _PartKey, _PartKey]
+
+_VERSION_SEGMENT = re.compile(r"([^0-9]*)([0-9]*)")
+# A segment with no non-digits and no digits.
+_EMPTY_SEGMENT = ((0,), 0)
+
+
+def _character_weight(character: str) -> int:
+    """Get the weight of a non-digit character, as dpkg does."""
+    if character == "~":
+        return -1
+    if "a" <= character.lower() <= "z":
+        return ord(character)
+    return ord(character) + 256
+
+
+@functools.lru_cache(maxsize=65536)
+def _version_key(version: str) -> VersionKey:
+    epoch, colon, rest = version.partition(":")
+    if not (colon and epoch.isascii() and epoch.isdigit()):
+        epoch, rest = "0", version
+    upstream, hyphen, revision = rest.rpartition("-")
+    if not hyphen:
+        upstream, revision = rest, ""
+    return (
+        int(epoch),
+        _version_part_key(upstream),
+        _version_part_key(revision),
+    )
+
+
+def _version_part_key(part: str) -> _PartKey:
+    """Get the key of an upstream version or revision.
+
+    The part is split into segments, each of which is a (possibly empty) run
+    of non-digits followed by a (possibly empty, meaning 0) run of digits. The
+    non-digits are weighted by character and end with a 0, which is the weight
+    of the end of a segment (or of a digit, as in dpkg).
+    """
+    segments = [
+        ((*map(_character_weight, text), 0), int(number or 0))
+        for text, number in _VERSION_SEGMENT.findall(part)
+        if text or number
+    ]
+    # A part that has ended compares as if it continued with empty segments.
+    # Only the first segment can be empty, so two of them are always enough
+    # (e.g. "" sorts after "0~"), once any trailing ones are removed.
+    while segments and segments[-1] == _EMPTY_SEGMENT:
+        segments.pop()
+    segments.extend((_EMPTY_SEGMENT, _EMPTY_SEGMENT))
+    return tuple(segments)
@@ -17,13 +17,42 @@
 
 This defines the structure of the input file (e.g. snapcraft.yaml)
 """
-from typing import Any, Dict, Optional, Union, cast
+import collections
+import concurrent.futures
+import copy
+import hashlib
+import io
+import os
+import pathlib
+import shutil
+import tempfile
+import threading
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
-import craft_parts
 import pydantic
 from pydantic import AnyUrl
+from pydantic.error_wrappers import ErrorWrapper
 
-from craft_application.models.base import CraftBaseModel
+from craft_application import errors
+from craft_application.models import streaming
+from craft_application.models.base import (
+    CraftBaseConfig,
+    CraftBaseModel,
+    _LoadOptions,
+)
 from craft_application.models.constraints import (
     ProjectName,
     ProjectTitle,
@@ -31,6 +60,229 @@ from craft_application.models.constraints import (
     UniqueStrList,
     VersionStr,
 )
+from craft_application.util.yaml import (
+    YAML_DELETE,
+    YamlPositions,
+    safe_yaml_load,
+    safe_yaml_load_keys,
+    safe_yaml_patch,
+)
+
+_ProjectType = TypeVar("_ProjectType", bound="Project")
+
+# The number of validated fragments kept by _load_fragment.
+_FRAGMENT_CACHE_SIZE = 4096
+# The length of the path to a part's name, i.e. ("parts", name).
+_PART_PATH_LENGTH = 2
+
+
+def _get_effective_base(model: CraftBaseModel) -> str:
+    build_base = getattr(model, "build_base", None)
+    if build_base is not None:
+        return cast(str, build_base)
+    base = getattr(model, "base", None)
+    if base is not None:
+        return cast(str, base)
+    raise RuntimeError("Could not determine effective base")
+
+
+def _merge_parts(
+    parts: Dict[str, Dict[str, Any]], overrides: Mapping[str, Optional[Dict[str, Any]]]
+) -> Dict[str, Dict[str, Any]]:
+    """Add, replace or remove (if ``None``) parts, without modifying the original."""
+    merged = dict(parts)
+    for name, part in overrides.items():
+        if part is None:
+            merged.pop(name, None)
+        else:
+            merged[name] = part
+    return merged
+
+
+def _changed_parts(
+    parts: Mapping[str, Optional[Dict[str, Any]]]
+) -> Dict[str, Dict[str, Any]]:
+    """Get the parts that are added or replaced, rather than removed."""
+    return {name: part for name, part in parts.items() if part is not None}
+
+
+def _check_fields(cls: Type["Project"], names: Iterable[str]) -> None:
+    """Check that every name is the name of a field of a project class."""
+    unknown = sorted(set(names) - cls.__fields__.keys())
+    if unknown:
+        raise ValueError(f"Unknown project fields: {', '.join(unknown)}")
+
+
+def _validate_fields(
+    cls: Type["Project"],
+    fields: Mapping[str, Any],
+    *,
+    names: Optional[Iterable[str]] = None,
+    parts: Optional[Mapping[str, Any]] = None,
+    values: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Validate some fields of a project, and some of its parts, on their own.
+
+    Each field sees the values in ``values`` and the fields validated before
+    it. Each part is validated on its own, so only the given parts are in the
+    ``parts`` value returned.
+
+    :param fields: The values to validate, by field name.
+    :param names: The fields to validate, in order, if not every field in
+        ``fields``. A required field missing from ``fields`` is an error.
+    :param parts: Parts to validate, by name.
+    :param values: Values of other fields, which are updated in place.
+    :returns: The validated values, or ``None`` if the project can't have its
+        fields validated on their own and must be validated in full.
+    :raises pydantic.ValidationError: If a value is invalid or missing.
+    """
+    if not streaming.is_streamable(cls) or streaming.uses_values(cls):
+        # Validators that use other fields need to see the whole project.
+        return None
+
+    values = {} if values is None else values
+    validation_errors: List[ErrorWrapper] = []
+    for name in fields if names is None else names:
+        field = cls.__fields__[name]
+        if name not in fields:
+            if field.required:
+                validation_errors.append(
+                    ErrorWrapper(pydantic.MissingError(), loc=field.alias)
+                )
+            continue
+        value, error = field.validate(fields[name], values, loc=field.alias, cls=cls)
+        if error:
+            validation_errors.append(error)  # type: ignore[arg-type]
+        else:
+            values[name] = value
+    if parts is not None:
+        field = cls.__fields__["parts"]
+        value, error = field.validate(parts, values, loc=field.alias, cls=cls)
+        if error:
+            validation_errors.append(error)  # type: ignore[arg-type]
+        else:
+            values["parts"] = value
+    if validation_errors:
+        raise pydantic.ValidationError(validation_errors, cls)
+    return values
+
+
+class _Fragment(NamedTuple):
+    """The validated parts of a parts fragment.
+
+    ``positions`` holds the position of each part's name, in the same form as
+    the locations of errors in the ``parts`` field, if they were requested.
+    """
+
+    parts: Dict[str, Dict[str, Any]]
+    positions: YamlPositions
+
+
+_fragment_cache: "collections.OrderedDict[Tuple[type, str, bool], _Fragment]" = (
+    collections.OrderedDict()
+)
+_fragment_cache_lock = threading.Lock()
+
+
+def _load_fragment(
+    cls: Type["Project"], path: pathlib.Path, file_name: str, *, error_positions: bool
+) -> _Fragment:
+    """Load and validate a parts fragment, reusing the result for unchanged files.
+
+    Results are cached by the hash of the file's content, so a fragment is only
+    parsed and validated again once it has been edited.
+    """
+    content = path.read_bytes()
+    key = (cls, hashlib.sha256(content).hexdigest(), error_positions)
+    with _fragment_cache_lock:
+        fragment = _fragment_cache.get(key)
+        if fragment is not None:
+            _fragment_cache.move_to_end(key)
+    if fragment is None:
+        fragment = _validate_fragment(
+            cls, content.decode(), file_name, error_positions=error_positions
+        )
+        with _fragment_cache_lock:
+            _fragment_cache[key] = fragment
+            while len(_fragment_cache) > _FRAGMENT_CACHE_SIZE:
+                _fragment_cache.popitem(last=False)
+    # The cached parts must not be modified through the project.
+    return _Fragment(copy.deepcopy(fragment.parts), fragment.positions)
+
+
+def _validate_fragment(
+    cls: Type["Project"], text: str, file_name: str, *, error_positions: bool
+) -> _Fragment:
+    """Parse and validate the parts in a parts fragment.
+
+    The parts of projects that must be validated in full are only parsed, and
+    are validated along with the rest of the project.
+    """
+    positions = YamlPositions()
+    data = safe_yaml_load(
+        io.StringIO(text), positions=positions if error_positions else None
+    )
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        raise TypeError(f"Parts fragment {file_name} is not a dictionary")
+
+    field = cls.__fields__["parts"]
+    positions = YamlPositions(
+        ((field.alias, *path), position) for path, position in positions.items()
+    )
+    try:
+        values = _validate_fields(cls, {}, parts=data)
+    except pydantic.ValidationError as err:
+        raise errors.CraftValidationError.from_pydantic(
+            err, file_name=file_name, positions=positions
+        )
+    return _Fragment(
+        cast(Dict[str, Dict[str, Any]], data if values is None else values["parts"]),
+        YamlPositions(
+            (path, position)
+            for path, position in positions.items()
+            if len(path) == _PART_PATH_LENGTH
+        ),
+    )
+
+
+def _fragment_name(fragment: pathlib.Path, project_file: pathlib.Path) -> str:
+    """Get the name of a fragment in errors, relative to the project file."""
+    try:
+        return str(fragment.relative_to(project_file.parent))
+    except ValueError:
+        return fragment.name
+
+
+class ProjectHeader(CraftBaseModel):
+    """The top-level fields of a project, without its parts.
+
+    Headers are created by :meth:`Project.peek_yaml_file` from values that have
+    already been validated by the project class, so only the fields that were
+    requested are set.
+    """
+
+    name: Optional[ProjectName]
+    title: Optional[ProjectTitle]
+    base: Optional[Any]
+    version: Optional[VersionStr]
+    contact: Optional[Union[str, UniqueStrList]]
+    issues: Optional[Union[str, UniqueStrList]]
+    source_code: Optional[AnyUrl]
+    summary: Optional[SummaryStr]
+    description: Optional[str]
+    license: Optional[str]
+
+    class Config(CraftBaseConfig):
+        """Allows fields added by subclasses of Project."""
+
+        extra = pydantic.Extra.allow
+
+    @property
+    def effective_base(self) -> str:
+        """Return the base used for creating the output."""
+        return _get_effective_base(self)
 
 
 class Project(CraftBaseModel):
@@ -52,15 +304,303 @@ class Project(CraftBaseModel):
     @classmethod
     def _validate_parts(cls, item: Dict[str, Any]) -> Dict[str, Any]:
         """Verify each part (craft-parts will re-validate this)."""
+        # craft-parts is slow to import, so only import it once there are parts.
+        import craft_parts
+
         craft_parts.validate_part(item)
         return item
 
     @property
     def effective_base(self) -> str:
         """Return the base used for creating the output."""
-        build_base = getattr(self, "build_base", None)
-        if build_base is not None:
-            return cast(str, build_base)
-        if self.base is not None:
-            return cast(str, self.base)
-        raise RuntimeError("Could not determine effective base")
+        return _get_effective_base(self)
+
+    def validate_all(self) -> None:
+        """Validate the parts of a project loaded with ``lazy_parts``.
+
+        Parts that were already used aren't validated again. This does nothing
+        for projects whose parts were all validated when they were loaded.
+
+        :raises CraftValidationError: If any part is invalid, with the same
+            message as when loading the project without ``lazy_parts``.
+        """
+        parts = self.__dict__.get("parts")
+        if isinstance(parts, streaming.LazyItems):
+            parts.validate_all()
+
+    def derive(
+        self: _ProjectType,
+        *,
+        parts: Optional[Mapping[str, Optional[Dict[str, Any]]]] = None,
+        **fields: Any,
+    ) -> _ProjectType:
+        """Create a variant of this project with some values overridden.
+
+        Rather than copying this project, the variant shares every value that
+        isn't overridden with it, including unchanged parts. Only the overridden
+        values are validated, so deriving many variants of a project with many
+        parts (e.g. one per platform) is cheap. Projects with validators that
+        use other fields are validated in full. Because values are shared, they
+        must not be modified in place on either project.
+
+        :param parts: Parts to add or replace in the variant, by name. A value of
+            ``None`` removes the part.
+        :param fields: Other fields to override, by field name.
+        :returns: A new project of the same class as this one.
+        :raises ValueError: If an overridden field is not a field of this class.
+        :raises pydantic.ValidationError: If an overridden value is invalid.
+        """
+        cls = type(self)
+        _check_fields(cls, fields)
+        new_parts = _merge_parts(self.parts, parts) if parts else self.parts
+
+        values = _validate_fields(
+            cls,
+            fields,
+            parts=_changed_parts(parts) if parts else None,
+            values=dict(self.__dict__),
+        )
+        if values is None:
+            data = {name: self.__dict__[name] for name in self.__fields_set__}
+            data.update(fields, parts=new_parts)
+            return cls(**data)
+        if parts:
+            new_parts.update(values["parts"])
+            values["parts"] = new_parts
+
+        fields_set = self.__fields_set__.union(fields)
+        if parts:
+            fields_set.add("parts")
+        return self._copy_and_set_values(values, fields_set, deep=False)
+
+    @classmethod
+    def from_yaml_file(  # noqa: PLR0913 (the options are keyword-only)
+        cls: Type[_ProjectType],
+        path: pathlib.Path,
+        *,
+        fail_fast: bool = False,
+        fragments: Optional[pathlib.Path] = None,
+        lazy_parts: bool = False,
+        error_positions: bool = False,
+    ) -> _ProjectType:
+        """Instantiate a project from a YAML file and, optionally, parts fragments.
+
+        A fragment is a YAML file containing parts by name, as in the ``parts``
+        key of a project file. Fragments are read in parallel, and the result of
+        validating each one is cached by its content, so loading a project again
+        after editing one fragment only re-validates that fragment. A part can
+        only be defined once, whether in the project file or in a fragment.
+
+        With ``lazy_parts``, the other fields are validated as usual, but each
+        part in the project file is only validated when it is first used, e.g.
+        by ``project.parts[name]`` or by iterating over ``project.parts.items()``.
+        This makes loading a project with many parts cheap for commands that
+        only use a few of them. Using an invalid part raises its error, and
+        :meth:`validate_all` validates the remaining parts. If another field is
+        invalid, every part is validated and reported as usual. Projects with
+        validators that use other fields validate every part when loaded.
+
+        :param path: The YAML file to read.
+        :param fail_fast: Whether to stop at the first validation error.
+            Otherwise every fragment and the project file are validated, and
+            every error is reported.
+        :param fragments: A directory containing parts fragments, as ``*.yaml``
+            files. They are added to the project in order of their file names.
+        :param lazy_parts: Whether to validate the parts of the project file
+            only once they are used. Fragments are always validated.
+        :param error_positions: Whether to annotate validation errors with
+            their line and column in the file or fragment.
+        :returns: The validated project.
+        :raises TypeError: If the file or a fragment doesn't contain a dictionary.
+        :raises CraftValidationError: If the file or a fragment isn't valid.
+        """
+        options = _LoadOptions(
+            fail_fast=fail_fast,
+            error_positions=error_positions,
+            lazy=("parts",) if lazy_parts else (),
+        )
+        if fragments is None:
+            return cls._from_yaml_text(path.read_text(), path.name, options)
+
+        field = cls.__fields__["parts"]
+        parts: Dict[str, Dict[str, Any]] = {}
+        messages: List[str] = []
+        fragment_paths = sorted(fragments.glob("*.yaml"))
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            futures = [
+                executor.submit(
+                    _load_fragment,
+                    cls,
+                    fragment_path,
+                    _fragment_name(fragment_path, path),
+                    error_positions=error_positions,
+                )
+                for fragment_path in fragment_paths
+            ]
+            for fragment_path, future in zip(fragment_paths, futures):
+                try:
+                    fragment = future.result()
+                    duplicates = [name for name in fragment.parts if name in parts]
+                    if duplicates:
+                        raise errors.CraftValidationError.from_pydantic(
+                            pydantic.ValidationError(
+                                [
+                                    streaming.duplicate_error(field, name)
+                                    for name in duplicates
+                                ],
+                                cls,
+                            ),
+                            file_name=_fragment_name(fragment_path, path),
+                            positions=fragment.positions,
+                        )
+                except errors.CraftValidationError as exc:
+                    if fail_fast:
+                        for other in futures:
+                            other.cancel()
+                        raise
+                    messages.append(str(exc))
+                else:
+                    parts.update(fragment.parts)
+
+        try:
+            project = cls._from_yaml_text(
+                path.read_text(),
+                path.name,
+                options._replace(validated={field.name: parts}),
+            )
+        except errors.CraftValidationError as exc:
+            if not messages:
+                raise
+            messages.append(str(exc))
+        else:
+            if not messages:
+                return project
+        raise errors.CraftValidationError("\n".join(messages))
+
+    @classmethod
+    def peek_yaml_file(
+        cls, path: pathlib.Path, fields: Optional[Iterable[str]] = None
+    ) -> ProjectHeader:
+        """Read and validate only some top-level fields of a project file.
+
+        Only the requested fields are loaded and validated, so this is much
+        cheaper than :meth:`from_yaml_file` for tools that don't need parts.
+
+        :param path: The project file to read.
+        :param fields: The names of the fields to read. Defaults to every field
+            except ``parts``.
+        Projects with validators that use other fields are validated in full.
+
+        :returns: A header containing the requested fields that were present.
+        :raises ValueError: If a requested field is not a field of this class.
+        :raises CraftValidationError: If a requested field is missing or invalid.
+        """
+        model_fields = cls.__fields__
+        if fields is None:
+            fields = (name for name in model_fields if name != "parts")
+        names = list(dict.fromkeys(fields))
+        _check_fields(cls, names)
+
+        requested = [model_fields[name] for name in names]
+        keys = {field.alias for field in requested}
+        superseded_by: Dict[str, str] = {}
+        if cls.__config__.allow_population_by_field_name:
+            superseded_by = {
+                field.name: field.alias for field in requested if field.alt_alias
+            }
+        with path.open() as file:
+            try:
+                data = safe_yaml_load_keys(
+                    file, keys | superseded_by.keys(), superseded_by=superseded_by
+                )
+            except TypeError as type_error:
+                raise TypeError("Project data is not a dictionary") from type_error
+
+        present: Dict[str, Any] = {}
+        for field in requested:
+            if field.alias in data:
+                present[field.name] = data[field.alias]
+            elif field.name in superseded_by and field.name in data:
+                present[field.name] = data[field.name]
+        try:
+            values = _validate_fields(cls, present, names=names)
+        except pydantic.ValidationError as err:
+            raise errors.CraftValidationError.from_pydantic(err, file_name=path.name)
+        if values is None:
+            project = cls.from_yaml_file(path)
+            values = {
+                name: project.__dict__[name]
+                for name in names
+                if name in project.__fields_set__
+            }
+        return ProjectHeader.construct(**values)
+
+    @classmethod
+    def patch_yaml_file(
+        cls,
+        path: pathlib.Path,
+        *,
+        parts: Optional[Mapping[str, Optional[Dict[str, Any]]]] = None,
+        **fields: Any,
+    ) -> None:
+        """Change some values in a project file, keeping the rest of its text.
+
+        Only the text of the changed values is rewritten, so comments and
+        formatting are kept, and only the changed values are validated, so the
+        cost depends on the size of the change rather than of the project.
+        Projects with validators that use other fields are validated in full.
+        The file is replaced atomically, so it's never left partly written.
+
+        :param path: The project file to change.
+        :param parts: Parts to add or replace, by name. A value of ``None``
+            removes the part.
+        :param fields: Other fields to change, by field name.
+        :raises ValueError: If a changed field is not a field of this class, or
+            a change can't be made to the file (see :func:`safe_yaml_patch`).
+        :raises TypeError: If the file doesn't contain a dictionary.
+        :raises CraftValidationError: If a changed value is invalid.
+        """
+        _check_fields(cls, fields)
+        model_fields = cls.__fields__
+        parts_alias = model_fields["parts"].alias
+        changes: Dict[Tuple[str, ...], Any] = {
+            (model_fields[name].alias,): value for name, value in fields.items()
+        }
+        for name, part in (parts or {}).items():
+            changes[(parts_alias, name)] = YAML_DELETE if part is None else part
+
+        try:
+            validated = _validate_fields(
+                cls, fields, parts=_changed_parts(parts) if parts else None
+            )
+        except pydantic.ValidationError as err:
+            raise errors.CraftValidationError.from_pydantic(err, file_name=path.name)
+
+        with path.open(newline="") as file:
+            text = file.read()
+        try:
+            patched = safe_yaml_patch(text, changes)
+        except TypeError as type_error:
+            raise TypeError("Project data is not a dictionary") from type_error
+        if validated is None:
+            # The whole patched project is validated instead.
+            cls._from_yaml_text(patched, path.name, _LoadOptions())
+        _replace_file(path, patched)
+
+
+def _replace_file(path: pathlib.Path, text: str) -> None:
+    """Replace the content of a file atomically, keeping its permissions."""
+    descriptor, temp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    temp_path = pathlib.Path(temp_name)
+    try:
+        with open(descriptor, "w", newline="") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        shutil.copymode(path, temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink()
+        raise
@@ -0,0 +1,624 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Validation of models from a stream of items.
+
+Rather than waiting for a whole document to be parsed, each top-level field
+is validated as soon as its value has been parsed. Dictionary fields whose
+validators only look at one item at a time (such as a project's ``parts``)
+are validated one item at a time, so that an error in the first part of a
+large project is found before the rest of the project has been parsed.
+
+Fields with validators that look at the values of other fields are only
+validated once every item has been read, in the same order as pydantic
+validates them.
+
+Items that are the same object, such as several parts that are aliases of
+one YAML anchor, are only validated once.
+
+The items of some dictionary fields can also be left unvalidated until they
+are used, in a :class:`LazyItems` dictionary, for callers that only need a few
+of them.
+"""
+from __future__ import annotations
+
+import copy
+import inspect
+from collections.abc import Callable, Collection, Iterable, Iterator, Mapping
+from typing import Any, Dict, Generic, TypeVar
+
+import pydantic
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.fields import SHAPE_DICT, ModelField
+
+from craft_application.models import compiler
+
+_ModelType = TypeVar("_ModelType", bound=pydantic.BaseModel)
+
+
+def is_streamable(model: type[pydantic.BaseModel]) -> bool:
+    """Determine whether a model can be validated from a stream of items.
+
+    These are the models that the compiler can compile, as determined by
+    :func:`craft_application.models.compiler.is_compilable`.
+    """
+    return compiler.is_compilable(model)
+
+
+def uses_values(model: type[pydantic.BaseModel]) -> bool:
+    """Determine whether any field validator of a model uses other fields' values.
+
+    Such models can't have a field validated on its own, without the values of
+    the fields before it.
+    """
+    return any(_uses_values(field) for field in model.__fields__.values())
+
+
+def split_keys(model: type[pydantic.BaseModel]) -> set[str]:
+    """Get the keys of the fields that can be validated one item at a time."""
+    keys = set()
+    for field in model.__fields__.values():
+        if _is_splittable(field):
+            keys.add(field.alias)
+            if model.__config__.allow_population_by_field_name:
+                keys.add(field.name)
+    return keys
+
+
+def dict_items(
+    data: dict[str, Any], split: Collection[str]
+) -> Iterator[tuple[tuple[str, ...], Any]]:
+    """Get the items of a dictionary in the form :func:`validate_items` takes.
+
+    :param data: The data to validate.
+    :param split: Keys whose dictionary values are split into their items, as
+        with :func:`craft_application.util.safe_yaml_load_items`.
+    """
+    for key, value in data.items():
+        if key in split and isinstance(value, dict):
+            yield (key,), {}
+            for item_key, item in value.items():
+                yield (key, item_key), item
+        else:
+            yield (key,), value
+
+
+def merge_items(
+    model: type[pydantic.BaseModel],
+    data: dict[str, Any],
+    validated: Mapping[str, Mapping[str, Any]],
+) -> dict[str, Any]:
+    """Add already validated items of dictionary fields to a model's data.
+
+    This is for models that can't be validated from a stream of items, which
+    take the already validated items as part of their data instead.
+
+    :param model: The model class the data is for.
+    :param data: The data to add the items to, which isn't modified.
+    :param validated: Items to add, by field name.
+    :returns: The data, with the items added.
+    :raises pydantic.ValidationError: If an item is already in the data.
+    """
+    merged = dict(data)
+    wrappers: list[ErrorWrapper] = []
+    for name, items in validated.items():
+        field = model.__fields__[name]
+        key = field.alias
+        if key not in data and model.__config__.allow_population_by_field_name:
+            key = name if name in data else key
+        existing = merged.get(key)
+        if existing is None:
+            merged[key] = dict(items)
+        elif isinstance(existing, dict):
+            wrappers.extend(
+                duplicate_error(field, item_key)
+                for item_key in items
+                if item_key in existing
+            )
+            merged[key] = {**existing, **items}
+    if wrappers:
+        raise pydantic.ValidationError(wrappers, model)
+    return merged
+
+
+def validate_items(  # noqa: PLR0913 (the options are keyword-only)
+    model: type[_ModelType],
+    items: Iterable[tuple[tuple[str, ...], Any]],
+    *,
+    fail_fast: bool = False,
+    validated: Mapping[str, Mapping[str, Any]] | None = None,
+    lazy: Collection[str] = (),
+    on_error: Callable[[pydantic.ValidationError], Exception] | None = None,
+) -> _ModelType:
+    """Validate a model from a stream of items.
+
+    Iteration stops at the first error if ``fail_fast`` is set. Otherwise
+    every item is read and validated, and errors are reported in the same
+    order as pydantic would report them.
+
+    :param model: The model class to validate, which must be streamable.
+    :param items: Paths and values, as yielded by
+        :func:`craft_application.util.safe_yaml_load_items` with the
+        model's :func:`split_keys`. Paths of one key are values of top-level
+        fields and paths of two keys are items of a dictionary field.
+    :param fail_fast: Whether to stop at the first error.
+    :param validated: Already validated items of dictionary fields, by field
+        name, to add after the items from the stream.
+    :param lazy: Names of dictionary fields whose items are only validated
+        once they are used. The values of these fields are :class:`LazyItems`,
+        unless other fields' validators need them or another field is invalid,
+        in which case every item is validated before returning.
+    :param on_error: Converts errors of lazily validated items into the
+        exceptions raised when they are used.
+    :returns: The validated model.
+    :raises pydantic.ValidationError: If any item is invalid, an already
+        validated item is also in the stream, or a required field is missing.
+    """
+    validator = _ItemValidator(
+        model, fail_fast=fail_fast, validated=validated, lazy=lazy, on_error=on_error
+    )
+    return validator.validate(items)
+
+
+class LazyItems(Dict[Any, Any]):
+    """The items of a dictionary field, each validated when it is first used.
+
+    Deferred items are validated when they are looked up, or when the values
+    of the dictionary are iterated over, and the result is kept, so each item
+    is validated at most once. Using an invalid item raises its error every
+    time. Keys, ``len()`` and ``in`` don't validate anything.
+
+    As with any other dictionary in a model, items that are set aren't
+    validated. Copies are plain dictionaries of validated items.
+
+    :param model: The model class the field belongs to.
+    :param field: The dictionary field.
+    :param on_error: Converts a validation error into the exception to raise.
+        By default, the :class:`pydantic.ValidationError` is raised.
+    """
+
+    def __init__(
+        self,
+        model: type[pydantic.BaseModel],
+        field: ModelField,
+        on_error: Callable[[pydantic.ValidationError], Exception] | None = None,
+    ) -> None:
+        super().__init__()
+        self._model = model
+        self._field = field
+        self._on_error = on_error
+        self._pending: set[Any] = set()
+        self._errors: dict[Any, Any] = {}
+
+    def defer(self, key: Any, item: Any) -> None:
+        """Add an item without validating it, under an already validated key."""
+        super().__setitem__(key, item)
+        self._errors.pop(key, None)
+        self._pending.add(key)
+
+    def validate_all(self) -> None:
+        """Validate every item that hasn't been validated yet.
+
+        :raises pydantic.ValidationError: If any item is invalid, with the errors
+            of every invalid item in order (or the exception from ``on_error``).
+        """
+        wrappers = self.collect_errors()
+        if wrappers:
+            raise self._error(wrappers)
+
+    def collect_errors(self) -> list[Any]:
+        """Validate every item that hasn't been validated yet.
+
+        :returns: The errors of the invalid items, in order.
+        """
+        if self._pending:
+            for key in list(super().__iter__()):
+                if key in self._pending:
+                    self._validate(key)
+        return [self._errors[key] for key in super().__iter__() if key in self._errors]
+
+    def valid_items(self) -> dict[Any, Any]:
+        """Get the valid items, validating every item first."""
+        self.collect_errors()
+        return {key: value for key, value in super().items() if key not in self._errors}
+
+    def __getitem__(self, key: Any) -> Any:
+        if key in self._pending or key in self._errors:
+            self._resolve(key)
+        return super().__getitem__(key)
+
+    def __iter__(self) -> Iterator[Any]:
+        # Overriding this makes dict() and ** use __getitem__ for each item.
+        return super().__iter__()
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self._forget(key)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        self._forget(key)
+        super().__delitem__(key)
+
+    def __eq__(self, other: object) -> bool:
+        self._resolve_all()
+        if isinstance(other, LazyItems):
+            other._resolve_all()
+        return super().__eq__(other)
+
+    def __ne__(self, other: object) -> bool:
+        return not self == other
+
+    def __or__(self, other: Any) -> Any:
+        return self.copy() | other
+
+    def __reduce_ex__(self, protocol: Any) -> Any:
+        return dict, (self.copy(),)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Get an item, validating it first, or a default if it's missing."""
+        return self[key] if key in self else default
+
+    def items(self) -> Any:
+        """Get a view of the items, validating every item first."""
+        self._resolve_all()
+        return super().items()
+
+    def values(self) -> Any:
+        """Get a view of the values, validating every item first."""
+        self._resolve_all()
+        return super().values()
+
+    def copy(self) -> dict[Any, Any]:
+        """Get a plain dictionary of the items, validating every item first."""
+        return dict(self.items())
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        """Set items, as with :meth:`dict.update`, without validating them."""
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        """Get an item, validating it first, or set it to a default if missing."""
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key: Any, *default: Any) -> Any:
+        """Remove an item and return it, validating it first.
+
+        An invalid item raises its error and is kept.
+        """
+        if key in self:
+            self._resolve(key)
+            self._forget(key)
+        return super().pop(key, *default)
+
+    def popitem(self) -> tuple[Any, Any]:
+        """Remove the last item and return it, validating it first."""
+        if not self:
+            raise KeyError("popitem(): dictionary is empty")
+        key = next(reversed(super().keys()))
+        return key, self.pop(key)
+
+    def clear(self) -> None:
+        """Remove every item."""
+        self._pending.clear()
+        self._errors.clear()
+        super().clear()
+
+    def _forget(self, key: Any) -> None:
+        self._pending.discard(key)
+        self._errors.pop(key, None)
+
+    def _resolve(self, key: Any) -> None:
+        """Validate an item if needed, raising its error if it is invalid."""
+        if key in self._pending:
+            self._validate(key)
+        error = self._errors.get(key)
+        if error is not None:
+            raise self._error([error])
+
+    def _resolve_all(self) -> None:
+        if self._pending or self._errors:
+            self.validate_all()
+
+    def _validate(self, key: Any) -> None:
+        """Validate a pending item, keeping its value or its error."""
+        self._pending.discard(key)
+        field = self._field
+        value, error = field.validate(
+            {key: super().__getitem__(key)}, {}, loc=field.alias, cls=self._model
+        )
+        if error:
+            self._errors[key] = error
+        elif isinstance(value, dict):
+            super().__setitem__(key, next(iter(value.values())))
+
+    def _error(self, wrappers: list[Any]) -> Exception:
+        error = pydantic.ValidationError(wrappers, self._model)
+        return error if self._on_error is None else self._on_error(error)
+
+
+class _ItemValidator(Generic[_ModelType]):
+    """Validate the items of a model one at a time."""
+
+    def __init__(  # noqa: PLR0913 (the options are keyword-only)
+        self,
+        model: type[_ModelType],
+        *,
+        fail_fast: bool,
+        validated: Mapping[str, Mapping[str, Any]] | None,
+        lazy: Collection[str] = (),
+        on_error: Callable[[pydantic.ValidationError], Exception] | None = None,
+    ) -> None:
+        self._model = model
+        self._config = model.__config__
+        self._fail_fast = fail_fast
+        self._validated = validated or {}
+        self._lazy = {name for name in lazy if _is_splittable(model.__fields__[name])}
+        self._on_error = on_error
+        self._fields = {field.alias: field for field in model.__fields__.values()}
+        if self._config.allow_population_by_field_name:
+            for field in model.__fields__.values():
+                self._fields.setdefault(field.name, field)
+        self._order = {name: index for index, name in enumerate(model.__fields__)}
+        self._values: dict[str, Any] = {}
+        self._fields_set: set[str] = set()
+        # The key each field's value came from, and values waiting for others.
+        self._keys: dict[str, str] = {}
+        self._deferred: dict[str, Any] = {}
+        # Values given by fields' names when extra values are allowed, which
+        # are extra unless the field's value came from them.
+        self._by_name: dict[str, Any] = {}
+        # The keys of each dictionary field's items, whether valid or not.
+        self._item_keys: dict[str, set[Any]] = {}
+        # Items that were valid and their validated values, by field name and
+        # the identity of the item.
+        self._valid_items: dict[tuple[str, int], tuple[Any, Any]] = {}
+        # Errors, by the position of their field in pydantic's order.
+        self._errors: list[tuple[int, str | None, Any]] = []
+
+    def validate(self, items: Iterable[tuple[tuple[str, ...], Any]]) -> _ModelType:
+        for path, value in items:
+            if len(path) == 1:
+                self._add_field(path[0], value)
+            else:
+                self._add_item(path[0], path[1], value)
+        for name, validated_items in self._validated.items():
+            self._merge(self._model.__fields__[name], validated_items)
+
+        if self._deferred:
+            # Validators that use other fields' values need every item.
+            self._resolve_lazy()
+        for name, value in sorted(
+            self._deferred.items(), key=lambda item: self._order[item[0]]
+        ):
+            field = self._model.__fields__[name]
+            earlier = {
+                other: self._values[other]
+                for other in self._model.__fields__
+                if self._order[other] < self._order[name] and other in self._values
+            }
+            self._store(
+                field, field.validate(value, earlier, loc=field.alias, cls=self._model)
+            )
+
+        for field in self._model.__fields__.values():
+            if field.name in self._keys:
+                continue
+            if field.required:
+                self._fail(
+                    field, ErrorWrapper(pydantic.MissingError(), loc=field.alias)
+                )
+            elif field.validate_always:
+                self._store(
+                    field,
+                    field.validate(
+                        field.get_default(),
+                        self._values,
+                        loc=field.alias,
+                        cls=self._model,
+                    ),
+                )
+            else:
+                self._values[field.name] = field.get_default()
+        self._add_extra_names()
+
+        if self._errors:
+            # Report every error, as if no field had been lazy.
+            self._resolve_lazy()
+            self._errors.sort(key=lambda error: error[0])
+            raise pydantic.ValidationError(
+                [error for _, _, error in self._errors], self._model
+            )
+        return self._model.construct(self._fields_set, **self._values)
+
+    def _add_field(self, key: Any, value: Any) -> None:
+        """Validate the value of a top-level key."""
+        if not isinstance(key, str):
+            # No field or attribute can have this key, whatever the config.
+            error = ErrorWrapper(pydantic.errors.ExtraError(), loc=str(key))
+            self._fail(None, error)
+            return
+        if self._is_name(key):
+            self._by_name[key] = dict(value) if isinstance(value, dict) else value
+        field = self._fields.get(key)
+        if field is None:
+            self._add_extra(key, value)
+            return
+        previous = self._keys.get(field.name)
+        if previous is not None:
+            # pydantic prefers a field's alias, and counts its name as extra.
+            if key != field.alias:
+                self._add_extra(key, value)
+                return
+            self._errors = [error for error in self._errors if error[1] != field.name]
+            self._add_extra(previous, value)
+        self._keys[field.name] = key
+        self._fields_set.add(field.name)
+        self._item_keys[field.name] = set(value) if isinstance(value, dict) else set()
+        if _uses_values(field):
+            self._deferred[field.name] = value
+            return
+        self._store(field, field.validate(value, {}, loc=field.alias, cls=self._model))
+        if field.name in self._lazy and isinstance(self._values.get(field.name), dict):
+            lazy_items = LazyItems(self._model, field, self._on_error)
+            lazy_items.update(self._values[field.name])
+            self._values[field.name] = lazy_items
+
+    def _add_item(self, key: str, item_key: str, item: Any) -> None:
+        """Validate an item of a dictionary field."""
+        field = self._fields[key]
+        by_name = self._by_name.get(key)
+        if isinstance(by_name, dict):
+            by_name[item_key] = item
+        if self._keys.get(field.name) != key:
+            # The field's alias was used as well, and takes precedence.
+            return
+        self._item_keys[field.name].add(item_key)
+        if field.name in self._deferred:
+            self._deferred[field.name][item_key] = item
+            return
+        target = self._values.get(field.name)
+        if isinstance(target, LazyItems) and field.key_field is not None:
+            validated_key, error = field.key_field.validate(
+                item_key, {}, loc=(field.alias, "__key__"), cls=self._model
+            )
+            if not error:
+                target.defer(validated_key, item)
+                return
+        value, error = self._validate_item(field, item_key, item)
+        if error:
+            self._fail(field, error)
+        elif field.name in self._values:
+            self._values[field.name].update(value)
+
+    def _validate_item(
+        self, field: ModelField, item_key: Any, item: Any
+    ) -> tuple[Any, Any]:
+        """Validate an item, reusing the result for an item that was seen before.
+
+        Only the key of a reused item is validated. The reused value is copied,
+        so that items are as independent of each other as if each had been
+        validated.
+        """
+        valid = self._valid_items.get((field.name, id(item)))
+        if valid is not None and valid[0] is item and field.key_field is not None:
+            key, error = field.key_field.validate(
+                item_key, {}, loc=field.alias, cls=self._model
+            )
+            if not error:
+                return {key: copy.copy(valid[1])}, None
+        value, error = field.validate(
+            {item_key: item}, {}, loc=field.alias, cls=self._model
+        )
+        if not error and isinstance(value, dict) and isinstance(item, (dict, list)):
+            # Keeping the item alive ensures that its identity isn't reused.
+            self._valid_items[field.name, id(item)] = (item, next(iter(value.values())))
+        return value, error
+
+    def _merge(self, field: ModelField, items: Mapping[str, Any]) -> None:
+        """Add already validated items to a dictionary field."""
+        if field.name not in self._keys:
+            self._keys[field.name] = field.alias
+            self._fields_set.add(field.name)
+            self._values[field.name] = dict(items)
+            return
+        existing = self._item_keys[field.name]
+        target = self._deferred.get(field.name, self._values.get(field.name))
+        for item_key, item in items.items():
+            if item_key in existing:
+                self._fail(field, duplicate_error(field, item_key))
+            elif isinstance(target, dict):
+                target[item_key] = item
+
+    def _resolve_lazy(self) -> None:
+        """Validate the items of lazy fields now, keeping only the valid ones."""
+        for name, value in self._values.items():
+            if isinstance(value, LazyItems):
+                for error in value.collect_errors():
+                    self._errors.append((self._order[name], name, error))
+                self._values[name] = value.valid_items()
+
+    def _is_name(self, key: str) -> bool:
+        """Determine whether a key is a field's name that may give an extra value."""
+        field = self._model.__fields__.get(key)
+        return (
+            field is not None
+            and field.alias != key
+            and self._config.extra == pydantic.Extra.allow
+        )
+
+    def _add_extra_names(self) -> None:
+        """Set the values given by fields' names that fields didn't use as extra.
+
+        pydantic sets extra values last, even over the values of fields.
+        """
+        for name, value in self._by_name.items():
+            if self._keys.get(name) != name:
+                self._values[name] = value
+                self._fields_set.add(name)
+
+    def _add_extra(self, key: str, value: Any) -> None:
+        extra = self._config.extra
+        if extra == pydantic.Extra.forbid:
+            self._fail(None, ErrorWrapper(pydantic.errors.ExtraError(), loc=key))
+        elif extra == pydantic.Extra.allow and key not in self._model.__fields__:
+            # Extra values for fields' names are set at the end.
+            self._values[key] = value
+            self._fields_set.add(key)
+
+    def _store(self, field: ModelField, result: tuple[Any, Any]) -> None:
+        value, error = result
+        if error:
+            self._values.pop(field.name, None)
+            self._fail(field, error)
+        else:
+            self._values[field.name] = value
+
+    def _fail(self, field: ModelField | None, error: Any) -> None:
+        if field is None:
+            self._errors.append((len(self._order), None, error))
+        else:
+            self._errors.append((self._order[field.name], field.name, error))
+        if self._fail_fast:
+            raise pydantic.ValidationError([error], self._model)
+
+
+def duplicate_error(field: ModelField, key: Any) -> ErrorWrapper:
+    """Get the error for an item of a dictionary field that was given twice."""
+    error = ValueError(f"found duplicate key {key!r}")
+    return ErrorWrapper(error, loc=(field.alias, key))
+
+
+def _is_splittable(field: ModelField) -> bool:
+    """Determine whether a field's items can be validated one at a time."""
+    return (
+        field.shape == SHAPE_DICT
+        and not field.pre_validators
+        and not field.post_validators
+    )
+
+
+def _uses_values(field: ModelField) -> bool:
+    """Determine whether a field's validators use the values of other fields."""
+    for validator in field.class_validators.values():
+        parameters = inspect.signature(validator.func).parameters.values()
+        if any(
+            parameter.name == "values" or parameter.kind == parameter.VAR_KEYWORD
+            for parameter in parameters
+        ):
+            return True
+    return False
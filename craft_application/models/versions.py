@@ -0,0 +1,110 @@
+# This file is part of craft_application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""A sorted index of versions.
+
+Versions are kept sorted by :meth:`VersionStr.sort_key`, alongside their
+keys, so that the newest versions and the versions in a range are found by
+bisecting rather than by comparing every version.
+"""
+from __future__ import annotations
+
+import bisect
+from collections.abc import Iterable, Iterator
+
+from craft_application.models.constraints import VersionKey, VersionStr
+
+
+class VersionIndex:
+    """A collection of versions, sorted in the same order as Debian versions.
+
+    Versions that sort as equal (e.g. ``1.0`` and ``1.00``) are kept in the
+    order they were added.
+
+    :param versions: The initial versions, which needn't be sorted.
+    """
+
+    def __init__(self, versions: Iterable[str] = ()) -> None:
+        pairs = sorted(
+            ((VersionStr.sort_key(version), version) for version in versions),
+            key=lambda pair: pair[0],
+        )
+        self._keys: list[VersionKey] = [key for key, _ in pairs]
+        self._versions: list[str] = [version for _, version in pairs]
+
+    def __len__(self) -> int:
+        return len(self._versions)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._versions)
+
+    def __reversed__(self) -> Iterator[str]:
+        return reversed(self._versions)
+
+    def __contains__(self, version: object) -> bool:
+        return isinstance(version, str) and self._find(version) is not None
+
+    def add(self, version: str) -> None:
+        """Add a version, after any versions that sort as equal to it."""
+        key = VersionStr.sort_key(version)
+        index = bisect.bisect_right(self._keys, key)
+        self._keys.insert(index, key)
+        self._versions.insert(index, version)
+
+    def discard(self, version: str) -> None:
+        """Remove a version, if it is in the index."""
+        index = self._find(version)
+        if index is not None:
+            del self._keys[index]
+            del self._versions[index]
+
+    def latest(self) -> str | None:
+        """Get the newest version, or None if the index is empty."""
+        return self._versions[-1] if self._versions else None
+
+    def between(
+        self,
+        low: str | None = None,
+        high: str | None = None,
+        *,
+        include_low: bool = True,
+        include_high: bool = False,
+    ) -> list[str]:
+        """Get the versions in a range, oldest first.
+
+        :param low: The lowest version, or None for no lower bound.
+        :param high: The highest version, or None for no upper bound.
+        :param include_low: Whether versions equal to ``low`` are included.
+        :param include_high: Whether versions equal to ``high`` are included.
+        :returns: The versions in the range.
+        """
+        start, end = 0, len(self._keys)
+        if low is not None:
+            find_start = bisect.bisect_left if include_low else bisect.bisect_right
+            start = find_start(self._keys, VersionStr.sort_key(low))
+        if high is not None:
+            find_end = bisect.bisect_right if include_high else bisect.bisect_left
+            end = find_end(self._keys, VersionStr.sort_key(high))
+        return self._versions[start:end]
+
+    def _find(self, version: str) -> int | None:
+        """Find the index of a version, or None if it isn't in the index."""
+        key = VersionStr.sort_key(version)
+        start = bisect.bisect_left(self._keys, key)
+        end = bisect.bisect_right(self._keys, key, lo=start)
+        for index in range(start, end):
+            if self._versions[index] == version:
+                return index
+        return None
@@ -15,8 +15,33 @@
 # with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Utilities for craft-application."""
 
-from craft_application.util.yaml import safe_yaml_load
+from craft_application.util.frozen import FrozenDict, freeze, thaw
+from craft_application.util.json import looks_like_json, safe_json_load
+from craft_application.util.yaml import (
+    DEFAULT_YAML_LIMITS,
+    YAML_DELETE,
+    YamlLimits,
+    YamlPosition,
+    YamlPositions,
+    safe_yaml_load,
+    safe_yaml_load_items,
+    safe_yaml_load_keys,
+    safe_yaml_patch,
+)
 
 __all__ = [
+    "DEFAULT_YAML_LIMITS",
+    "FrozenDict",
+    "YAML_DELETE",
+    "YamlLimits",
+    "YamlPosition",
+    "YamlPositions",
+    "freeze",
+    "looks_like_json",
+    "safe_json_load",
     "safe_yaml_load",
+    "safe_yaml_load_items",
+    "safe_yaml_load_keys",
+    "safe_yaml_patch",
+    "thaw",
 ]
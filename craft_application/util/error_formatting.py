@@ -14,11 +14,13 @@
 # You should have received a copy of the GNU Lesser General Public License along
 # with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Helper utilities for formatting error messages."""
-from typing import TYPE_CHECKING, Iterable, List, NamedTuple, Union
+from typing import TYPE_CHECKING, Iterable, List, NamedTuple, Optional, Union
 
 if TYPE_CHECKING:  # pragma: no cover
     from pydantic.error_wrappers import ErrorDict
 
+    from craft_application.util.yaml import YamlPositions
+
 
 class FieldLocationTuple(NamedTuple):
     """A NamedTuple containing a field and a location."""
@@ -69,7 +71,10 @@ def format_pydantic_error(loc: Iterable[Union[str, int]], message: str) -> str:
 
 
 def format_pydantic_errors(
-    errors: "Iterable[ErrorDict]", *, file_name: str = "yaml file"
+    errors: "Iterable[ErrorDict]",
+    *,
+    file_name: str = "yaml file",
+    positions: "Optional[YamlPositions]" = None,
 ) -> str:
     """Format errors.
 
@@ -83,8 +88,17 @@ def format_pydantic_errors(
       reason: <some reason>
     - field: <some field 2>
       reason: <some reason 2>.
+
+    If the positions of the file's values are given, each error is annotated
+    with the file name, line and column it refers to.
     """
-    messages = (format_pydantic_error(error["loc"], error["msg"]) for error in errors)
+    messages: List[str] = []
+    for error in errors:
+        message = format_pydantic_error(error["loc"], error["msg"])
+        position = positions.find(error["loc"]) if positions is not None else None
+        if position is not None:
+            message += f" ({file_name}:{position.line}:{position.column})"
+        messages.append(message)
     return "\n".join((f"Bad {file_name} content:", *messages))
 
 
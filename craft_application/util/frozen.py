@@ -0,0 +1,110 @@
+# This file is part of craft_application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Immutable, hashable versions of plain data."""
+from typing import Any, Dict, FrozenSet, NoReturn, Optional, Tuple, Type
+
+
+class FrozenDict(Dict[Any, Any]):
+    """An immutable, hashable dictionary.
+
+    This is a dict subclass so that it can be passed anywhere a dict is
+    expected for reading, but any attempt to modify it raises a TypeError.
+    Its hash is calculated once, on first use.
+    """
+
+    __slots__ = ("_hash",)
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._hash: Optional[int] = None
+
+    def __hash__(self) -> int:  # type: ignore[override]
+        if self._hash is None:
+            self._hash = hash(frozenset(self.items()))
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({super().__repr__()})"
+
+    def __reduce__(self) -> Tuple[Type["FrozenDict"], Tuple[Dict[Any, Any]]]:
+        return self.__class__, (dict(self),)
+
+    def __copy__(self) -> "FrozenDict":
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "FrozenDict":
+        return self
+
+    def _immutable(self, *args: Any, **kwargs: Any) -> NoReturn:
+        raise TypeError(f"{self.__class__.__name__} object is immutable")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable  # type: ignore[assignment]
+
+
+class _FrozenList(Tuple[Any, ...]):
+    """A tuple that was a list before it was frozen."""
+
+    __slots__ = ()
+
+
+class _FrozenSet(FrozenSet[Any]):
+    """A frozenset that was a set before it was frozen."""
+
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return repr(frozenset(self))
+
+
+def freeze(value: Any) -> Any:
+    """Convert a value and everything in it to an immutable, hashable form.
+
+    Dictionaries become :class:`FrozenDict`, lists become tuples and sets become
+    frozensets. The items of tuples are frozen too. Other values, including
+    named tuples, are returned unchanged.
+    """
+    value_type = type(value)
+    if value_type in (FrozenDict, _FrozenList, _FrozenSet, frozenset):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return _FrozenList(freeze(item) for item in value)
+    if value_type is tuple:
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, set):
+        return _FrozenSet(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Convert a frozen value back to plain, mutable containers.
+
+    This is the reverse of :func:`freeze`: dictionaries become dicts, and the
+    tuples and frozensets that :func:`freeze` made from lists and sets become
+    lists and sets again. Other tuples and frozensets are kept.
+    """
+    value_type = type(value)
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list) or value_type is _FrozenList:
+        return [thaw(item) for item in value]
+    if value_type is tuple:
+        return tuple(thaw(item) for item in value)
+    if value_type is _FrozenSet:
+        return {thaw(item) for item in value}
+    return value
@@ -0,0 +1,173 @@
+# This file is part of craft_application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License along
+# with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""JSON helpers for craft applications.
+
+JSON is (almost) a subset of YAML, so project files may be written as JSON.
+Parsing JSON is much faster than parsing YAML, and the helpers here load JSON
+documents into the same data that :func:`craft_application.util.safe_yaml_load`
+would load them into.
+"""
+import json
+import re
+from typing import Any, Dict, List, NoReturn, TextIO, Tuple, Union
+
+import yaml
+
+from craft_application import errors
+from craft_application.util.yaml import DEFAULT_YAML_LIMITS, YamlLimits, _read_limited
+
+_FLOAT_TAG = "tag:yaml.org,2002:float"
+_RESOLVER = yaml.resolver.Resolver()
+# Strings and other scalars, each of which is a node as YAML counts them.
+_SCALAR = re.compile(r'"(?:[^"\\]|\\.)*"|[^\s,:\[\]{}"]+')
+_SEPARATORS = re.compile(r"[\s,:]+")
+# Characters that can be in valid JSON, but that YAML doesn't allow or reads
+# as line breaks. Of ASCII characters, only tabs and DEL.
+_NOT_YAML_CHARACTER = re.compile("[\t\x7f-\x9f\u2028\u2029\ud800-\udfff\ufffe\uffff]")
+# Escaped surrogate pairs, which YAML doesn't combine into one character.
+_SURROGATE_ESCAPE = re.compile(r"\\u[dD][89abAB]")
+# A key's colon on a line after the key, where YAML doesn't look for it.
+_COLON_ON_NEW_LINE = re.compile(r"\n[ \n]*:")
+# Strings, and the colon after those that are keys.
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"( *:)?')
+# YAML only finds a key's colon within this many characters of its start.
+_MAX_KEY_LENGTH = 1024
+# Text at least half that long without quotes, which a key that long has.
+_LONG_UNQUOTED = re.compile(f'[^"]{{{_MAX_KEY_LENGTH // 2}}}')
+
+
+def _dict_without_duplicates(pairs: List[Tuple[str, Any]]) -> Dict[str, Any]:
+    result = dict(pairs)
+    if len(result) != len(pairs):
+        seen = set()
+        for key, _ in pairs:
+            if key in seen:
+                raise errors.CraftValidationError(
+                    f"JSON document contains a duplicate key {key!r}"
+                )
+            seen.add(key)
+    return result
+
+
+def _yaml_float(text: str) -> Union[float, str]:
+    """Interpret a JSON number with a fraction or exponent as YAML would.
+
+    YAML 1.1 floats need a decimal point and a signed exponent, so numbers such
+    as ``1e5`` are strings when loaded as YAML.
+    """
+    if _RESOLVER.resolve(yaml.ScalarNode, text, (True, False)) == _FLOAT_TAG:
+        return float(text)
+    return text
+
+
+def _reject_constant(text: str) -> NoReturn:
+    raise ValueError(f"{text} is not valid JSON")
+
+
+def _check_limits(text: str, limits: YamlLimits) -> None:
+    """Check a JSON document against the limits of a YAML document.
+
+    The document is checked before it is parsed, so that deeply nested
+    collections can't exhaust the parser's stack. Nodes are counted and their
+    depth measured in the same way as in YAML.
+    """
+    # Each node becomes a character: "s" for a scalar, or a bracket.
+    structure = _SEPARATORS.sub("", _SCALAR.sub("s", text))
+    if limits.max_nodes is not None:
+        nodes = len(structure) - structure.count("]") - structure.count("}")
+        if nodes > limits.max_nodes:
+            _exceeded("number of nodes", limits.max_nodes)
+    if limits.max_depth is not None:
+        depth = 0
+        for node in structure:
+            if node in "]}":
+                depth -= 1
+            elif node in "[{":
+                depth += 1
+                if depth > limits.max_depth:
+                    _exceeded("nesting depth", limits.max_depth)
+            elif depth >= limits.max_depth:
+                _exceeded("nesting depth", limits.max_depth)
+
+
+def _exceeded(name: str, limit: int) -> NoReturn:
+    raise errors.CraftValidationError(
+        f"JSON document exceeds the maximum {name} ({limit})"
+    )
+
+
+def safe_json_load(stream: TextIO, *, limits: YamlLimits = DEFAULT_YAML_LIMITS) -> Any:
+    """Load a JSON document, rejecting duplicate keys.
+
+    Numbers are interpreted the same way as when the document is loaded as
+    YAML, so both give the same result. Non-standard constants such as ``NaN``
+    are rejected. The same resource limits apply as to a YAML document, except
+    those on expanding aliases, which JSON doesn't have.
+
+    :param stream: Any text-like IO object.
+    :param limits: The resource limits to enforce while loading.
+    :returns: The loaded data.
+    :raises ValueError: If the document isn't valid JSON.
+    :raises CraftValidationError: If a mapping contains a duplicate key, or the
+        document exceeds a limit.
+    """
+    content = _read_limited(stream, limits, "JSON")
+    text = content if isinstance(content, str) else content.read()
+    _check_limits(text, limits)
+    try:
+        return json.loads(
+            text,
+            object_pairs_hook=_dict_without_duplicates,
+            parse_float=_yaml_float,
+            parse_constant=_reject_constant,
+        )
+    except RecursionError as err:
+        raise errors.CraftValidationError("JSON document is too deeply nested") from err
+
+
+def looks_like_json(text: str) -> bool:
+    """Guess whether some text is a JSON object that YAML would load the same.
+
+    The guess is made from the text's first character. Valid JSON that YAML
+    would reject or load differently isn't taken for JSON: JSON with tabs or
+    characters that YAML doesn't allow, escaped surrogate pairs, or keys that
+    YAML can't find the colon of.
+    """
+    if text.lstrip()[:1] != "{":
+        return False
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if text.isascii():
+        if "\t" in text or "\x7f" in text:
+            return False
+    elif _NOT_YAML_CHARACTER.search(text):
+        return False
+    if _SURROGATE_ESCAPE.search(text) or _COLON_ON_NEW_LINE.search(text):
+        return False
+    return not any(
+        _has_long_key(line) for line in text.split("\n") if len(line) > _MAX_KEY_LENGTH
+    )
+
+
+def _has_long_key(line: str) -> bool:
+    """Determine whether a line of JSON has a key YAML can't find the colon of."""
+    if '\\"' not in line and not _LONG_UNQUOTED.search(line):
+        return False
+    return any(
+        match.end() - 1 - match.start() > _MAX_KEY_LENGTH
+        for match in _STRING.finditer(line)
+        if match.group(1)
+    )
@@ -14,11 +14,32 @@
 # You should have received a copy of the GNU Lesser General Public License along
 # with this program.  If not, see <http://www.gnu.org/licenses/>.
 """YAML helpers for craft applications."""
-from collections.abc import Hashable
-from typing import Any, Dict, Set, TextIO
+import dataclasses
+import io
+import json
+import re
+from collections.abc import Collection, Hashable, Mapping
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
 
 import yaml
 
+from craft_application import errors
+
 
 def _check_duplicate_keys(node: yaml.Node) -> None:
     """Ensure that the keys in a YAML node are not duplicates."""
@@ -65,21 +86,1125 @@ def _dict_constructor(
         ) from type_error
 
 
+@dataclasses.dataclass(frozen=True)
+class YamlLimits:
+    """Resource limits for loading a YAML document.
+
+    Any limit may be set to ``None`` to disable it.
+
+    :param max_size: The maximum number of characters in the document.
+    :param max_depth: The maximum nesting depth of collections.
+    :param max_nodes: The maximum number of nodes in the document as written.
+    :param max_expanded_nodes: The maximum number of nodes once every alias
+        (including merge keys) has been expanded into a copy of its anchor.
+    """
+
+    max_size: Optional[int] = 16 * 1024 * 1024
+    max_depth: Optional[int] = 100
+    max_nodes: Optional[int] = 1_000_000
+    max_expanded_nodes: Optional[int] = 1_000_000
+
+
+DEFAULT_YAML_LIMITS = YamlLimits()
+
+_MERGE_TAG = "tag:yaml.org,2002:merge"
+
+
+class YamlPosition(NamedTuple):
+    """A 1-based line and column in a YAML document."""
+
+    line: int
+    column: int
+
+
+class YamlPositions(Dict[Tuple[Union[str, int], ...], YamlPosition]):
+    """An index of where each value in a YAML document starts.
+
+    Keys are paths of mapping keys and sequence indices, in the same form as
+    the ``loc`` of a pydantic error. Mapping values are located by their key.
+    """
+
+    def find(self, loc: Iterable[Union[str, int]]) -> Optional[YamlPosition]:
+        """Find the position of a path, or of its closest recorded parent.
+
+        :param loc: A path, e.g. the ``loc`` of a pydantic error.
+        :returns: The position, or None if nothing on the path was recorded.
+        """
+        path = tuple(part for part in loc if part != "__root__")
+        for end in range(len(path), -1, -1):
+            position = self.get(path[:end])
+            if position is not None:
+                return position
+        return None
+
+    def record(
+        self,
+        node: yaml.Node,
+        path: Tuple[Union[str, int], ...] = (),
+        *,
+        visited: Optional[Set[yaml.Node]] = None,
+    ) -> None:
+        """Record the positions of a composed document's values.
+
+        Each node is only descended into once, so values within an alias are
+        located by the alias's key (or, in a sequence, by its anchor) rather
+        than being recorded again for every alias.
+
+        :param node: The composed node to record.
+        :param path: The path of the node within its document.
+        :param visited: Nodes that were already recorded, e.g. by earlier calls
+            for other parts of the same document. Nodes recorded by this call
+            are added to it.
+        """
+        self.setdefault(path, _position(node.start_mark))
+        self._record_children(node, path, set() if visited is None else visited)
+
+    def _record_children(
+        self,
+        node: yaml.Node,
+        path: Tuple[Union[str, int], ...],
+        visited: Set[yaml.Node],
+    ) -> None:
+        if node in visited:
+            return
+        visited.add(node)
+        if isinstance(node, yaml.SequenceNode):
+            for index, item in enumerate(node.value):
+                self.setdefault((*path, index), _position(item.start_mark))
+                self._record_children(item, (*path, index), visited)
+        elif isinstance(node, yaml.MappingNode):
+            for key_node, value_node in _mapping_pairs(node):
+                if not isinstance(key_node, yaml.ScalarNode):
+                    continue
+                child = (*path, key_node.value)
+                # Explicit keys come first, so they take priority over merged ones.
+                self.setdefault(child, _position(key_node.start_mark))
+                self._record_children(value_node, child, visited)
+
+
+def _position(mark: yaml.Mark) -> YamlPosition:
+    return YamlPosition(mark.line + 1, mark.column + 1)
+
+
+def _mapping_pairs(node: yaml.MappingNode) -> List[Tuple[yaml.Node, yaml.Node]]:
+    """Get a mapping's pairs, followed by the pairs of any mappings merged in."""
+    pairs = [pair for pair in node.value if pair[0].tag != _MERGE_TAG]
+    for key_node, value_node in node.value:
+        if key_node.tag != _MERGE_TAG:
+            continue
+        if isinstance(value_node, yaml.SequenceNode):
+            sources = value_node.value
+        else:
+            sources = [value_node]
+        for source in sources:
+            if isinstance(source, yaml.MappingNode):
+                pairs.extend(source.value)
+    return pairs
+
+
 class _SafeYamlLoader(yaml.SafeLoader):
-    def __init__(self, stream: TextIO) -> None:
+    """A safe loader that rejects duplicate keys and enforces resource limits.
+
+    A loader holds the state of parsing a single stream, so each load needs its
+    own. Its constructors are registered once, below the class, as that
+    changes a table shared by every instance.
+    """
+
+    def __init__(
+        self,
+        stream: Union[TextIO, str],
+        limits: YamlLimits = DEFAULT_YAML_LIMITS,
+        positions: Optional[YamlPositions] = None,
+    ) -> None:
         super().__init__(stream)
 
-        self.add_constructor(
-            yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, _dict_constructor
+        self._limits = limits
+        self._positions = positions
+        self._depth = 0
+        self._node_count = 0
+        self._expanded_count = 0
+        # The expanded size of each anchored node, and a stack of the expanded
+        # sizes of the children of each collection currently being composed.
+        self._anchor_sizes: Dict[str, int] = {}
+        self._size_stack: List[int] = [0]
+        # Nodes whose positions were recorded and mappings that were flattened,
+        # so that anchored nodes are only processed once however often they're
+        # used.
+        self._recorded: Set[yaml.Node] = set()
+        self._flattened: Set[yaml.Node] = set()
+
+    def construct_document(self, node: yaml.Node) -> Any:
+        """Construct a document, first recording its positions if requested."""
+        if self._positions is not None:
+            self._positions.record(node, visited=self._recorded)
+        return super().construct_document(node)
+
+    def flatten_mapping(self, node: yaml.MappingNode) -> None:
+        """Merge the mappings of a mapping's ``<<`` keys into it.
+
+        PyYAML flattens a mapping again each time it is merged into another, so
+        an anchor merged into every part would be flattened once per part.
+        """
+        if node in self._flattened:
+            return
+        self._flattened.add(node)
+        super().flatten_mapping(node)
+
+    def compose_node(self, parent: Optional[yaml.Node], index: Any) -> yaml.Node:
+        """Compose a node, enforcing the loader's resource limits."""
+        if self.check_event(yaml.AliasEvent):
+            event = self.peek_event()
+            node = self._compose_node(parent, index)
+            # Aliases of a node that is still being composed (recursive
+            # structures) can't be expanded, so they count as a single node.
+            size = self._anchor_sizes.get(event.anchor, 1)
+            self._size_stack[-1] += size
+            self._count_expanded(size, event.start_mark)
+            return node
+
+        self._enter_node()
+        anchor = self.peek_event().anchor
+        self._size_stack.append(0)
+        node = self._compose_node(parent, index)
+        size = 1 + self._size_stack.pop()
+        self._depth -= 1
+        if anchor is not None:
+            self._anchor_sizes[anchor] = size
+        self._size_stack[-1] += size
+        self._count_expanded(1, node.start_mark)
+        return node
+
+    def _compose_node(self, parent: Optional[yaml.Node], index: Any) -> yaml.Node:
+        """Compose a node with PyYAML, which always gives one at this point."""
+        node = super().compose_node(parent, index)
+        if node is None:  # pragma: no cover
+            raise yaml.composer.ComposerError(None, None, "expected a node")
+        return node
+
+    def fetch_flow_collection_start(self, TokenClass: Any) -> None:  # noqa: N803
+        """Scan the start of a flow collection, enforcing the depth limit.
+
+        The scanner looks ahead for keys in flow collections, so deeply nested
+        ones are slow to scan long before they are composed.
+        """
+        limit = self._limits.max_depth
+        if limit is not None and self.flow_level >= limit:
+            self._exceeded("nesting depth", limit, self.get_mark())
+        super().fetch_flow_collection_start(TokenClass)
+
+    def load_part(self, text: str, depth: int) -> Any:
+        """Load part of a changed version of this loader's document.
+
+        The part's nodes count towards this loader's limits, as if they were
+        added to its document at a depth (where the document itself is 1).
+
+        :raises CraftValidationError: If the limits are exceeded.
+        """
+        limits = self._limits
+        part_limits = YamlLimits(
+            max_size=None,
+            max_depth=_left(limits.max_depth, depth - 1),
+            max_nodes=_left(limits.max_nodes, self._node_count),
+            max_expanded_nodes=_left(limits.max_expanded_nodes, self._expanded_count),
+        )
+        loader = type(self)(text, part_limits)
+        try:
+            data = loader.get_single_data()
+        finally:
+            loader.dispose()
+        self._node_count += loader._node_count
+        self._expanded_count += loader._expanded_count
+        return data
+
+    def _enter_node(self) -> None:
+        """Count a new node, checking the depth and node count limits."""
+        limits = self._limits
+        self._depth += 1
+        if limits.max_depth is not None and self._depth > limits.max_depth:
+            self._exceeded("nesting depth", limits.max_depth)
+        self._node_count += 1
+        if limits.max_nodes is not None and self._node_count > limits.max_nodes:
+            self._exceeded("number of nodes", limits.max_nodes)
+
+    def _count_expanded(self, count: int, mark: yaml.Mark) -> None:
+        """Count nodes in the document once aliases are expanded."""
+        self._expanded_count += count
+        limit = self._limits.max_expanded_nodes
+        if limit is not None and self._expanded_count > limit:
+            self._exceeded("number of nodes after expanding aliases", limit, mark)
+
+    def _exceeded(
+        self, name: str, limit: int, mark: Optional[yaml.Mark] = None
+    ) -> None:
+        if mark is None:
+            mark = self.peek_event().start_mark
+        raise errors.CraftValidationError(
+            f"YAML document exceeds the maximum {name} ({limit}) "
+            f"at line {mark.line + 1}, column {mark.column + 1}"
         )
 
 
-def safe_yaml_load(stream: TextIO) -> Any:
+def _left(limit: Optional[int], used: int) -> Optional[int]:
+    """Get how much of a limit is left, if it's set."""
+    return None if limit is None else limit - used
+
+
+_SafeYamlLoader.add_constructor(
+    yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, _dict_constructor
+)
+
+
+_FastSafeYamlLoader: Type[_SafeYamlLoader] = _SafeYamlLoader
+
+if yaml.__with_libyaml__:
+    from yaml._yaml import CParser
+
+    class _CSafeYamlLoader(CParser, _SafeYamlLoader):  # type: ignore[misc]
+        """A safe loader that scans and parses with libyaml.
+
+        Nodes are still composed in Python, so that the resource limits are
+        enforced, but scanning is several times faster. Errors in the syntax
+        of the document are described by libyaml, so their messages differ.
+        """
+
+        # CParser can also compose nodes, which must be left to the Composer.
+        get_single_node = yaml.composer.Composer.get_single_node  # type: ignore[assignment]
+        get_node = yaml.composer.Composer.get_node  # type: ignore[assignment]
+        check_node = yaml.composer.Composer.check_node  # type: ignore[assignment]
+
+        def __init__(
+            self,
+            stream: Union[TextIO, str],
+            limits: YamlLimits = DEFAULT_YAML_LIMITS,
+            positions: Optional[YamlPositions] = None,
+        ) -> None:
+            CParser.__init__(self, stream)
+            _SafeYamlLoader.__init__(self, stream, limits, positions)
+
+    _FastSafeYamlLoader = _CSafeYamlLoader
+
+
+def _read_limited(
+    stream: TextIO, limits: YamlLimits, kind: str = "YAML"
+) -> Union[TextIO, str]:
+    """Read a stream, ensuring it doesn't exceed the maximum size."""
+    if limits.max_size is None:
+        return stream
+    content = stream.read(limits.max_size + 1)
+    if len(content) > limits.max_size:
+        raise errors.CraftValidationError(
+            f"{kind} document exceeds the maximum size ({limits.max_size} characters)"
+        )
+    return content
+
+
+def safe_yaml_load(
+    stream: TextIO,
+    *,
+    limits: YamlLimits = DEFAULT_YAML_LIMITS,
+    positions: Optional[YamlPositions] = None,
+) -> Any:
     """Equivalent to pyyaml's safe_load function, but constraining duplicate keys.
 
+    The loader also enforces resource limits, so that small malicious documents
+    (e.g. "billion laughs" alias bombs) can't exhaust memory or CPU.
+
+    This is thread-safe: each call parses with a loader of its own, and nothing
+    shared between loaders is modified while loading. A stream (and a
+    ``positions`` index) must not be shared by concurrent calls, though.
+
     :param stream: Any text-like IO object.
+    :param limits: The resource limits to enforce while loading.
+    :param positions: If given, the position of each value in the document is
+        recorded into it while loading.
     :returns: A dict object mapping the yaml.
+    :raises CraftValidationError: If the document exceeds a limit.
+    """
+    loader = _SafeYamlLoader(_read_limited(stream, limits), limits, positions)
+    try:
+        return loader.get_single_data()
+    finally:
+        loader.dispose()
+
+
+def safe_yaml_load_keys(
+    stream: TextIO,
+    keys: "Collection[str]",
+    *,
+    superseded_by: "Optional[Mapping[str, str]]" = None,
+    limits: YamlLimits = DEFAULT_YAML_LIMITS,
+) -> Dict[str, Any]:
+    """Load only some top-level keys of a YAML mapping.
+
+    Values of other keys are parsed (so that anchors and syntax errors behave as
+    they would with :func:`safe_yaml_load`) but are not constructed. Reading of
+    the stream stops as soon as every requested key has been found.
+
+    :param stream: Any text-like IO object.
+    :param keys: The top-level keys to load.
+    :param superseded_by: A mapping of keys to other keys that make them
+        unnecessary, e.g. a field name to its alias. Once the superseding key is
+        found, the stream is no longer searched for the superseded key.
+    :param limits: The resource limits to enforce while loading.
+    :returns: A dict containing the requested keys that exist in the document.
+    :raises TypeError: If the document is empty or not a mapping.
+    :raises CraftValidationError: If the document exceeds a limit.
+    """
+    loader = _SafeYamlLoader(_read_limited(stream, limits), limits)
+    try:
+        return _load_keys(loader, set(keys), superseded_by or {})
+    finally:
+        loader.dispose()
+
+
+def safe_yaml_load_items(
+    stream: TextIO,
+    *,
+    split: "Collection[str]" = (),
+    limits: YamlLimits = DEFAULT_YAML_LIMITS,
+    positions: Optional[YamlPositions] = None,
+) -> Iterator[Tuple[Tuple[Any, ...], Any]]:
+    """Load a YAML mapping one item at a time.
+
+    Each top-level item is yielded as soon as its value has been parsed, as a
+    path of keys and the value, so that it can be used before the rest of the
+    document is read. Items merged in with ``<<`` are yielded last, unless they
+    were overridden.
+
+    :param stream: Any text-like IO object.
+    :param split: Top-level keys whose values are themselves yielded one item
+        at a time. If such a value is a mapping, it is first yielded as an
+        empty dict and then each of its items is yielded with a two-key path.
+        Mappings with an anchor are yielded whole.
+    :param limits: The resource limits to enforce while loading.
+    :param positions: If given, the position of each value in the document is
+        recorded into it while loading.
+    :returns: An iterator of paths and values.
+    :raises TypeError: If the document is empty or not a mapping.
+    :raises CraftValidationError: If the document exceeds a limit.
     """
-    # Silencing S506 ("probable use of unsafe loader") because we override it by using
-    # our own safe loader.
-    return yaml.load(stream, Loader=_SafeYamlLoader)  # noqa: S506
+    loader = _SafeYamlLoader(_read_limited(stream, limits), limits, positions)
+    try:
+        yield from _load_items(loader, set(split))
+    finally:
+        loader.dispose()
+
+
+def _load_items(
+    loader: _SafeYamlLoader, split: Set[str]
+) -> Iterator[Tuple[Tuple[Any, ...], Any]]:
+    """Load the items of a document's top-level mapping from a loader."""
+    loader.get_event()  # StreamStartEvent
+    if loader.check_event(yaml.StreamEndEvent):
+        raise TypeError("YAML document is empty")
+    document_event = loader.get_event()
+    if not loader.check_event(yaml.MappingStartEvent):
+        # Parse the rest of the document, so that syntax errors take priority.
+        loader.compose_node(None, None)
+        raise TypeError("YAML document is not a mapping")
+
+    yield from _load_mapping_items(loader, (), split)
+    loader.get_event()  # DocumentEndEvent
+    if not loader.check_event(yaml.StreamEndEvent):
+        raise yaml.composer.ComposerError(
+            "expected a single document in the stream",
+            document_event.start_mark,
+            "but found another document",
+            loader.get_event().start_mark,
+        )
+
+
+def _load_mapping_items(
+    loader: _SafeYamlLoader, path: Tuple[Any, ...], split: Set[str]
+) -> Iterator[Tuple[Tuple[Any, ...], Any]]:
+    """Load the items of the mapping that starts at the loader's next event."""
+    mapping_event = loader.get_event()
+    # The mapping isn't composed as a node, but still counts towards limits.
+    loader._enter_node()
+    loader._count_expanded(1, mapping_event.start_mark)
+    positions = loader._positions
+    if positions is not None:
+        positions.setdefault(path, _position(mapping_event.start_mark))
+
+    merged: Dict[str, Any] = {}
+    seen: Set[Any] = set()
+    while not loader.check_event(yaml.MappingEndEvent):
+        key_node = loader.compose_node(None, None)
+        if key_node.tag == _MERGE_TAG:
+            value_node = loader.compose_node(None, None)
+            merged.update(_merged_items(loader, value_node))
+            continue
+
+        key = loader.construct_object(key_node, deep=True)
+        if not isinstance(key, Hashable):
+            raise yaml.constructor.ConstructorError(
+                "while constructing a mapping",
+                mapping_event.start_mark,
+                "found unhashable key",
+                key_node.start_mark,
+            )
+        if key in seen:
+            raise yaml.constructor.ConstructorError(
+                "while constructing a mapping",
+                mapping_event.start_mark,
+                f"found duplicate key {key!r}",
+                mapping_event.start_mark,
+            )
+        seen.add(key)
+        child: Tuple[Any, ...] = (*path, key)
+        # Errors for keys that aren't strings are located by the key's text.
+        location = (*path, key if isinstance(key, str) else str(key))
+        if positions is not None:
+            positions.setdefault(location, _position(key_node.start_mark))
+
+        event = loader.peek_event()
+        if (
+            key in split
+            and isinstance(event, yaml.MappingStartEvent)
+            and event.anchor is None
+            and event.tag is None
+        ):
+            yield child, {}
+            yield from _load_mapping_items(loader, child, set())
+            continue
+
+        value_node = loader.compose_node(None, None)
+        if positions is not None:
+            positions.record(value_node, location, visited=loader._recorded)
+        yield child, loader.construct_object(value_node, deep=True)
+
+    loader.get_event()  # MappingEndEvent
+    loader._depth -= 1
+    for key, value in merged.items():
+        if key not in seen:
+            yield (*path, key), value
+
+
+def _load_keys(
+    loader: _SafeYamlLoader, wanted: Set[str], superseded_by: "Mapping[str, str]"
+) -> Dict[str, Any]:
+    """Load the wanted top-level keys from a loader's event stream."""
+    loader.get_event()  # StreamStartEvent
+    if loader.check_event(yaml.StreamEndEvent):
+        raise TypeError("YAML document is empty")
+    loader.get_event()  # DocumentStartEvent
+    if not loader.check_event(yaml.MappingStartEvent):
+        raise TypeError("YAML document is not a mapping")
+    mapping_event = loader.get_event()
+    # The root mapping isn't composed as a node, but still counts towards limits.
+    loader._enter_node()
+    loader._count_expanded(1, mapping_event.start_mark)
+
+    result: Dict[str, Any] = {}
+    merged: Dict[str, Any] = {}
+    seen: Set[Any] = set()
+    while wanted and not loader.check_event(yaml.MappingEndEvent):
+        key_node = loader.compose_node(None, None)
+        value_node = loader.compose_node(None, None)
+        try:
+            if key_node.value in seen:
+                raise yaml.constructor.ConstructorError(
+                    "while constructing a mapping",
+                    mapping_event.start_mark,
+                    f"found duplicate key {key_node.value!r}",
+                    mapping_event.start_mark,
+                )
+            seen.add(key_node.value)
+        except TypeError:  # pragma: no cover
+            # Ignore errors for malformed inputs that will be caught below.
+            pass
+
+        if key_node.tag == _MERGE_TAG:
+            # Merged keys have a lower priority than explicit ones, so they can
+            # only be used once the whole mapping has been read.
+            merged.update(_merged_items(loader, value_node, wanted))
+            continue
+
+        key = loader.construct_object(key_node, deep=True)
+        if not isinstance(key, Hashable):
+            raise yaml.constructor.ConstructorError(
+                "while constructing a mapping",
+                mapping_event.start_mark,
+                "found unhashable key",
+                key_node.start_mark,
+            )
+        # Only string keys can be wanted, as they're the names of fields.
+        if isinstance(key, str) and key in wanted:
+            result[key] = loader.construct_object(value_node, deep=True)
+            wanted.discard(key)
+            wanted.difference_update(
+                old for old, new in superseded_by.items() if new == key
+            )
+
+    for key in wanted & merged.keys():
+        result[key] = merged[key]
+    return result
+
+
+def _merged_items(
+    loader: _SafeYamlLoader, node: yaml.Node, wanted: Optional[Set[str]] = None
+) -> Dict[str, Any]:
+    """Get the wanted (by default, all) items from the value of a merge key."""
+    sources = node.value if isinstance(node, yaml.SequenceNode) else [node]
+    items: Dict[str, Any] = {}
+    # Earlier mappings in a merge sequence take precedence over later ones.
+    for source in reversed(sources):
+        if not isinstance(source, yaml.MappingNode):
+            raise yaml.constructor.ConstructorError(
+                "while constructing a mapping",
+                node.start_mark,
+                f"expected a mapping for merging, but found {source.id}",
+                source.start_mark,
+            )
+        loader.flatten_mapping(source)
+        for key_node, value_node in source.value:
+            key = loader.construct_object(key_node, deep=True)
+            if wanted is None or key in wanted:
+                items[key] = loader.construct_object(value_node, deep=True)
+    return items
+
+
+class _Delete:
+    """The type of :data:`YAML_DELETE`."""
+
+    def __repr__(self) -> str:
+        return "YAML_DELETE"
+
+
+YAML_DELETE: Any = _Delete()
+"""A value for :func:`safe_yaml_patch` that removes a key from its mapping."""
+
+_NULL_TAG = "tag:yaml.org,2002:null"
+# An alias as written in a document, after the separator that precedes it.
+_ALIAS = re.compile(r"[\s:,\-\[]*\*[^\s,\[\]{}]+")
+# The start of a node with an anchor, possibly after a tag.
+_ANCHORED = re.compile(r"(?:!\S*\s+)?&")
+
+
+class _Edit(NamedTuple):
+    """A replacement of the text between two indices of a document."""
+
+    start: int
+    end: int
+    text: str
+
+
+class _Region(NamedTuple):
+    """The text of consecutive entries of a block mapping, as lines of a document.
+
+    ``path`` holds the keys of the mapping, and ``keys`` the keys of the
+    entries, including any keys added after them.
+    """
+
+    start: int
+    end: int
+    path: Tuple[str, ...]
+    keys: FrozenSet[str]
+
+
+def safe_yaml_patch(
+    text: str,
+    changes: "Mapping[Tuple[str, ...], Any]",
+    *,
+    limits: YamlLimits = DEFAULT_YAML_LIMITS,
+) -> str:
+    """Change values in a YAML mapping, without rewriting the rest of its text.
+
+    Only the text of the changed values is replaced, so comments, quoting and
+    the order of keys are kept everywhere else. New keys are added after the
+    last key of their mapping, and keys whose mapping doesn't exist yet are
+    added along with it.
+
+    Values that are aliases or have an anchor (and values within them) can't be
+    changed, as that would also change or break the other uses of the anchor.
+    The patched document is checked to have exactly the changed values. As the
+    rest of its text is unchanged, this only loads the changed entries of each
+    mapping again, unless they can't be loaded on their own.
+
+    :param text: The YAML document, which must contain a mapping.
+    :param changes: The new values, by their path of mapping keys. A value of
+        :data:`YAML_DELETE` removes its key.
+    :param limits: The resource limits to enforce while loading the document.
+    :returns: The patched document.
+    :raises TypeError: If the document is empty or not a mapping.
+    :raises ValueError: If a change can't be made.
+    :raises CraftValidationError: If the document exceeds a limit.
+    """
+    loader = _FastSafeYamlLoader(_read_limited(io.StringIO(text), limits), limits)
+    try:
+        root = loader.get_single_node()
+        if root is None:
+            raise TypeError("YAML document is empty")
+        if not isinstance(root, yaml.MappingNode):
+            raise TypeError("YAML document is not a mapping")
+        patcher = _Patcher(text)
+        edits = patcher.plan(root, changes)
+        regions = patcher.regions()
+        # Constructing merges mappings into the nodes, so this must come last.
+        expected = loader.construct_document(root)
+        patched = _apply_edits(text, edits)
+        for path, value in changes.items():
+            _apply_change(expected, path, value)
+        if (
+            regions is not None
+            and (limits.max_size is None or len(patched) <= limits.max_size)
+            and _regions_match(loader, text, edits, regions, expected)
+        ):
+            return patched
+    finally:
+        loader.dispose()
+
+    loader = _FastSafeYamlLoader(_read_limited(io.StringIO(patched), limits), limits)
+    try:
+        actual = loader.get_single_data()
+    finally:
+        loader.dispose()
+    if actual != expected:
+        raise ValueError(
+            "The changes can't be made to the YAML document without changing "
+            "other values"
+        )
+    return patched
+
+
+class _Patcher:
+    """Plans the edits that make changes to a composed YAML document."""
+
+    def __init__(self, text: str) -> None:
+        self._text = text
+        first_newline = text.find("\n")
+        crlf = first_newline > 0 and text[first_newline - 1] == "\r"
+        self._newline = "\r\n" if crlf else "\n"
+        # The key, the entry and the path of keys of each value on a changed path.
+        self._keys: Dict[yaml.Node, Optional[yaml.Node]] = {}
+        self._entries: Dict[yaml.Node, Tuple[yaml.MappingNode, int]] = {}
+        self._paths: Dict[yaml.Node, Tuple[str, ...]] = {}
+        # The entries of block mappings that contain the edits, by mapping, or
+        # None if an edit isn't in one.
+        self._touched: Optional[Dict[yaml.MappingNode, Set[int]]] = {}
+        self._removals: Dict[yaml.MappingNode, List[int]] = {}
+        self._additions: Dict[yaml.Node, Dict[str, Any]] = {}
+        self._edits: List[_Edit] = []
+
+    def plan(
+        self, root: yaml.MappingNode, changes: "Mapping[Tuple[str, ...], Any]"
+    ) -> List[_Edit]:
+        self._keys[root] = None
+        self._paths[root] = ()
+        for path, value in changes.items():
+            self._plan_change(root, path, value)
+        for mapping, indices in self._removals.items():
+            self._remove(mapping, indices)
+        for node, items in self._additions.items():
+            self._add(node, items)
+        if self._newline == "\n":
+            return self._edits
+        # New text is written with the document's own line breaks.
+        return [
+            edit._replace(text=edit.text.replace("\n", self._newline))
+            for edit in self._edits
+        ]
+
+    def _plan_change(
+        self, root: yaml.MappingNode, path: Tuple[str, ...], value: Any
+    ) -> None:
+        if not path or not all(isinstance(key, str) for key in path):
+            raise ValueError(f"Invalid path for a YAML change: {path!r}")
+        node: yaml.Node = root
+        for depth, key in enumerate(path):
+            if _is_null(node):
+                # An empty value, e.g. "parts:", becomes a mapping.
+                if value is not YAML_DELETE:
+                    self._add_items(node, path[depth:], value)
+                return
+            if not isinstance(node, yaml.MappingNode):
+                raise ValueError(
+                    f"Can't change {_dotted(path)}: "
+                    f"{_dotted(path[:depth]) or 'the document'} is not a mapping"
+                )
+            index = _find_key(node, key)
+            if index is None:
+                if value is not YAML_DELETE:
+                    self._add_items(node, path[depth:], value)
+                return
+            key_node, value_node = node.value[index]
+            self._check_unshared(key_node, value_node, path[: depth + 1])
+            if depth == len(path) - 1:
+                if value is YAML_DELETE:
+                    self._removals.setdefault(node, []).append(index)
+                else:
+                    self._edits.append(self._replace(key_node, value_node, value))
+                    self._touch(node, index)
+                return
+            self._keys[value_node] = key_node
+            self._entries[value_node] = (node, index)
+            self._paths[value_node] = path[: depth + 1]
+            node = value_node
+
+    def _add_items(self, node: yaml.Node, path: Tuple[str, ...], value: Any) -> None:
+        """Add a value to a mapping, creating any mappings missing from its path."""
+        items = self._additions.setdefault(node, {})
+        for key in path[:-1]:
+            nested = items.get(key)
+            if not isinstance(nested, dict):
+                nested = items[key] = {}
+            items = nested
+        items[path[-1]] = value
+
+    def _check_unshared(
+        self, key_node: yaml.Node, value_node: yaml.Node, path: Tuple[str, ...]
+    ) -> None:
+        start = value_node.start_mark.index
+        if start < key_node.end_mark.index:
+            raise ValueError(f"Can't change {_dotted(path)}: its value is an alias")
+        if _ANCHORED.match(self._text, start):
+            raise ValueError(f"Can't change {_dotted(path)}: its value has an anchor")
+
+    def _replace(self, key_node: yaml.Node, value_node: yaml.Node, value: Any) -> _Edit:
+        """Replace the value of a key."""
+        text = self._text
+        start = value_node.start_mark.index
+        end = self._end(value_node, key_node.end_mark.index)
+        block = _is_block(value_node) or (_is_null(value_node) and start == end)
+        if block and isinstance(value, (dict, list)) and value:
+            indent = key_node.start_mark.column + 2
+            first_line = self._line_end(key_node.end_mark.index)
+            prefix = "" if text[first_line - 1 : first_line] == "\n" else "\n"
+            return _Edit(
+                first_line, self._line_end(end), prefix + _dump_block(value, indent)
+            )
+        if _is_block(value_node):
+            colon = text.index(":", key_node.end_mark.index)
+            return _Edit(colon + 1, self._line_end(end), f" {_dump_inline(value)}\n")
+
+        replacement = _dump_inline(value)
+        if text[start - 1 : start] == ":":
+            replacement = " " + replacement
+        if end > start and text[end - 1] == "\n":
+            replacement += "\n"
+        return _Edit(start, end, replacement)
+
+    def _remove(self, node: yaml.MappingNode, indices: List[int]) -> None:
+        """Remove keys from a mapping."""
+        removed = set(indices)
+        pairs = node.value
+        if len(removed) == len(pairs) and node not in self._additions:
+            parent_key = self._keys[node]
+            if parent_key is None:
+                raise ValueError("Can't remove every key of the YAML document")
+            self._edits.append(self._replace(parent_key, node, {}))
+            self._touch(*self._entries[node])
+            return
+
+        for index in removed:
+            self._touch(node, index)
+        if not _is_block(node):
+            self._remove_flow(node, removed)
+            return
+        for index in sorted(removed):
+            key_node, value_node = pairs[index]
+            key_start = key_node.start_mark.index
+            line_start = self._text.rfind("\n", 0, key_start) + 1
+            if self._text[line_start:key_start].strip():
+                raise ValueError(
+                    f"Can't remove {key_node.value!r}: it shares a line with "
+                    "other values"
+                )
+            end = self._end(value_node, key_node.end_mark.index)
+            self._edits.append(_Edit(line_start, self._line_end(end), ""))
+
+    def _remove_flow(self, node: yaml.MappingNode, removed: Set[int]) -> None:
+        """Remove keys from a flow mapping, along with their commas."""
+        pairs = node.value
+        kept = [index for index in range(len(pairs)) if index not in removed]
+        last_kept = kept[-1]
+        for index in sorted(removed):
+            if index < last_kept:
+                # Remove up to the next key, including the comma.
+                end = pairs[index + 1][0].start_mark.index
+                self._edits.append(_Edit(pairs[index][0].start_mark.index, end, ""))
+        if last_kept < len(pairs) - 1:
+            # Remove every key after the last one kept, including its comma.
+            key_node, value_node = pairs[last_kept]
+            start = self._end(value_node, key_node.end_mark.index)
+            key_node, value_node = pairs[-1]
+            end = self._end(value_node, key_node.end_mark.index)
+            self._edits.append(_Edit(start, end, ""))
+
+    def _add(self, node: yaml.Node, items: Dict[str, Any]) -> None:
+        """Add keys to a mapping, or to an empty value."""
+        if _is_null(node):
+            parent_key = self._keys[node]
+            assert parent_key is not None  # noqa: S101 (only mappings are roots)
+            self._edits.append(self._replace(parent_key, node, items))
+            self._touch(*self._entries[node])
+            return
+
+        pairs = node.value
+        if pairs:
+            self._touch(node, len(pairs) - 1)
+        elif node in self._entries:
+            self._touch(*self._entries[node])
+        else:
+            self._touched = None
+        if _is_block(node):
+            indent = pairs[0][0].start_mark.column
+            end = self._line_end(self._end(node, node.start_mark.index))
+            text = "".join(
+                _dump_item(key, value, indent) for key, value in items.items()
+            )
+            if end == len(self._text) and not self._text.endswith("\n"):
+                text = "\n" + text
+            self._edits.append(_Edit(end, end, text))
+            return
+
+        text = ", ".join(
+            f"{_dump_inline(key)}: {_dump_inline(value)}"
+            for key, value in items.items()
+        )
+        if pairs:
+            key_node, value_node = pairs[-1]
+            end = self._end(value_node, key_node.end_mark.index)
+            self._edits.append(_Edit(end, end, ", " + text))
+        else:
+            end = node.end_mark.index - 1  # Before the closing brace.
+            self._edits.append(_Edit(end, end, text))
+
+    def regions(self) -> Optional[List[_Region]]:
+        """Find the text of the block mapping entries that contain every edit.
+
+        Only the entries of mappings without merge keys that start on lines of
+        their own are found, as other entries can't be loaded on their own.
+
+        :returns: The regions, in order, or ``None`` if they can't be found.
+        """
+        if self._touched is None:
+            return None
+        regions: List[_Region] = []
+        for mapping, indices in self._touched.items():
+            if any(key_node.tag == _MERGE_TAG for key_node, _ in mapping.value):
+                return None
+            added = self._additions.get(mapping, {}).keys()
+            for index in indices:
+                key_node, value_node = mapping.value[index]
+                start = self._text.rfind("\n", 0, key_node.start_mark.index) + 1
+                if not isinstance(key_node, yaml.ScalarNode) or self._text[
+                    start : key_node.start_mark.index
+                ].strip(" "):
+                    return None
+                end = self._line_end(self._end(value_node, key_node.end_mark.index))
+                keys = frozenset((key_node.value, *added))
+                regions.append(_Region(start, end, self._paths[mapping], keys))
+        return _merge_regions(regions)
+
+    def _touch(self, mapping: yaml.Node, index: int) -> None:
+        """Record an edit in an entry of a mapping, or of the mapping containing it.
+
+        :param mapping: A mapping, or an empty value that becomes one.
+        """
+        while not _is_block(mapping):
+            if mapping not in self._entries:
+                self._touched = None
+                return
+            mapping, index = self._entries[mapping]
+        if self._touched is not None:
+            self._touched.setdefault(cast(yaml.MappingNode, mapping), set()).add(index)
+
+    def _end(self, node: yaml.Node, after: int) -> int:
+        """Find where the content of a node ends, ignoring trailing comments.
+
+        :param after: An index before the node's text, but after any previous
+            values, so that aliases can be told apart from the nodes they name.
+        """
+        if node.start_mark.index < after:
+            alias = _ALIAS.match(self._text, after)
+            return alias.end() if alias else after
+        if not _is_block(node):
+            return int(node.end_mark.index)
+        if isinstance(node, yaml.MappingNode):
+            key_node, value_node = node.value[-1]
+            return self._end(value_node, key_node.end_mark.index)
+        if len(node.value) == 1:
+            return self._end(node.value[-1], node.start_mark.index)
+        previous = self._end(node.value[-2], node.start_mark.index)
+        return self._end(node.value[-1], previous)
+
+    def _line_end(self, index: int) -> int:
+        """Find the start of the line after an index, unless it's a line start."""
+        if index > 0 and self._text[index - 1] == "\n":
+            return index
+        newline = self._text.find("\n", index)
+        return len(self._text) if newline == -1 else newline + 1
+
+
+def _is_block(node: yaml.Node) -> bool:
+    """Whether a node is a non-empty block mapping or sequence."""
+    return (
+        isinstance(node, yaml.CollectionNode)
+        and not node.flow_style
+        and bool(node.value)
+    )
+
+
+def _is_null(node: yaml.Node) -> bool:
+    return isinstance(node, yaml.ScalarNode) and node.tag == _NULL_TAG
+
+
+def _find_key(node: yaml.MappingNode, key: str) -> Optional[int]:
+    """Find the index of a key that's written in a mapping (not merged into it)."""
+    for index, (key_node, _) in enumerate(node.value):
+        if (
+            isinstance(key_node, yaml.ScalarNode)
+            and key_node.tag != _MERGE_TAG
+            and key_node.value == key
+        ):
+            return index
+    return None
+
+
+def _dotted(path: Tuple[str, ...]) -> str:
+    return ".".join(path)
+
+
+def _dump_inline(value: Any) -> str:
+    """Dump a value as YAML on a single line."""
+    dumped = yaml.safe_dump(
+        value,
+        default_flow_style=True,
+        sort_keys=False,
+        allow_unicode=True,
+        width=float("inf"),
+    )
+    dumped = dumped[: -len("\n...\n")] if dumped.endswith("\n...\n") else dumped
+    dumped = dumped.rstrip("\n")
+    if "\n" in dumped:
+        # A string with line breaks, which are escaped in JSON.
+        return json.dumps(value, ensure_ascii=False)
+    return dumped
+
+
+def _dump_block(value: Any, indent: int) -> str:
+    """Dump a collection as indented block YAML."""
+    dumped = yaml.safe_dump(
+        value, default_flow_style=False, sort_keys=False, allow_unicode=True
+    )
+    return "".join(
+        " " * indent + line if line.strip() else line
+        for line in dumped.splitlines(keepends=True)
+    )
+
+
+def _dump_item(key: str, value: Any, indent: int) -> str:
+    """Dump a key and its value as lines of a block mapping."""
+    if isinstance(value, (dict, list)) and value:
+        return f"{' ' * indent}{_dump_inline(key)}:\n{_dump_block(value, indent + 2)}"
+    return f"{' ' * indent}{_dump_inline(key)}: {_dump_inline(value)}\n"
+
+
+def _merge_regions(regions: List[_Region]) -> Optional[List[_Region]]:
+    """Merge regions that overlap, or ``None`` if they only partly overlap.
+
+    Regions of the same mapping that touch are joined, and regions within
+    another region are left out.
+    """
+    merged: List[_Region] = []
+    for region in sorted(regions, key=lambda region: (region.start, -region.end)):
+        previous = merged[-1] if merged else None
+        if (
+            previous is None
+            or region.start > previous.end
+            or (region.start == previous.end and region.path != previous.path)
+        ):
+            merged.append(region)
+        elif region.end <= previous.end:
+            continue  # Within the previous region.
+        elif region.path == previous.path:
+            merged[-1] = previous._replace(
+                end=region.end, keys=previous.keys | region.keys
+            )
+        else:
+            return None
+    return merged
+
+
+def _regions_match(
+    loader: _SafeYamlLoader,
+    text: str,
+    edits: List[_Edit],
+    regions: List[_Region],
+    expected: Dict[str, Any],
+) -> bool:
+    """Check that the patched regions of a document have the expected values.
+
+    Each region is loaded on its own after making its edits. The rest of the
+    text is unchanged, and still ends the regions' values as it did before, so
+    this is enough unless an edit isn't in a region, or adds or removes an
+    anchor. Aliases in a region of anchors outside it can't be loaded, so
+    they aren't checked either.
+
+    :param loader: The loader of the original document, whose limits apply.
+    :param expected: The whole document, with the changes made.
+    :returns: Whether the regions are known to have the expected values.
+    """
+    remaining = sorted(edits, key=lambda edit: (edit.start, edit.end))
+    for region in regions:
+        region_edits: List[_Edit] = []
+        # Text added where a region ends is added to the end of its mapping.
+        while remaining and (
+            remaining[0].start < region.end
+            or remaining[0].start == remaining[0].end == region.end
+        ):
+            edit = remaining.pop(0)
+            if edit.start < region.start or edit.end > region.end or "&" in edit.text:
+                return False
+            region_edits.append(
+                edit._replace(
+                    start=edit.start - region.start, end=edit.end - region.start
+                )
+            )
+        original = text[region.start : region.end]
+        if "&" in original:
+            return False
+        try:
+            actual = loader.load_part(
+                _apply_edits(original, region_edits), len(region.path) + 1
+            )
+        except (yaml.YAMLError, errors.CraftValidationError):
+            return False
+        mapping: Any = expected
+        for key in region.path:
+            mapping = mapping.get(key) if isinstance(mapping, dict) else None
+        if not isinstance(mapping, dict):
+            return False
+        values = {key: mapping[key] for key in region.keys if key in mapping}
+        if (actual or {}) != values:
+            return False
+    return not remaining
+
+
+def _apply_edits(text: str, edits: List[_Edit]) -> str:
+    """Make edits to a text, keeping the order of insertions at the same index."""
+    pieces: List[str] = []
+    position = 0
+    for edit in sorted(edits, key=lambda edit: (edit.start, edit.end)):
+        if edit.start < position:
+            raise ValueError("Can't make overlapping changes to a YAML document")
+        pieces.extend((text[position : edit.start], edit.text))
+        position = edit.end
+    pieces.append(text[position:])
+    return "".join(pieces)
+
+
+def _apply_change(data: Dict[str, Any], path: Tuple[str, ...], value: Any) -> None:
+    """Make a change to loaded data, creating any mappings missing from its path."""
+    for key in path[:-1]:
+        nested = data.get(key)
+        if not isinstance(nested, dict):
+            if value is YAML_DELETE:
+                return
+            nested = data[key] = {}
+        data = nested
+    if value is YAML_DELETE:
+        data.pop(path[-1], None)
+    else:
+        data[path[-1]] = value
@@ -0,0 +1,99 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Benchmarks for application startup."""
+import os
+import pathlib
+import subprocess
+import sys
+import textwrap
+
+import pytest
+import yaml
+
+from tests.benchmark.test_models import project_dict
+
+PROJECT_ROOT = pathlib.Path(__file__).parents[2]
+
+COMMAND_MODULE = textwrap.dedent(
+    """\
+    import pathlib
+
+    import craft_cli
+    import craft_parts
+
+    class ValidateCommand(craft_cli.BaseCommand):
+        name = "validate"
+        help_msg = "Validate a project file"
+        overview = "Validate a project file, including its parts."
+
+        def fill_parser(self, parser):
+            parser.add_argument("project_file", type=pathlib.Path)
+
+        def run(self, parsed_args):
+            self.config["app"].Project.from_yaml_file(parsed_args.project_file)
+    """
+)
+
+APP_SCRIPT = textwrap.dedent(
+    """\
+    import sys
+
+    from craft_application.app import (
+        AppMetadata, Application, CommandGroup, LazyCommand
+    )
+
+    command = LazyCommand(
+        "validate", "Validate a project file", "bench_commands:ValidateCommand"
+    )
+    if sys.argv[1] == "eager":
+        command = command.load()
+    app = AppMetadata("craft-application", "A benchmark application")
+    groups = [CommandGroup("Lifecycle", [command])]
+    sys.exit(Application(app, groups).run(sys.argv[2:]))
+    """
+)
+
+COMMAND_LINES = {
+    "version": ["--version"],
+    "help": ["--help"],
+    "validate": ["validate", "project.yaml"],
+}
+
+
+@pytest.fixture()
+def run_app(tmp_path):
+    (tmp_path / "bench_commands.py").write_text(COMMAND_MODULE)
+    (tmp_path / "app.py").write_text(APP_SCRIPT)
+    (tmp_path / "project.yaml").write_text(yaml.safe_dump(project_dict(10)))
+
+    def run(registry, command_line):
+        subprocess.run(
+            [sys.executable, "app.py", registry, *command_line],
+            cwd=tmp_path,
+            env={**os.environ, "PYTHONPATH": str(PROJECT_ROOT)},
+            check=True,
+            capture_output=True,
+        )
+
+    return run
+
+
+@pytest.mark.parametrize("registry", ["eager", "lazy"])
+@pytest.mark.parametrize("command_line", COMMAND_LINES)
+def test_startup(benchmark, run_app, registry, command_line):
+    benchmark.group = f"run {command_line}"
+
+    benchmark.pedantic(run_app, args=(registry, COMMAND_LINES[command_line]), rounds=5)
@@ -0,0 +1,110 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Benchmarks for querying a catalog of projects."""
+import pytest
+from craft_application.catalog import ProjectCatalog
+from craft_application.models import Project, VersionStr
+
+PROJECT_COUNT = 100_000
+PLUGINS = ["nil", "dump", "make", "python", "go", "rust", "npm", "autotools"]
+
+
+def _project(index: int) -> Project:
+    # Validation isn't what's being measured, so skip it.
+    return Project.construct(
+        name=f"project-{index % 5000}",
+        version=f"{index // 5000}.{index % 7}",
+        base=f"core{20 + index % 3 * 2}",
+        parts={
+            f"part-{part}": {"plugin": PLUGINS[(index + part) % len(PLUGINS)]}
+            for part in range(3)
+        },
+    )
+
+
+@pytest.fixture(scope="module")
+def projects():
+    return [_project(index) for index in range(PROJECT_COUNT)]
+
+
+@pytest.fixture(scope="module")
+def catalog(projects):
+    return ProjectCatalog(projects)
+
+
+def _scan_latest(projects, name):
+    versions = [project for project in projects if project.name == name]
+    return max(versions, key=lambda project: VersionStr.sort_key(project.version))
+
+
+QUERIES = {
+    "base": (
+        lambda projects: [p for p in projects if p.effective_base == "core22"],
+        lambda catalog: catalog.find(effective_base="core22"),
+    ),
+    "latest": (
+        lambda projects: _scan_latest(projects, "project-1234"),
+        lambda catalog: catalog.latest("project-1234"),
+    ),
+    "plugin": (
+        lambda projects: [
+            p
+            for p in projects
+            if any(part.get("plugin") == "go" for part in p.parts.values())
+        ],
+        lambda catalog: catalog.find(plugin="go"),
+    ),
+    "base-and-plugin": (
+        lambda projects: [
+            p
+            for p in projects
+            if p.effective_base == "core24"
+            and any(part.get("plugin") == "rust" for part in p.parts.values())
+        ],
+        lambda catalog: catalog.find(effective_base="core24", plugin="rust"),
+    ),
+    "version-prefix": (
+        lambda projects: [p for p in projects if p.version.startswith("1.")],
+        lambda catalog: catalog.where("version", lambda v: v.startswith("1.")),
+    ),
+}
+
+
+@pytest.mark.parametrize("method", ["scan", "catalog"])
+@pytest.mark.parametrize("query", QUERIES)
+def test_query(benchmark, projects, catalog, method, query):
+    benchmark.group = f"query {query} in {PROJECT_COUNT} projects"
+    scan, lookup = QUERIES[query]
+
+    if method == "scan":
+        result = benchmark(scan, projects)
+    else:
+        result = benchmark(lookup, catalog)
+
+    assert result == (scan(projects) if method == "catalog" else lookup(catalog))
+
+
+def test_ingest(benchmark, projects):
+    benchmark.group = f"catalog {PROJECT_COUNT} projects"
+
+    benchmark.pedantic(ProjectCatalog, args=(projects,), rounds=3)
+
+
+def test_add_remove(benchmark, catalog):
+    benchmark.group = f"add and remove a project in a catalog of {PROJECT_COUNT}"
+    project = _project(PROJECT_COUNT)
+
+    benchmark(lambda: catalog.remove(catalog.add(project)))
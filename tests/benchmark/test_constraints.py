@@ -0,0 +1,36 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Benchmarks for validating constrained types."""
+import pydantic
+import pytest
+from craft_application.models import ProjectName, VersionStr
+
+VALUES = {
+    ProjectName: [f"project-{index}" for index in range(100_000)],
+    VersionStr: [f"1.{index}.0+git{index:08x}" for index in range(100_000)],
+}
+
+
+@pytest.mark.parametrize("method", ["one-at-a-time", "validate-many"])
+@pytest.mark.parametrize("cls", VALUES, ids=lambda cls: cls.__name__)
+def test_validate_100k(benchmark, cls, method):
+    benchmark.group = f"validate 100k values of {cls.__name__}"
+    values = VALUES[cls]
+
+    if method == "validate-many":
+        benchmark(cls.validate_many, values)
+    else:
+        benchmark(lambda: [pydantic.parse_obj_as(cls, value) for value in values])
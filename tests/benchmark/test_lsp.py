@@ -0,0 +1,51 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Benchmarks for validating project files in the language server."""
+import itertools
+
+import pytest
+from craft_application.lsp import ProjectDocument
+
+from tests.unit.test_lsp import VALID_TEXT, _part_text
+
+
+@pytest.mark.parametrize("part_count", [1000, 3000])
+@pytest.mark.parametrize("method", ["incremental", "split-again"])
+def test_validate_after_edit(benchmark, part_count, method):
+    benchmark.group = f"validate after editing one of {part_count} parts"
+    text = VALID_TEXT + _part_text(part_count)
+    line = text.splitlines().index(f"  part-{part_count // 2}:") + 1
+    document = ProjectDocument(text)
+    document.validate()
+    plugins = itertools.cycle(["nil", "dump"])
+
+    def edit():
+        end = len(document.text.splitlines()[line])
+        document.apply_change(
+            {
+                "range": {
+                    "start": {"line": line, "character": 12},
+                    "end": {"line": line, "character": end},
+                },
+                "text": next(plugins),
+            }
+        )
+        if method == "incremental":
+            return document.validate()
+        document._layout = None
+        return document.validate()
+
+    assert benchmark(edit) == []
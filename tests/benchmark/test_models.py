@@ -0,0 +1,175 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Benchmarks for model validation."""
+import pytest
+import yaml
+from craft_application.models import Project
+from craft_application.models.compiler import compile_validator
+
+VALIDATORS = {
+    "pydantic": lambda data: Project(**data),
+    "compiled": compile_validator(Project),
+}
+
+
+def project_dict(part_count: int):
+    return {
+        "name": "benchmark-project",
+        "title": "Benchmark project",
+        "version": "1.0.0",
+        "summary": "A project for benchmarking validation.",
+        "description": "A longer description of the benchmark project.",
+        "license": "LGPL-3.0",
+        "source-code": "https://github.com/canonical/craft-application",
+        "parts": {
+            f"part-{index}": {
+                "plugin": "nil",
+                "build-packages": ["gcc", "make"],
+                "stage-packages": ["libc6"],
+            }
+            for index in range(part_count)
+        },
+    }
+
+
+@pytest.mark.parametrize("validator", VALIDATORS)
+@pytest.mark.parametrize("part_count", [0, 10, 1000])
+def test_validate_project(benchmark, validator, part_count):
+    benchmark.group = f"validate project with {part_count} parts"
+    data = project_dict(part_count)
+
+    benchmark(VALIDATORS[validator], data)
+
+
+@pytest.mark.parametrize("validator", VALIDATORS)
+def test_validate_many_projects(benchmark, validator):
+    benchmark.group = "validate 1000 projects"
+    projects = [project_dict(1) for _ in range(1000)]
+    validate = VALIDATORS[validator]
+
+    benchmark(lambda: [validate(data) for data in projects])
+
+
+VARIANT_METHODS = {
+    "deep-copy": lambda project, version: project.copy(
+        update={"version": version}, deep=True
+    ),
+    "derive": lambda project, version: project.derive(version=version),
+}
+
+
+@pytest.mark.parametrize("method", VARIANT_METHODS)
+def test_project_variants(benchmark, method):
+    benchmark.group = "derive 20 variants of a project with 1000 parts"
+    project = Project(**project_dict(1000))
+    variant = VARIANT_METHODS[method]
+
+    benchmark(lambda: [variant(project, f"1.{index}") for index in range(20)])
+
+
+LOADERS = {
+    "yaml": Project.from_yaml_file,
+    "json": Project.from_json_file,
+}
+
+
+@pytest.mark.parametrize("loader", LOADERS)
+def test_load_project_file(benchmark, tmp_path, loader):
+    benchmark.group = "load a project file with 1000 parts"
+    project = Project(**project_dict(1000))
+    path = tmp_path / f"project.{loader}"
+    if loader == "json":
+        project.to_json_file(path)
+    else:
+        project.to_yaml_file(path)
+
+    benchmark(LOADERS[loader], path)
+
+
+@pytest.mark.parametrize("layout", ["single-file", "fragments"])
+def test_reload_after_editing_one_part(benchmark, tmp_path, layout):
+    benchmark.group = "reload a project with 1000 parts after editing one"
+    data = project_dict(1000)
+    parts = data.pop("parts")
+    project_file = tmp_path / "project.yaml"
+    fragments = tmp_path / "parts"
+    fragments.mkdir()
+    if layout == "fragments":
+        Project.construct(**data).to_yaml_file(project_file)
+        for name, part in parts.items():
+            (fragments / f"{name}.yaml").write_text(yaml.safe_dump({name: part}))
+    edits = iter(range(1_000_000))
+
+    def edit_and_reload():
+        part = {**parts["part-0"], "source": f"src-{next(edits)}"}
+        if layout == "fragments":
+            (fragments / "part-0.yaml").write_text(yaml.safe_dump({"part-0": part}))
+        else:
+            Project.construct(**data, parts={**parts, "part-0": part}).to_yaml_file(
+                project_file
+            )
+        return Project.from_yaml_file(project_file, fragments=fragments)
+
+    benchmark(edit_and_reload)
+
+
+def test_load_project_file_with_anchors(benchmark, tmp_path):
+    benchmark.group = "load a project file with 1000 parts sharing an anchor"
+    packages = "".join(f"      - package-{index}\n" for index in range(50))
+    path = tmp_path / "project.yaml"
+    path.write_text(
+        "name: benchmark-project\nversion: '1.0'\nparts:\n"
+        f"  common: &common\n    plugin: nil\n    build-packages:\n{packages}"
+        + "".join(f"  alias-{index}: *common\n" for index in range(500))
+        + "".join(
+            f"  merged-{index}:\n    <<: *common\n    source: src-{index}\n"
+            for index in range(500)
+        )
+    )
+
+    benchmark(Project.from_yaml_file, path)
+
+
+PATCH_METHODS = {
+    "load-and-dump": lambda path, version, part: Project.from_yaml_file(path)
+    .derive(version=version, parts={"new-part": part})
+    .to_yaml_file(path),
+    "patch": lambda path, version, part: Project.patch_yaml_file(
+        path, version=version, parts={"new-part": part}
+    ),
+}
+
+
+@pytest.mark.parametrize("method", PATCH_METHODS)
+def test_patch_project_file(benchmark, tmp_path, method):
+    benchmark.group = "bump the version and add a part in a project with 1000 parts"
+    path = tmp_path / "project.yaml"
+    Project(**project_dict(1000)).to_yaml_file(path)
+    versions = (f"1.{index}" for index in range(1_000_000))
+
+    benchmark(lambda: PATCH_METHODS[method](path, next(versions), {"plugin": "nil"}))
+
+
+@pytest.mark.parametrize("lazy_parts", [False, True])
+def test_load_project_file_use_one_part(benchmark, tmp_path, lazy_parts):
+    benchmark.group = "load a project file with 1000 parts and use one"
+    path = tmp_path / "project.yaml"
+    Project(**project_dict(1000)).to_yaml_file(path)
+
+    def load_and_use():
+        return Project.from_yaml_file(path, lazy_parts=lazy_parts).parts["part-500"]
+
+    benchmark(load_and_use)
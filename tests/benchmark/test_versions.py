@@ -0,0 +1,72 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Benchmarks for sorting and searching versions."""
+import functools
+import random
+
+import pytest
+from craft_application.models import VersionIndex, VersionStr
+
+from tests.unit.models.test_versions import dpkg_compare
+
+VERSIONS = [
+    f"{major}.{minor}.{patch}{suffix}"
+    for major in range(10)
+    for minor in range(20)
+    for patch in range(25)
+    for suffix in ["", "~rc1"]
+]
+random.Random(0).shuffle(VERSIONS)
+
+SORTS = {
+    "compare": lambda versions: sorted(
+        versions, key=functools.cmp_to_key(dpkg_compare)
+    ),
+    "sort-key": lambda versions: sorted(versions, key=VersionStr.sort_key),
+    "index": VersionIndex,
+}
+
+
+@pytest.mark.parametrize("method", SORTS)
+def test_sort_versions(benchmark, method):
+    benchmark.group = f"sort {len(VERSIONS)} versions"
+
+    benchmark(SORTS[method], VERSIONS)
+
+
+RANGES = [("1.5", "2.0"), ("3.0~", "3.0.10"), ("9.19.20", None), (None, "0.1")]
+
+
+def _scan(versions, low, high):
+    key = VersionStr.sort_key
+    return [
+        version
+        for version in versions
+        if (low is None or key(version) >= key(low))
+        and (high is None or key(version) < key(high))
+    ]
+
+
+@pytest.mark.parametrize("method", ["scan", "index"])
+def test_version_ranges(benchmark, method):
+    benchmark.group = f"find {len(RANGES)} ranges in {len(VERSIONS)} versions"
+    index = VersionIndex(VERSIONS)
+    versions = list(index)
+
+    if method == "index":
+        benchmark(lambda: [index.between(low, high) for low, high in RANGES])
+    else:
+        benchmark(lambda: [_scan(versions, low, high) for low, high in RANGES])
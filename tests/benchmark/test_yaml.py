@@ -0,0 +1,37 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Benchmarks for loading YAML documents."""
+import concurrent.futures
+import io
+
+import pytest
+import yaml
+from craft_application.util.yaml import safe_yaml_load
+
+from tests.benchmark.test_models import project_dict
+
+DOCUMENTS = [yaml.safe_dump(project_dict(10)) for _ in range(50)]
+
+
+@pytest.mark.parametrize("workers", [1, 2, 4, 8])
+def test_load_threads(benchmark, workers):
+    benchmark.group = f"load {len(DOCUMENTS)} documents in a thread pool"
+
+    def load(document):
+        return safe_yaml_load(io.StringIO(document))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        benchmark(lambda: list(executor.map(load, DOCUMENTS)))
@@ -0,0 +1,119 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Tests for the base model."""
+import functools
+
+import pytest
+import pytest_check
+from craft_application.models import BaseMetadata, Project
+from craft_application.util import FrozenDict
+
+PROJECT_DICT = {
+    "name": "my-project",
+    "version": "1.0",
+    "contact": ["author@example.com"],
+    "parts": {"my-part": {"plugin": "nil", "build-packages": ["gcc"]}},
+}
+
+
+@pytest.fixture()
+def project():
+    return Project.unmarshal(PROJECT_DICT)
+
+
+def test_frozen_class():
+    frozen_class = Project.frozen_class()
+
+    pytest_check.is_(frozen_class, Project.frozen_class())
+    pytest_check.is_(frozen_class.frozen_class(), frozen_class)
+    pytest_check.is_true(issubclass(frozen_class, Project))
+    pytest_check.equal(frozen_class.__name__, "FrozenProject")
+
+
+def test_freeze(project):
+    frozen = project.freeze()
+
+    pytest_check.is_instance(frozen, Project.frozen_class())
+    pytest_check.is_instance(frozen.parts, FrozenDict)
+    pytest_check.equal(frozen.contact, ("author@example.com",))
+    pytest_check.equal(frozen.marshal(), project.marshal())
+    pytest_check.is_(frozen.freeze(), frozen)
+
+
+def test_thaw(project):
+    thawed = project.freeze().thaw()
+
+    pytest_check.is_(type(thawed), Project)
+    pytest_check.equal(thawed, project)
+    pytest_check.equal(thawed.__fields_set__, project.__fields_set__)
+    pytest_check.is_(project.thaw(), project)
+
+    thawed.parts["other-part"] = {"plugin": "nil"}
+
+
+def test_frozen_immutable(project):
+    frozen = project.freeze()
+
+    with pytest.raises(TypeError):
+        frozen.version = "2.0"  # pyright: ignore[reportGeneralTypeIssues]
+    with pytest.raises(TypeError):
+        frozen.parts["my-part"]["plugin"] = "dump"
+
+
+def test_frozen_hash_and_equality(project):
+    frozen = project.freeze()
+    validated = Project.frozen_class().unmarshal(PROJECT_DICT)
+    different = project.derive(version="2.0").freeze()
+
+    pytest_check.equal(hash(frozen), hash(validated))
+    pytest_check.equal(frozen, validated)
+    pytest_check.equal(frozen, project)
+    pytest_check.not_equal(frozen, different)
+    pytest_check.equal({frozen: "value"}[validated], "value")
+
+
+def test_frozen_lru_cache(project):
+    calls = []
+
+    @functools.lru_cache(maxsize=None)
+    def get_name(model):
+        calls.append(model)
+        return model.name
+
+    get_name(project.freeze())
+    get_name(Project.frozen_class().unmarshal(PROJECT_DICT))
+
+    assert len(calls) == 1
+
+
+def test_frozen_copy_resets_hash(project):
+    frozen = project.freeze()
+    hash(frozen)
+
+    derived = frozen.derive(version="2.0")
+
+    pytest_check.is_instance(derived, Project.frozen_class())
+    pytest_check.not_equal(hash(derived), hash(frozen))
+    pytest_check.equal(hash(derived), hash(project.derive(version="2.0").freeze()))
+
+
+def test_frozen_extra_fields():
+    metadata = BaseMetadata.unmarshal({"name": "x", "extra": {"nested": [1]}})
+
+    frozen = metadata.freeze()
+
+    pytest_check.equal(frozen.marshal(), metadata.marshal())
+    pytest_check.equal(hash(frozen), hash(metadata.freeze()))
@@ -0,0 +1,226 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Differential tests for compiled model validators."""
+import math
+from typing import Any, Dict, Optional
+
+import pydantic
+import pytest
+from craft_application.models import (
+    BaseMetadata,
+    CraftBaseModel,
+    Project,
+    ProjectName,
+    VersionStr,
+)
+from craft_application.models.compiler import compile_validator
+from craft_application.util.error_formatting import format_pydantic_errors
+from hypothesis import given, settings, strategies
+
+
+class RootValidatedModel(CraftBaseModel):
+    name: ProjectName
+
+    @pydantic.root_validator
+    @classmethod
+    def _check_root(cls, values: Dict[str, Any]) -> Dict[str, Any]:
+        if values.get("name") == "forbidden":
+            raise ValueError("forbidden name")
+        return values
+
+
+class DefaultsModel(CraftBaseModel):
+    version: VersionStr = "1.0"  # pyright: ignore[reportGeneralTypeIssues]
+    tags: Dict[str, Any] = {}
+    comment: Optional[str] = "none"
+
+
+def _outcome(function, data):
+    """Get the result of a validation as comparable values."""
+    try:
+        model = function(data)
+    except pydantic.ValidationError as exc:
+        return ("error", exc.errors(), format_pydantic_errors(exc.errors()))
+    return ("model", type(model), model.__dict__, model.__fields_set__)
+
+
+def assert_equivalent(model, data):
+    expected = _outcome(lambda d: model(**d), data)
+    actual = _outcome(compile_validator(model), data)
+
+    assert actual == expected
+
+
+# region Hypothesis strategies
+def string_values():
+    return strategies.one_of(
+        strategies.sampled_from(
+            ["my-project", "  padded  ", "1.0", "UPPER", "a--b", "", " ", "x" * 50]
+        ),
+        strategies.text(max_size=45),
+    )
+
+
+def field_values():
+    return strategies.one_of(
+        string_values(),
+        strategies.none(),
+        strategies.integers(),
+        strategies.floats(allow_nan=False),
+        strategies.booleans(),
+        strategies.lists(string_values(), max_size=3),
+        strategies.dictionaries(string_values(), string_values(), max_size=2),
+    )
+
+
+def part_values():
+    return strategies.one_of(
+        strategies.fixed_dictionaries(
+            {"plugin": strategies.sampled_from(["nil", "dump", "not-a-plugin"])}
+        ),
+        strategies.fixed_dictionaries(
+            {"plugin": strategies.just("nil")},
+            optional={
+                "source": string_values(),
+                "build-packages": strategies.lists(string_values(), max_size=3),
+                "after": strategies.lists(string_values(), max_size=2),
+                "invalid-key": field_values(),
+            },
+        ),
+        field_values(),
+    )
+
+
+def project_data():
+    keys = [
+        "name",
+        "title",
+        "base",
+        "version",
+        "contact",
+        "issues",
+        "source-code",
+        "source_code",
+        "summary",
+        "description",
+        "license",
+        "unknown-key",
+    ]
+    valid = {
+        "name": "my-project",
+        "version": "1.0",
+        "parts": {"my-part": {"plugin": "nil"}},
+    }
+    return strategies.builds(
+        lambda base, overrides, parts: {**base, **overrides, **parts},
+        strategies.just(valid),
+        strategies.dictionaries(strategies.sampled_from(keys), field_values()),
+        strategies.one_of(
+            strategies.just({}),
+            strategies.builds(
+                lambda parts: {"parts": parts},
+                strategies.one_of(
+                    strategies.dictionaries(string_values(), part_values(), max_size=3),
+                    field_values(),
+                ),
+            ),
+        ),
+    )
+
+
+# endregion
+@given(data=project_data())
+@settings(max_examples=300, deadline=None)
+def test_project_equivalent_hypothesis(data):
+    assert_equivalent(Project, data)
+
+
+@given(
+    data=strategies.dictionaries(
+        strategies.sampled_from(["version", "tags", "comment", "other"]),
+        field_values(),
+    )
+)
+def test_defaults_equivalent_hypothesis(data):
+    assert_equivalent(DefaultsModel, data)
+
+
+@given(data=strategies.dictionaries(string_values(), field_values()))
+def test_metadata_equivalent_hypothesis(data):
+    assert_equivalent(BaseMetadata, data)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pytest.param({}, id="empty"),
+        pytest.param({"name": "my-project", "version": "1", "parts": {}}, id="valid"),
+        pytest.param(
+            {"name": " my-project\n", "version": 1.5, "parts": {}}, id="coerce"
+        ),
+        pytest.param({"name": "my-project", "version": "1", "parts": None}, id="none"),
+        pytest.param(
+            {"name": "my-project", "version": "1", "parts": {"p": {"plugin": "x"}}},
+            id="bad-plugin",
+        ),
+        pytest.param(
+            {"name": "my-project", "version": "1", "parts": {}, "extra": 1},
+            id="extra",
+        ),
+        pytest.param(
+            {
+                "name": "my-project",
+                "version": "1",
+                "parts": {},
+                "source-code": "https://example.com",
+                "source_code": "https://example.org",
+            },
+            id="alias-and-name",
+        ),
+    ],
+)
+def test_project_equivalent(data):
+    assert_equivalent(Project, data)
+
+
+@pytest.mark.parametrize("name", ["my-project", "forbidden", "-invalid-"])
+def test_root_validator_model_not_compiled(name):
+    assert_equivalent(RootValidatedModel, {"name": name})
+
+
+def test_compile_is_cached():
+    assert compile_validator(Project) is compile_validator(Project)
+
+
+def test_defaults_are_copied():
+    validate = compile_validator(DefaultsModel)
+
+    first = validate({})
+    first.tags["key"] = "value"
+
+    assert validate({}).tags == {}
+
+
+def test_float_defaults():
+    class FloatModel(CraftBaseModel):
+        low: float = float("-inf")
+        high: float = float("inf")
+        missing: float = float("nan")
+
+    model = compile_validator(FloatModel)({})
+
+    assert (model.low, model.high) == (float("-inf"), float("inf"))
+    assert math.isnan(model.missing)
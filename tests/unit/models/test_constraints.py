@@ -19,7 +19,12 @@ from string import ascii_letters, ascii_lowercase, digits
 
 import pydantic.errors
 import pytest
-from craft_application.models.constraints import ProjectName, VersionStr
+from craft_application.models.constraints import (
+    ProjectName,
+    ProjectTitle,
+    SummaryStr,
+    VersionStr,
+)
 from hypothesis import given, strategies
 
 ALPHA_NUMERIC = [*ascii_letters, *digits]
@@ -156,4 +161,77 @@ def test_invalid_version_str(version):
         VersionStr.validate(version_str)
 
 
+# endregion
+# region Bulk validation tests
+BULK_TYPES = [ProjectName, ProjectTitle, SummaryStr, VersionStr]
+
+
+def _validate_one(cls, value):
+    """Validate a single value through pydantic, as a model field would."""
+    try:
+        return pydantic.parse_obj_as(cls, value), None
+    except pydantic.ValidationError as exc:
+        return None, exc.errors()[0]["msg"]
+
+
+def assert_bulk_consistent(cls, values):
+    result = cls.validate_many(values)
+
+    assert len(result.values) == len(result.accepted) == len(values)
+    for index, value in enumerate(values):
+        expected_value, expected_error = _validate_one(cls, value)
+        assert result.values[index] == expected_value
+        assert result.accepted[index] == (expected_error is None)
+        assert result.errors.get(index) == expected_error
+    assert result.all_valid == (not result.errors)
+
+
+@pytest.mark.parametrize("cls", BULK_TYPES)
+@given(
+    values=strategies.lists(
+        strategies.one_of(
+            strategies.text(max_size=50),
+            strategies.text(
+                strategies.sampled_from([*VERSION_STRING_VALID_CHARACTERS, " "]),
+                max_size=45,
+            ),
+            valid_project_name_strategy(),
+            strategies.integers(),
+            strategies.none(),
+        )
+    )
+)
+def test_validate_many_hypothesis(cls, values):
+    assert_bulk_consistent(cls, values)
+
+
+@pytest.mark.parametrize("cls", BULK_TYPES)
+def test_validate_many(cls):
+    assert_bulk_consistent(
+        cls,
+        [
+            "my-project",
+            "  padded  ",
+            "-invalid-",
+            "x",
+            "1.0.0+git1234",
+            "",
+            "a" * 100,
+            1,
+            1.5,
+            None,
+            b"bytes",
+            ["list"],
+        ],
+    )
+
+
+def test_validate_many_generator():
+    result = ProjectName.validate_many(f"name-{index}" for index in range(3))
+
+    assert result.values == ["name-0", "name-1", "name-2"]
+    assert result.accepted == bytearray([1, 1, 1])
+    assert result.all_valid
+
+
 # endregion
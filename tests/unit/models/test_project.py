@@ -14,10 +14,17 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Tests for BaseProject"""
+import json
 import pathlib
 from typing import Optional
 
+import craft_application.models.base
+import craft_application.util.yaml
+import craft_parts
+import pydantic
 import pytest
+import pytest_check
+import yaml
 from craft_application.errors import CraftValidationError
 from craft_application.models import Project
 
@@ -173,3 +180,840 @@ def test_effective_base_unknown():
         _ = project.effective_base
 
     assert exc_info.match("Could not determine effective base")
+
+
+@pytest.mark.parametrize(
+    ["project_file", "expected"],
+    [
+        (PROJECTS_DIR / "basic_project.yaml", BASIC_PROJECT),
+        (PROJECTS_DIR / "full_project.yaml", FULL_PROJECT),
+    ],
+)
+def test_peek_yaml_file_all_fields(project_file, expected):
+    header = Project.peek_yaml_file(project_file)
+
+    assert header.dict() == expected.dict(exclude={"parts"})
+    assert header.__fields_set__ == expected.__fields_set__ - {"parts"}
+
+
+@pytest.mark.parametrize("fields", [["name"], ["name", "version", "base"]])
+def test_peek_yaml_file_fields(fields):
+    header = Project.peek_yaml_file(PROJECTS_DIR / "full_project.yaml", fields)
+
+    assert header.__fields_set__ == set(fields)
+    for field in fields:
+        assert getattr(header, field) == getattr(FULL_PROJECT, field)
+
+
+def test_peek_yaml_file_skips_parts(tmp_path):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(
+        "name: my-project\nversion: '1.0'\nparts:\n  bad-part:\n    plugin: invalid\n"
+    )
+
+    header = Project.peek_yaml_file(project_file, ["name", "version"])
+
+    assert (header.name, header.version) == ("my-project", "1.0")
+
+
+def test_peek_yaml_file_subclass_fields(tmp_path):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text("name: my-project\nbase: core22\nbuild-base: devel\n")
+
+    header = FakeBuildBaseProject.peek_yaml_file(
+        project_file, ["name", "base", "build_base"]
+    )
+
+    assert header.effective_base == "devel"
+
+
+def test_peek_yaml_file_error():
+    with pytest.raises(CraftValidationError) as exc_info:
+        Project.peek_yaml_file(
+            PROJECTS_DIR / "invalid_project.yaml", ["name", "version", "summary"]
+        )
+
+    assert exc_info.value.args[0] == (
+        "Bad invalid_project.yaml content:\n"
+        '- string does not match regex "^([a-z0-9][a-z0-9-]?)?[a-z](-?[a-z0-9])*$" '
+        "(in field 'name')\n"
+        "- field version required in top-level configuration"
+    )
+
+
+def test_peek_yaml_file_values_validator(tmp_path):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(
+        "name: my-project\nversion: '1.0'\nbase: core22\nbuild-base: core22\nparts: {}\n"
+    )
+
+    with pytest.raises(CraftValidationError, match="must differ from base"):
+        BuildBaseProject.peek_yaml_file(project_file, ["build_base"])
+
+    project_file.write_text(
+        "name: my-project\nversion: '1.0'\nbase: core22\nbuild-base: core24\nparts: {}\n"
+    )
+    header = BuildBaseProject.peek_yaml_file(project_file, ["name", "build_base"])
+    assert header.__fields_set__ == {"name", "build_base"}
+    assert header.effective_base == "core24"
+
+
+def test_peek_yaml_file_unknown_field():
+    with pytest.raises(ValueError, match="Unknown project fields: not-a-field"):
+        Project.peek_yaml_file(PROJECTS_DIR / "basic_project.yaml", ["not-a-field"])
+
+
+@pytest.mark.parametrize(
+    ["overrides", "parts"],
+    [
+        ({}, None),
+        ({"version": "2.0", "base": "core22"}, None),
+        ({"title": "  A derived project "}, None),
+        ({}, {"other-part": {"plugin": "dump", "source": "."}}),
+        ({}, {"my-part": {"plugin": "dump", "source": "."}}),
+        ({"summary": "Without parts"}, {"my-part": None, "not-a-part": None}),
+    ],
+)
+def test_derive(overrides, parts):
+    expected_parts = {**FULL_PROJECT.parts, **(parts or {})}
+    expected_dict = {
+        **FULL_PROJECT.dict(exclude_unset=True),
+        **overrides,
+        "parts": {name: part for name, part in expected_parts.items() if part},
+    }
+
+    derived = FULL_PROJECT.derive(parts=parts, **overrides)
+
+    pytest_check.equal(derived, Project(**expected_dict))
+    pytest_check.equal(derived.__fields_set__, Project(**expected_dict).__fields_set__)
+    pytest_check.equal(FULL_PROJECT.version, "1.0.0.post64+git12345678")
+
+
+def test_derive_shares_data():
+    project = Project(
+        name="project-name",  # pyright: ignore[reportGeneralTypeIssues]
+        version="1.0",  # pyright: ignore[reportGeneralTypeIssues]
+        parts={"part-1": {"plugin": "nil"}, "part-2": {"plugin": "nil"}},
+    )
+
+    derived = project.derive(
+        version="2.0", parts={"part-2": {"plugin": "dump", "source": "."}}
+    )
+
+    pytest_check.is_(derived.parts["part-1"], project.parts["part-1"])
+    pytest_check.is_not(derived.parts, project.parts)
+    pytest_check.equal(project.parts["part-2"], {"plugin": "nil"})
+    pytest_check.equal(list(derived.parts), ["part-1", "part-2"])
+    pytest_check.is_(project.derive(version="3.0").parts, project.parts)
+
+
+@pytest.mark.parametrize(
+    ["overrides", "parts", "error_locs"],
+    [
+        ({"name": "-invalid-"}, None, [("name",)]),
+        ({"version": None}, None, [("version",)]),
+        ({"source_code": "not a url"}, None, [("source-code",)]),
+        ({}, {"my-part": {"plugin": "not-a-plugin"}}, [("parts", "my-part")]),
+        (
+            {"name": "-invalid-"},
+            {"my-part": {"plugin": "not-a-plugin"}},
+            [("name",), ("parts", "my-part")],
+        ),
+    ],
+)
+def test_derive_error(overrides, parts, error_locs):
+    with pytest.raises(pydantic.ValidationError) as exc_info:
+        BASIC_PROJECT.derive(parts=parts, **overrides)
+
+    assert [error["loc"] for error in exc_info.value.errors()] == error_locs
+
+
+def test_derive_unknown_field():
+    with pytest.raises(ValueError, match="Unknown project fields: not_a_field"):
+        BASIC_PROJECT.derive(not_a_field="value")
+
+
+def test_derive_root_validator():
+    class RootValidatedProject(Project):
+        @pydantic.root_validator
+        @classmethod
+        def _check_version(cls, values):
+            if values.get("version") == "0":
+                raise ValueError("version 0 is not allowed")
+            return values
+
+    project = RootValidatedProject(**BASIC_PROJECT_DICT)
+
+    pytest_check.equal(project.derive(version="2.0").version, "2.0")
+    with pytest.raises(pydantic.ValidationError, match="version 0 is not allowed"):
+        project.derive(version="0")
+
+
+class BuildBaseProject(Project):
+    build_base: Optional[str]
+
+    @pydantic.validator("build_base")
+    @classmethod
+    def _check_build_base(cls, value, values):
+        if value is not None and value == values.get("base"):
+            raise ValueError("build-base must differ from base")
+        return value
+
+
+def test_derive_values_validator():
+    project = BuildBaseProject(**BASIC_PROJECT_DICT, base="core22", build_base="core24")
+
+    pytest_check.equal(project.derive(base="core20").base, "core20")
+    with pytest.raises(pydantic.ValidationError, match="must differ from base"):
+        project.derive(base="core24")
+
+
+def test_from_yaml_file_error_positions(tmp_path):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(
+        "name: my-project\n"
+        "version: '1.0'\n"
+        "parts:\n"
+        "  my-part:\n"
+        "    plugin: not-a-plugin\n"
+    )
+
+    with pytest.raises(CraftValidationError) as exc_info:
+        Project.from_yaml_file(project_file, error_positions=True)
+
+    assert exc_info.value.args[0].endswith("(project.yaml:4:3)")
+
+
+def test_from_yaml_file_no_error_positions(tmp_path, mocker):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(
+        "name: my-project\nversion: '1.0'\nparts: {}\nsummary: [1]\n"
+    )
+    record = mocker.spy(craft_application.util.yaml.YamlPositions, "setdefault")
+
+    with pytest.raises(CraftValidationError) as exc_info:
+        Project.from_yaml_file(project_file)
+
+    assert exc_info.value.args[0].endswith("(in field 'summary')")
+    assert record.call_count == 0
+
+
+@pytest.mark.parametrize("fail_fast", [True, False])
+def test_from_yaml_file_fail_fast(tmp_path, fail_fast):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(
+        "name: my-project\n"
+        "version: '1.0'\n"
+        "parts:\n"
+        "  bad-part:\n"
+        "    plugin: not-a-plugin\n"
+        "  later-part: [unclosed\n"
+    )
+
+    if fail_fast:
+        with pytest.raises(CraftValidationError, match=r"\(project.yaml:4:3\)"):
+            Project.from_yaml_file(project_file, fail_fast=True, error_positions=True)
+    else:
+        with pytest.raises(yaml.YAMLError):
+            Project.from_yaml_file(project_file, error_positions=True)
+
+
+def test_from_yaml_file_collects_errors(tmp_path):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(
+        "name: -invalid-\n"
+        "parts:\n"
+        "  bad-part:\n"
+        "    plugin: not-a-plugin\n"
+        "  good-part:\n"
+        "    plugin: nil\n"
+        "summary: [1]\n"
+    )
+
+    with pytest.raises(CraftValidationError) as exc_info:
+        Project.from_yaml_file(project_file, error_positions=True)
+
+    message = exc_info.value.args[0]
+    assert message.count("\n- ") == 4  # noqa: PLR2004
+    for position in ["1:1", "3:3", "7:1"]:
+        assert f"(project.yaml:{position})" in message
+
+
+def test_from_yaml_file_json_limits(tmp_path):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text('{"name": ' + "[" * 500 + "]" * 500 + "}")
+
+    with pytest.raises(CraftValidationError, match="maximum nesting depth"):
+        Project.from_yaml_file(project_file)
+
+
+def test_from_yaml_file_non_string_key(tmp_path):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text("name: my-project\n1: 2\n")
+
+    with pytest.raises(CraftValidationError) as exc_info:
+        Project.from_yaml_file(project_file, error_positions=True)
+
+    assert (
+        "- extra field 1 not permitted in top-level configuration (project.yaml:2:1)"
+        in exc_info.value.args[0]
+    )
+
+
+def test_from_yaml_file_frozen(tmp_path):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(
+        "name: my-project\nversion: '1.0'\nparts:\n  my-part:\n    plugin: nil\n"
+    )
+    frozen_class = Project.frozen_class()
+
+    project = frozen_class.from_yaml_file(project_file)
+
+    assert isinstance(project, frozen_class)
+    assert hash(project) == hash(Project.from_yaml_file(project_file).freeze())
+
+
+@pytest.mark.parametrize(
+    ("content", "error_class"),
+    [("- a\n- b\n", TypeError), ("", TypeError), ("name: [1\n", yaml.YAMLError)],
+)
+def test_from_yaml_file_not_mapping(tmp_path, content, error_class):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(content)
+
+    with pytest.raises(error_class):
+        Project.from_yaml_file(project_file)
+
+
+@pytest.mark.parametrize("project", [BASIC_PROJECT, FULL_PROJECT])
+def test_json_file_round_trip(tmp_path, project):
+    project_file = tmp_path / "project.json"
+
+    project.to_json_file(project_file)
+
+    pytest_check.equal(Project.from_json_file(project_file), project)
+    pytest_check.equal(Project.from_yaml_file(project_file), project)
+
+
+def test_from_yaml_file_sniffs_json(tmp_path, mocker):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(json.dumps(BASIC_PROJECT_DICT))
+    load_items = mocker.spy(craft_application.models.base, "safe_yaml_load_items")
+
+    assert Project.from_yaml_file(project_file) == BASIC_PROJECT
+    assert load_items.call_count == 0
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        pytest.param('{"name": "-invalid-", "parts": {}, "extra": 1}', id="invalid"),
+        pytest.param(
+            '{\n  "name": "my-project",\n  "version": "1.0",\n'
+            '  "parts": {\n    "my-part": {"plugin": "not-a-plugin"}\n  }\n}\n',
+            id="bad-part",
+        ),
+        pytest.param('{"name": "a", "name": "b"}', id="duplicate-key"),
+        pytest.param('{"name": "my-project", "version": 1e5}', id="yaml-float"),
+        pytest.param("{name: my-project, version: '1.0', parts: {}}", id="yaml-flow"),
+        pytest.param('{"name": "my-project"', id="unclosed"),
+        pytest.param(
+            '{\n\t"name": "my-project",\n\t"version": "1.0",\n\t"parts": {}\n}\n',
+            id="tabs",
+        ),
+        pytest.param(
+            '{"name": "my-project", "version": "1.0", "parts": {}, "summary": "\x7f"}',
+            id="non-printable",
+        ),
+        pytest.param(
+            '{"name": "my-project", "version": "1.0", "parts": {}, '
+            '"summary": "a\u2029  b"}',
+            id="line-separator",
+        ),
+        pytest.param(
+            '{"name": "my-project", "version": "1.0", "parts": {}, '
+            '"summary": "\\ud83d\\ude00"}',
+            id="surrogate-pair",
+        ),
+        pytest.param(
+            '{"name": "my-project", "version": "1.0", "parts": {}, '
+            '"summary"\n: "a"}',
+            id="key-line-break",
+        ),
+        pytest.param(
+            '{"name": "my-project", "version": "1.0", '
+            '"parts": {"' + "p" * 1100 + '": {"plugin": "nil"}}}',
+            id="long-key",
+        ),
+    ],
+)
+def test_from_yaml_file_json_same_as_yaml(tmp_path, mocker, content):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(content)
+
+    def outcome():
+        try:
+            return Project.from_yaml_file(project_file)
+        except Exception as exc:  # noqa: BLE001
+            return type(exc), str(exc)
+
+    actual = outcome()
+    mocker.patch.object(
+        craft_application.models.base, "looks_like_json", return_value=False
+    )
+    expected = outcome()
+
+    assert actual == expected
+
+
+def test_from_json_file_errors_match_yaml(tmp_path):
+    content = '{\n  "name": "-invalid-",\n  "parts": {"p": {"plugin": "x"}}\n}\n'
+    json_file = tmp_path / "project.json"
+    json_file.write_text(content)
+    yaml_file = tmp_path / "project.yaml"
+    yaml_file.write_text(f"# A comment, so that this isn't read as JSON.\n{content}")
+
+    with pytest.raises(CraftValidationError) as json_error:
+        Project.from_json_file(json_file, error_positions=True)
+    with pytest.raises(CraftValidationError) as yaml_error:
+        Project.from_yaml_file(yaml_file, error_positions=True)
+
+    assert "(project.json:2:3)" in json_error.value.args[0]
+    assert json_error.value.args[0] == (
+        yaml_error.value.args[0]
+        .replace("project.yaml", "project.json")
+        .replace(":2:", ":1:")
+        .replace(":3:", ":2:")
+        .replace(":4:", ":3:")
+    )
+
+
+@pytest.mark.parametrize(
+    ("content", "error_class"),
+    [
+        ('{"name": "a", "name": "b"}', CraftValidationError),
+        ("{name: a}", ValueError),
+        ("[1, 2]", TypeError),
+        ('{"name": ' + "[" * 500 + "]" * 500 + "}", CraftValidationError),
+        ('{"name": ' + "[" * 100_000 + "]" * 100_000 + "}", CraftValidationError),
+    ],
+)
+def test_from_json_file_invalid(tmp_path, content, error_class):
+    project_file = tmp_path / "project.json"
+    project_file.write_text(content)
+
+    with pytest.raises(error_class):
+        Project.from_json_file(project_file)
+
+
+def write_fragments(tmp_path, project_text, fragments):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(project_text)
+    fragments_dir = tmp_path / "parts"
+    fragments_dir.mkdir()
+    for name, text in fragments.items():
+        (fragments_dir / name).write_text(text)
+    return project_file, fragments_dir
+
+
+@pytest.fixture()
+def clear_fragment_cache():
+    craft_application.models.project._fragment_cache.clear()
+
+
+@pytest.mark.usefixtures("clear_fragment_cache")
+def test_from_yaml_file_fragments(tmp_path):
+    project_file, fragments_dir = write_fragments(
+        tmp_path,
+        "name: project-name\nversion: '1.0'\nparts:\n  my-part:\n    plugin: nil\n",
+        {
+            "b.yaml": "part-b:\n  plugin: nil\n",
+            "a.yaml": "part-a:\n  plugin: dump\n  source: .\n",
+            "ignored.txt": "not a fragment",
+        },
+    )
+
+    project = Project.from_yaml_file(project_file, fragments=fragments_dir)
+
+    assert project.parts == {
+        "my-part": {"plugin": "nil"},
+        "part-a": {"plugin": "dump", "source": "."},
+        "part-b": {"plugin": "nil"},
+    }
+
+
+@pytest.mark.usefixtures("clear_fragment_cache")
+def test_from_yaml_file_fragments_only(tmp_path):
+    project_file, fragments_dir = write_fragments(
+        tmp_path,
+        "name: project-name\nversion: '1.0'\n",
+        {"a.yaml": "my-part:\n  plugin: nil\n", "empty.yaml": ""},
+    )
+
+    project = Project.from_yaml_file(project_file, fragments=fragments_dir)
+
+    assert project == BASIC_PROJECT
+
+
+@pytest.mark.usefixtures("clear_fragment_cache")
+def test_from_yaml_file_fragments_cached(tmp_path, mocker):
+    project_file, fragments_dir = write_fragments(
+        tmp_path,
+        "name: project-name\nversion: '1.0'\n",
+        {"a.yaml": "part-a:\n  plugin: nil\n", "b.yaml": "part-b:\n  plugin: nil\n"},
+    )
+    validate = mocker.spy(craft_application.models.project, "_validate_fragment")
+
+    first = Project.from_yaml_file(project_file, fragments=fragments_dir)
+    (fragments_dir / "b.yaml").write_text("part-b:\n  plugin: dump\n  source: .\n")
+    second = Project.from_yaml_file(project_file, fragments=fragments_dir)
+
+    assert validate.call_count == 3  # noqa: PLR2004
+    assert second.parts["part-b"] == {"plugin": "dump", "source": "."}
+    # Cached parts are copied, so changing one project doesn't change the other.
+    second.parts["part-a"]["plugin"] = "dump"
+    assert first.parts["part-a"] == {"plugin": "nil"}
+    third = Project.from_yaml_file(project_file, fragments=fragments_dir)
+    assert third.parts["part-a"] == {"plugin": "nil"}
+
+
+@pytest.mark.usefixtures("clear_fragment_cache")
+@pytest.mark.parametrize(
+    ("project_text", "fragments", "expected"),
+    [
+        pytest.param(
+            "name: project-name\nversion: '1.0'\n",
+            {
+                "a.yaml": "my-part:\n  plugin: nil\n",
+                "b.yaml": "my-part:\n  plugin: nil\n",
+            },
+            "- found duplicate key 'my-part' (in field 'parts.my-part') (parts/b.yaml:1:1)",
+            id="between-fragments",
+        ),
+        pytest.param(
+            "name: project-name\nversion: '1.0'\nparts:\n  my-part:\n    plugin: nil\n",
+            {"a.yaml": "my-part:\n  plugin: nil\n"},
+            "- found duplicate key 'my-part' (in field 'parts.my-part') (project.yaml:4:3)",
+            id="with-project-file",
+        ),
+    ],
+)
+def test_from_yaml_file_fragments_duplicates(
+    tmp_path, project_text, fragments, expected
+):
+    project_file, fragments_dir = write_fragments(tmp_path, project_text, fragments)
+
+    with pytest.raises(CraftValidationError) as exc_info:
+        Project.from_yaml_file(
+            project_file, fragments=fragments_dir, error_positions=True
+        )
+
+    assert expected in exc_info.value.args[0]
+
+
+@pytest.mark.usefixtures("clear_fragment_cache")
+def test_from_yaml_file_fragments_collects_errors(tmp_path):
+    project_file, fragments_dir = write_fragments(
+        tmp_path,
+        "name: -invalid-\nversion: '1.0'\n",
+        {
+            "a.yaml": "bad-a:\n  plugin: not-a-plugin\n",
+            "b.yaml": "good:\n  plugin: nil\n",
+            "c.yaml": "good: {}\n",
+        },
+    )
+
+    with pytest.raises(CraftValidationError) as exc_info:
+        Project.from_yaml_file(
+            project_file, fragments=fragments_dir, error_positions=True
+        )
+
+    message = exc_info.value.args[0]
+    for location in ["parts/a.yaml:1:1", "parts/c.yaml:1:1", "project.yaml:1:1"]:
+        assert f"({location})" in message
+
+
+@pytest.mark.usefixtures("clear_fragment_cache")
+def test_from_yaml_file_fragments_fail_fast(tmp_path):
+    project_file, fragments_dir = write_fragments(
+        tmp_path,
+        "name: -invalid-\nversion: '1.0'\n",
+        {"a.yaml": "bad-a:\n  plugin: not-a-plugin\n"},
+    )
+
+    with pytest.raises(CraftValidationError) as exc_info:
+        Project.from_yaml_file(project_file, fail_fast=True, fragments=fragments_dir)
+
+    assert "project.yaml" not in exc_info.value.args[0]
+
+
+@pytest.mark.usefixtures("clear_fragment_cache")
+@pytest.mark.parametrize(
+    ("content", "error_class"),
+    [
+        ("- a\n", TypeError),
+        ("my-part: {}\nmy-part: {}\n", yaml.YAMLError),
+    ],
+)
+def test_from_yaml_file_fragment_invalid(tmp_path, content, error_class):
+    project_file, fragments_dir = write_fragments(
+        tmp_path, "name: project-name\nversion: '1.0'\n", {"a.yaml": content}
+    )
+
+    with pytest.raises(error_class):
+        Project.from_yaml_file(project_file, fragments=fragments_dir)
+
+
+class PartsBaseProject(Project):
+    @pydantic.validator("parts")
+    @classmethod
+    def _check_parts_base(cls, value, values):
+        if value and values["base"] is None:
+            raise ValueError("parts need a base")
+        return value
+
+
+@pytest.mark.usefixtures("clear_fragment_cache")
+@pytest.mark.parametrize("project_parts", ["", "parts:\n  my-part:\n    plugin: nil\n"])
+def test_from_yaml_file_fragments_values_validator(tmp_path, project_parts):
+    project_file, fragments_dir = write_fragments(
+        tmp_path,
+        "name: project-name\nversion: '1.0'\nbase: core22\n" + project_parts,
+        {"a.yaml": "part-a:\n  plugin: nil\n"},
+    )
+    project = PartsBaseProject.from_yaml_file(project_file, fragments=fragments_dir)
+    pytest_check.equal(project.parts["part-a"], {"plugin": "nil"})
+
+    project_file.write_text("name: project-name\nversion: '1.0'\n" + project_parts)
+    with pytest.raises(CraftValidationError, match="parts need a base"):
+        PartsBaseProject.from_yaml_file(project_file, fragments=fragments_dir)
+
+
+@pytest.mark.usefixtures("clear_fragment_cache")
+@pytest.mark.parametrize("project_class", [BuildBaseProject, PartsBaseProject])
+def test_from_yaml_file_fragments_values_validator_invalid(tmp_path, project_class):
+    project_file, fragments_dir = write_fragments(
+        tmp_path,
+        "name: project-name\nversion: '1.0'\nbase: core22\n",
+        {"a.yaml": "bad-a:\n  plugin: not-a-plugin\n"},
+    )
+
+    with pytest.raises(CraftValidationError, match="bad-a"):
+        project_class.from_yaml_file(project_file, fragments=fragments_dir)
+
+
+LAZY_PROJECT = """\
+name: project-name
+version: '1.0'
+parts:
+  good-part:
+    plugin: nil
+  bad-part:
+    plugin: not-a-plugin
+  other-bad-part:
+    plugin: nil
+    source: [1]
+"""
+
+
+def test_from_yaml_file_lazy_parts(tmp_path, mocker):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(LAZY_PROJECT)
+    validate_part = mocker.spy(craft_parts, "validate_part")
+
+    project = Project.from_yaml_file(
+        project_file, lazy_parts=True, error_positions=True
+    )
+
+    pytest_check.equal(list(project.parts), ["good-part", "bad-part", "other-bad-part"])
+    pytest_check.equal(project.parts["good-part"], {"plugin": "nil"})
+    pytest_check.equal(validate_part.call_count, 1)
+    with pytest.raises(CraftValidationError) as exc_info:
+        project.parts["bad-part"]
+    assert exc_info.value.args[0].endswith("(project.yaml:6:3)")
+
+
+@pytest.mark.parametrize("fragments", [False, True])
+def test_from_yaml_file_lazy_parts_validate_all(tmp_path, fragments):
+    project_file, fragments_dir = write_fragments(
+        tmp_path, LAZY_PROJECT, {"a.yaml": "part-a:\n  plugin: nil\n"}
+    )
+    kwargs = {"fragments": fragments_dir} if fragments else {}
+    with pytest.raises(CraftValidationError) as eager_info:
+        Project.from_yaml_file(project_file, **kwargs)
+    project = Project.from_yaml_file(project_file, lazy_parts=True, **kwargs)
+    with pytest.raises(CraftValidationError):
+        project.parts["bad-part"]
+
+    with pytest.raises(CraftValidationError) as exc_info:
+        project.validate_all()
+
+    assert exc_info.value.args == eager_info.value.args
+
+
+def test_from_yaml_file_lazy_parts_other_error(tmp_path):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(LAZY_PROJECT.replace("project-name", "-invalid-"))
+
+    with pytest.raises(CraftValidationError) as eager_info:
+        Project.from_yaml_file(project_file)
+    with pytest.raises(CraftValidationError) as exc_info:
+        Project.from_yaml_file(project_file, lazy_parts=True)
+
+    assert exc_info.value.args == eager_info.value.args
+
+
+@pytest.mark.parametrize("suffix", ["yaml", "json"])
+def test_from_yaml_file_lazy_parts_valid(tmp_path, suffix):
+    project_file = tmp_path / f"project.{suffix}"
+    if suffix == "json":
+        FULL_PROJECT.to_json_file(project_file)
+    else:
+        FULL_PROJECT.to_yaml_file(project_file)
+
+    project = Project.from_yaml_file(project_file, lazy_parts=True)
+    project.validate_all()
+
+    pytest_check.equal(project, FULL_PROJECT)
+    pytest_check.equal(project.marshal(), FULL_PROJECT_DICT)
+    pytest_check.equal(project.freeze(), FULL_PROJECT.freeze())
+
+
+def test_validate_all_eager():
+    BASIC_PROJECT.validate_all()
+
+
+PATCH_PROJECT = """\
+# The project.
+name: project-name  # Not the title.
+version: '1.0'
+parts:
+  my-part:
+    plugin: nil  # Nothing to build.
+"""
+
+
+@pytest.mark.parametrize(
+    ("overrides", "parts", "expected"),
+    [
+        ({"version": "1.1"}, None, PATCH_PROJECT.replace("'1.0'", "'1.1'")),
+        (
+            {"source_code": "https://example.com"},
+            None,
+            PATCH_PROJECT + "source-code: https://example.com\n",
+        ),
+        (
+            {},
+            {"other": {"plugin": "nil"}},
+            PATCH_PROJECT + "  other:\n    plugin: nil\n",
+        ),
+        (
+            {},
+            {"my-part": None, "other": {"plugin": "nil"}},
+            PATCH_PROJECT.replace(
+                "  my-part:\n    plugin: nil  # Nothing to build.\n", ""
+            )
+            + "  other:\n    plugin: nil\n",
+        ),
+    ],
+)
+def test_patch_yaml_file(tmp_path, overrides, parts, expected):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(PATCH_PROJECT)
+    derived = Project.from_yaml_file(project_file).derive(parts=parts, **overrides)
+
+    Project.patch_yaml_file(project_file, parts=parts, **overrides)
+
+    pytest_check.equal(project_file.read_text(), expected)
+    pytest_check.equal(Project.from_yaml_file(project_file), derived)
+
+
+def test_patch_yaml_file_validates_changes_only(tmp_path, mocker):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(PATCH_PROJECT)
+    validate_part = mocker.patch("craft_parts.validate_part")
+
+    Project.patch_yaml_file(project_file, version="2.0", parts={"b": {"plugin": "nil"}})
+
+    validate_part.assert_called_once_with({"plugin": "nil"})
+
+
+@pytest.mark.parametrize(
+    ("overrides", "parts", "match"),
+    [
+        ({"version": "not a version"}, None, r"- .* \(in field 'version'\)"),
+        ({}, {"bad": {"plugin": "not-a-plugin"}}, r"in field 'parts\.bad'"),
+    ],
+)
+def test_patch_yaml_file_error(tmp_path, overrides, parts, match):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(PATCH_PROJECT)
+
+    with pytest.raises(CraftValidationError, match=match):
+        Project.patch_yaml_file(project_file, parts=parts, **overrides)
+
+    assert project_file.read_text() == PATCH_PROJECT
+
+
+def test_patch_yaml_file_unknown_field(tmp_path):
+    with pytest.raises(ValueError, match="Unknown project fields: not_a_field"):
+        Project.patch_yaml_file(tmp_path / "project.yaml", not_a_field="value")
+
+
+def test_patch_yaml_file_root_validator(tmp_path):
+    class RootValidatedProject(Project):
+        @pydantic.root_validator
+        @classmethod
+        def _check_version(cls, values):
+            if values.get("version") == "0":
+                raise ValueError("version 0 is not allowed")
+            return values
+
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(PATCH_PROJECT)
+
+    with pytest.raises(CraftValidationError, match="version 0 is not allowed"):
+        RootValidatedProject.patch_yaml_file(project_file, version="0")
+    RootValidatedProject.patch_yaml_file(project_file, version="2.0")
+
+    assert RootValidatedProject.from_yaml_file(project_file).version == "2.0"
+
+
+def test_patch_yaml_file_values_validator(tmp_path):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(PATCH_PROJECT + "base: core22\nbuild-base: core24\n")
+
+    with pytest.raises(CraftValidationError, match="build-base must differ"):
+        BuildBaseProject.patch_yaml_file(project_file, base="core24")
+    BuildBaseProject.patch_yaml_file(project_file, build_base="core20")
+
+    assert BuildBaseProject.from_yaml_file(project_file).build_base == "core20"
+
+
+def test_patch_yaml_file_keeps_mode_and_line_endings(tmp_path):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_bytes(PATCH_PROJECT.replace("\n", "\r\n").encode())
+    project_file.chmod(0o640)
+
+    Project.patch_yaml_file(
+        project_file, version="1.1", parts={"other": {"plugin": "nil"}}
+    )
+
+    expected = PATCH_PROJECT.replace("'1.0'", "'1.1'") + "  other:\n    plugin: nil\n"
+    pytest_check.equal(
+        project_file.read_bytes(), expected.replace("\n", "\r\n").encode()
+    )
+    pytest_check.equal(project_file.stat().st_mode & 0o777, 0o640)
+    pytest_check.equal(list(tmp_path.iterdir()), [project_file])
+
+
+def test_patch_yaml_file_write_error(tmp_path, mocker):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(PATCH_PROJECT)
+    mocker.patch("os.replace", side_effect=OSError("no space"))
+
+    with pytest.raises(OSError, match="no space"):
+        Project.patch_yaml_file(project_file, version="1.1")
+
+    pytest_check.equal(project_file.read_text(), PATCH_PROJECT)
+    pytest_check.equal(list(tmp_path.iterdir()), [project_file])
@@ -0,0 +1,451 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Differential tests for validating models from a stream of items."""
+import io
+from typing import Any, Dict, List
+
+import craft_parts
+import pydantic
+import pytest
+from craft_application.models import CraftBaseModel, Project
+from craft_application.models.streaming import (
+    LazyItems,
+    is_streamable,
+    merge_items,
+    split_keys,
+    validate_items,
+)
+from craft_application.util import safe_yaml_load_items
+from hypothesis import given, settings
+
+from tests.unit.models.test_compiler import (
+    DefaultsModel,
+    RootValidatedModel,
+    project_data,
+)
+
+
+class ValuesModel(CraftBaseModel):
+    low: int
+    high: int
+    items: Dict[str, int] = {}
+
+    @pydantic.validator("high")
+    @classmethod
+    def _check_high(cls, value: int, values: Dict[str, Any]) -> int:
+        if value < values.get("low", 0):
+            raise ValueError("high must not be lower than low")
+        return value
+
+
+class WholeDictModel(CraftBaseModel):
+    items: Dict[str, int]
+
+    @pydantic.validator("items")
+    @classmethod
+    def _check_items(cls, value: Dict[str, int]) -> Dict[str, int]:
+        if len(value) > 1:
+            raise ValueError("too many items")
+        return value
+
+
+class KeyedModel(CraftBaseModel):
+    items: Dict[pydantic.constr(min_length=2), List[int]]
+
+
+def _items(model, data):
+    """Split data into items the way safe_yaml_load_items does."""
+    split = split_keys(model)
+    for key, value in data.items():
+        if key in split and isinstance(value, dict):
+            yield (key,), {}
+            for item_key, item in value.items():
+                yield (key, item_key), item
+        else:
+            yield (key,), value
+
+
+def _outcome(function, data):
+    try:
+        model = function(data)
+    except pydantic.ValidationError as exc:
+        return ("error", sorted(exc.errors(), key=repr))
+    return ("model", type(model), model.__dict__, model.__fields_set__)
+
+
+def _validate_lazily(model, data):
+    """Validate with lazy dictionary fields, then validate all of their items."""
+    lazy = [field.name for field in model.__fields__.values() if field.alias in data]
+    validated = validate_items(model, _items(model, data), lazy=lazy)
+    for name, value in validated.__dict__.items():
+        if isinstance(value, LazyItems):
+            value.validate_all()
+            validated.__dict__[name] = dict(value)
+    return validated
+
+
+def assert_equivalent(model, data):
+    expected = _outcome(lambda d: model(**d), data)
+    actual = _outcome(lambda d: validate_items(model, _items(model, d)), data)
+    lazy = _outcome(lambda d: _validate_lazily(model, d), data)
+
+    assert actual == expected
+    assert lazy == expected
+
+
+@given(data=project_data())
+@settings(max_examples=300, deadline=None)
+def test_project_equivalent_hypothesis(data):
+    assert_equivalent(Project, data)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pytest.param({}, id="empty"),
+        pytest.param({"name": "my-project", "version": "1", "parts": {}}, id="valid"),
+        pytest.param(
+            {"name": "my-project", "version": "1", "parts": {"p": {"plugin": "x"}}},
+            id="bad-plugin",
+        ),
+        pytest.param(
+            {
+                "name": "my-project",
+                "version": "1",
+                "parts": {},
+                "source_code": "https://example.org",
+                "source-code": 1,
+            },
+            id="name-then-alias",
+        ),
+        pytest.param(
+            {
+                "name": "my-project",
+                "version": "1",
+                "parts": {},
+                "source-code": "https://example.com",
+                "source_code": 1,
+            },
+            id="alias-then-name",
+        ),
+    ],
+)
+def test_project_equivalent(data):
+    assert_equivalent(Project, data)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"version": "2", "tags": {"a": 1}},
+        {"comment": None, "other": 1},
+        {"version": 1.5},
+    ],
+)
+def test_defaults_equivalent(data):
+    assert_equivalent(DefaultsModel, data)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"high": 2, "low": 1},
+        {"high": 1, "low": 2},
+        {"low": 1, "high": 2, "items": {"a": 1, "b": "x"}},
+        {"high": "x", "low": 1},
+    ],
+)
+def test_values_equivalent(data):
+    assert_equivalent(ValuesModel, data)
+
+
+@pytest.mark.parametrize("data", [{"items": {"a": 1}}, {"items": {"a": 1, "b": 2}}])
+def test_whole_dict_equivalent(data):
+    assert split_keys(WholeDictModel) == set()
+    assert_equivalent(WholeDictModel, data)
+
+
+class ExtraAllowedModel(CraftBaseModel):
+    build_base: str = "core22"
+    part_list: Dict[str, int] = {}
+
+    class Config:
+        extra = pydantic.Extra.allow
+
+
+class ExtraAllowedAliasOnlyModel(ExtraAllowedModel):
+    class Config:
+        allow_population_by_field_name = False
+
+
+@pytest.mark.parametrize("model", [ExtraAllowedModel, ExtraAllowedAliasOnlyModel])
+@pytest.mark.parametrize(
+    "data",
+    [
+        pytest.param({"build_base": "core24", "other": 1}, id="name"),
+        pytest.param({"build-base": "core24", "build_base": 1}, id="alias-then-name"),
+        pytest.param({"build_base": 1, "build-base": "core24"}, id="name-then-alias"),
+        pytest.param(
+            {"part-list": {"a": 1}, "part_list": {"b": "x"}},
+            id="dict-alias-then-name",
+        ),
+        pytest.param(
+            {"part_list": {"b": "x"}, "part-list": {"a": 1}},
+            id="dict-name-then-alias",
+        ),
+        pytest.param({"part_list": {"b": "x"}}, id="dict-name-invalid"),
+    ],
+)
+def test_extra_allowed_equivalent(model, data):
+    assert_equivalent(model, data)
+
+
+def test_split_keys():
+    assert split_keys(Project) == {"parts"}
+    assert split_keys(ValuesModel) == {"items"}
+
+
+class ValidateAllModel(CraftBaseModel):
+    count: int = 0
+
+    class Config:
+        validate_all = True
+
+
+def test_is_streamable():
+    assert is_streamable(Project)
+    assert not is_streamable(RootValidatedModel)
+    assert not is_streamable(Project.frozen_class())
+    assert not is_streamable(ValidateAllModel)
+
+
+def test_validate_items_non_string_key():
+    items = [(("name",), "my-project"), ((1,), 2)]
+
+    with pytest.raises(pydantic.ValidationError) as exc_info:
+        validate_items(Project, items)
+
+    assert {"loc": ("1",), "msg": "extra fields not permitted"}.items() <= (
+        exc_info.value.errors()[-1].items()
+    )
+
+
+@pytest.mark.parametrize("fail_fast", [True, False])
+def test_validate_items_fail_fast(fail_fast):
+    consumed = []
+
+    def items():
+        for item in [
+            (("name",), "my-project"),
+            (("version",), "1"),
+            (("parts",), {}),
+            (("parts", "bad"), {"plugin": "not-a-plugin"}),
+            (("parts", "good"), {"plugin": "nil"}),
+            (("summary",), ["not", "a", "string"]),
+        ]:
+            consumed.append(item[0])
+            yield item
+
+    with pytest.raises(pydantic.ValidationError) as exc_info:
+        validate_items(Project, items(), fail_fast=fail_fast)
+
+    errors = exc_info.value.errors()
+    if fail_fast:
+        assert consumed[-1] == ("parts", "bad")
+        assert [error["loc"][:2] for error in errors] == [("parts", "bad")]
+    else:
+        assert consumed[-1] == ("summary",)
+        assert [error["loc"][:2] for error in errors] == [
+            ("summary",),
+            ("parts", "bad"),
+        ]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"name": "my-project", "version": "1", "parts": {"a": {"plugin": "nil"}}},
+        {"name": "my-project", "version": "1"},
+    ],
+)
+def test_validate_items_validated(data):
+    validated = {"parts": {"b": {"plugin": "nil"}}}
+
+    project = validate_items(Project, _items(Project, data), validated=validated)
+
+    assert project.parts == {**data.get("parts", {}), "b": {"plugin": "nil"}}
+    assert "parts" in project.__fields_set__
+
+
+def test_validate_items_validated_duplicate():
+    data = {"low": 1, "high": 2, "items": {"a": 1}}
+
+    with pytest.raises(pydantic.ValidationError) as exc_info:
+        validate_items(
+            ValuesModel, _items(ValuesModel, data), validated={"items": {"a": 2}}
+        )
+
+    assert [error["loc"] for error in exc_info.value.errors()] == [("items", "a")]
+
+
+def test_merge_items():
+    data = {"items": {"a": 1}}
+
+    merged = merge_items(WholeDictModel, data, {"items": {"b": 2}})
+
+    assert merged == {"items": {"a": 1, "b": 2}}
+    assert data == {"items": {"a": 1}}
+
+
+def test_merge_items_duplicate():
+    with pytest.raises(pydantic.ValidationError) as exc_info:
+        merge_items(WholeDictModel, {"items": {"a": 1}}, {"items": {"a": 2}})
+
+    assert [error["loc"] for error in exc_info.value.errors()] == [("items", "a")]
+
+
+def test_validate_items_aliases_validated_once(mocker):
+    validate_part = mocker.spy(craft_parts, "validate_part")
+    content = (
+        "name: my-project\nversion: '1'\nparts:\n"
+        "  p1: &part {plugin: nil}\n  p2: *part\n  p3: *part\n"
+    )
+    items = safe_yaml_load_items(io.StringIO(content), split=split_keys(Project))
+
+    project = validate_items(Project, items)
+
+    assert validate_part.call_count == 1
+    assert project.parts == {name: {"plugin": "nil"} for name in ["p1", "p2", "p3"]}
+    # Each part is a separate dictionary, as if it had been validated alone.
+    assert project.parts["p1"] is not project.parts["p2"]
+
+
+def test_validate_items_aliases_key_invalid():
+    shared = [1]
+    items = [(("items",), {}), (("items", "ab"), shared), (("items", "a"), shared)]
+
+    with pytest.raises(pydantic.ValidationError) as exc_info:
+        validate_items(KeyedModel, items)
+
+    assert [error["loc"] for error in exc_info.value.errors()] == [("items", "__key__")]
+
+
+LAZY_ITEMS = [
+    (("name",), "my-project"),
+    (("version",), "1"),
+    (("parts",), {}),
+    (("parts", "good"), {"plugin": "nil"}),
+    (("parts", "bad"), {"plugin": "not-a-plugin"}),
+    (("parts", "other"), {"plugin": "dump", "source": "."}),
+]
+
+
+def test_validate_items_lazy(mocker):
+    validate_part = mocker.spy(craft_parts, "validate_part")
+
+    project = validate_items(Project, LAZY_ITEMS, lazy=["parts"])
+
+    assert isinstance(project.parts, LazyItems)
+    assert list(project.parts) == ["good", "bad", "other"]
+    assert validate_part.call_count == 0
+    assert project.parts["good"] == {"plugin": "nil"}
+    assert project.parts.get("good") == {"plugin": "nil"}
+    assert validate_part.call_count == 1
+
+
+def test_validate_items_lazy_error_cached(mocker):
+    validate_part = mocker.spy(craft_parts, "validate_part")
+    project = validate_items(Project, LAZY_ITEMS, lazy=["parts"])
+
+    for _ in range(2):
+        with pytest.raises(pydantic.ValidationError) as exc_info:
+            project.parts["bad"]
+        assert [error["loc"][:2] for error in exc_info.value.errors()] == [
+            ("parts", "bad")
+        ]
+
+    assert validate_part.call_count == 1
+
+
+def test_validate_items_lazy_validate_all(mocker):
+    project = validate_items(Project, LAZY_ITEMS, lazy=["parts"])
+    project.parts["good"]
+    validate_part = mocker.spy(craft_parts, "validate_part")
+
+    with pytest.raises(pydantic.ValidationError) as exc_info:
+        project.parts.validate_all()
+
+    assert [error["loc"][:2] for error in exc_info.value.errors()] == [("parts", "bad")]
+    # The part that was already used isn't validated again.
+    assert [call.args[0] for call in validate_part.call_args_list] == [
+        {"plugin": "not-a-plugin"},
+        {"plugin": "dump", "source": "."},
+    ]
+
+
+def test_validate_items_lazy_on_error():
+    project = validate_items(
+        Project, LAZY_ITEMS, lazy=["parts"], on_error=lambda error: KeyError("bad")
+    )
+
+    with pytest.raises(KeyError, match="bad"):
+        project.parts.values()
+
+
+def test_validate_items_lazy_other_error():
+    items = [*LAZY_ITEMS, (("summary",), ["not", "a", "string"])]
+
+    with pytest.raises(pydantic.ValidationError) as exc_info:
+        validate_items(Project, items, lazy=["parts"])
+
+    assert [error["loc"][:2] for error in exc_info.value.errors()] == [
+        ("summary",),
+        ("parts", "bad"),
+    ]
+
+
+def test_validate_items_lazy_uses_values():
+    data = {"low": 1, "high": 2, "items": {"a": 1}}
+
+    model = validate_items(ValuesModel, _items(ValuesModel, data), lazy=["items"])
+
+    assert type(model.items) is dict
+    assert model.items == {"a": 1}
+
+
+def test_validate_items_lazy_key_invalid():
+    items = [(("items",), {}), (("items", "a"), [1]), (("items", "ab"), [2])]
+
+    with pytest.raises(pydantic.ValidationError) as exc_info:
+        validate_items(KeyedModel, items, lazy=["items"])
+
+    assert [error["loc"] for error in exc_info.value.errors()] == [("items", "__key__")]
+
+
+def test_lazy_items_changes():
+    items = validate_items(
+        KeyedModel, [(("items",), {}), (("items", "ab"), ["1"])], lazy=["items"]
+    ).items
+    items["cd"] = ["not validated"]
+
+    assert items.copy() == {"ab": [1], "cd": ["not validated"]}
+    assert items.pop("cd") == ["not validated"]
+    assert items.setdefault("ef", []) == []
+    assert items.popitem() == ("ef", [])
+    items.update(ab=["x"])
+    assert dict(items) == {"ab": ["x"]}
+    del items["ab"]
+    assert items == {}
@@ -0,0 +1,168 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Tests for version ordering and the version index."""
+import functools
+import re
+
+import pytest
+from craft_application.models import VersionIndex, VersionStr
+from hypothesis import given, strategies
+
+from tests.unit.models.test_constraints import VERSION_STRING_VALID_CHARACTERS
+
+
+def _order(character):
+    if character.isdigit():
+        return 0
+    if character == "~":
+        return -1
+    if character.isalpha():
+        return ord(character)
+    return ord(character) + 256
+
+
+def _verrevcmp(a, b):
+    """Compare upstream versions or revisions, as dpkg does."""
+    while a or b:
+        while (a and not a[0].isdigit()) or (b and not b[0].isdigit()):
+            ac = _order(a[0]) if a else 0
+            bc = _order(b[0]) if b else 0
+            if ac != bc:
+                return ac - bc
+            a, b = a[1:], b[1:]
+        a_digits = re.match(r"\d*", a).group()
+        b_digits = re.match(r"\d*", b).group()
+        first_diff = int(a_digits or 0) - int(b_digits or 0)
+        if first_diff:
+            return first_diff
+        a, b = a[len(a_digits) :], b[len(b_digits) :]
+    return 0
+
+
+def _split(version):
+    epoch, colon, rest = version.partition(":")
+    if not (colon and epoch.isdigit()):
+        epoch, rest = "0", version
+    upstream, hyphen, revision = rest.rpartition("-")
+    if not hyphen:
+        upstream, revision = rest, ""
+    return int(epoch), upstream, revision
+
+
+def dpkg_compare(a, b):
+    """A reference implementation of dpkg's version comparison."""
+    a_epoch, a_upstream, a_revision = _split(a)
+    b_epoch, b_upstream, b_revision = _split(b)
+    if a_epoch != b_epoch:
+        return a_epoch - b_epoch
+    return _verrevcmp(a_upstream, b_upstream) or _verrevcmp(a_revision, b_revision)
+
+
+def _sign(number):
+    return (number > 0) - (number < 0)
+
+
+versions = strategies.text(
+    strategies.sampled_from(VERSION_STRING_VALID_CHARACTERS[-20:]), max_size=12
+)
+
+
+@given(a=versions, b=versions)
+def test_sort_key_matches_dpkg(a, b):
+    key_a, key_b = VersionStr.sort_key(a), VersionStr.sort_key(b)
+
+    actual = (key_a > key_b) - (key_a < key_b)
+
+    assert actual == _sign(dpkg_compare(a, b))
+
+
+@pytest.mark.parametrize(
+    "ordered",
+    [
+        ["1.0~rc1", "1.0", "1.0+b1", "1.0.1"],
+        ["1.0-1", "1.0-1build1", "1.0-2", "1.0-10"],
+        ["~~", "~~a", "~", "1", "a", "a1"],
+        ["9.9", "10", "1:0.1", "2:0"],
+        ["1.0+git1", "1.0+git9", "1.0+git10"],
+    ],
+)
+def test_sort_key_order(ordered):
+    unordered = list(reversed(ordered))
+
+    assert sorted(unordered, key=VersionStr.sort_key) == ordered
+
+
+@pytest.mark.parametrize(
+    ("a", "b"),
+    [("1.0", "1.00"), ("1.", "1.0"), ("1.0", "1.0-0"), ("0:1", "1"), ("a", "a0")],
+)
+def test_sort_key_equal(a, b):
+    assert VersionStr.sort_key(a) == VersionStr.sort_key(b)
+
+
+INDEX_VERSIONS = ["2.0", "1.0", "1.0~rc1", "1.00", "1:0.1", "1.5", "1.10"]
+
+
+def test_version_index_sorted():
+    index = VersionIndex(INDEX_VERSIONS)
+
+    assert list(index) == ["1.0~rc1", "1.0", "1.00", "1.5", "1.10", "2.0", "1:0.1"]
+    assert list(reversed(index)) == list(reversed(list(index)))
+    assert len(index) == len(INDEX_VERSIONS)
+    assert index.latest() == "1:0.1"
+    assert VersionIndex().latest() is None
+
+
+@pytest.mark.parametrize(
+    ("low", "high", "include_low", "include_high", "expected"),
+    [
+        ("1.0", "2.0", True, False, ["1.0", "1.00", "1.5", "1.10"]),
+        ("1.0", "2.0", False, True, ["1.5", "1.10", "2.0"]),
+        ("1.0~", "1.0~rc2", True, True, ["1.0~rc1"]),
+        (None, "1.5", True, False, ["1.0~rc1", "1.0", "1.00"]),
+        ("2.0", None, True, False, ["2.0", "1:0.1"]),
+        ("3.0", "1.0", True, True, []),
+    ],
+)
+def test_version_index_between(low, high, include_low, include_high, expected):
+    index = VersionIndex(INDEX_VERSIONS)
+
+    actual = index.between(
+        low, high, include_low=include_low, include_high=include_high
+    )
+
+    assert actual == expected
+
+
+def test_version_index_add_discard():
+    index = VersionIndex(["1.0", "2.0"])
+
+    index.add("1.00")
+    index.add("1.5")
+    index.discard("1.0")
+    index.discard("3.0")
+
+    assert list(index) == ["1.00", "1.5", "2.0"]
+    assert "1.00" in index
+    assert "1.0" not in index
+    assert 1 not in index
+
+
+@given(strategies.lists(versions))
+def test_version_index_matches_dpkg(versions_list):
+    index = VersionIndex(versions_list)
+
+    assert list(index) == sorted(versions_list, key=functools.cmp_to_key(dpkg_compare))
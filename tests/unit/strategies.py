@@ -0,0 +1,202 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Hypothesis strategies for adversarial inputs."""
+from typing import Any, Dict, Type
+
+from craft_application.models import ProjectName, VersionStr
+from hypothesis import strategies
+from pydantic import ConstrainedStr
+
+VALID_PART = {"plugin": "nil"}
+VALID_PROJECT: Dict[str, Any] = {
+    "name": "my-project",
+    "version": "1.0",
+    "parts": {"my-part": VALID_PART},
+}
+
+
+# region Constrained strings
+def constrained_str_inputs(
+    type_: Type[ConstrainedStr],
+) -> strategies.SearchStrategy[str]:
+    """Strings that match, or almost match, a constrained string's regex.
+
+    Near-matches are as long as allowed, made of a repeated valid fragment and
+    followed by an invalid suffix, which is the worst case for regexes that
+    backtrack.
+    """
+    regex = type_.regex
+    assert regex is not None
+    max_length = type_.max_length or 100
+    valid = strategies.from_regex(regex, fullmatch=True).filter(
+        lambda value: len(value) <= max_length
+    )
+    repeated = strategies.builds(
+        lambda fragment, suffix: (fragment * max_length)[: max_length - 1] + suffix,
+        strategies.sampled_from(["a", "a1", "a-", "1", "-", "1.", "a~", "a:+"]),
+        strategies.sampled_from(["", "!", "-", "--", ".", "\n", "A", " ", "_"]),
+    )
+    return strategies.one_of(
+        valid,
+        repeated,
+        strategies.text(alphabet="az09-.:+~_!", max_size=max_length + 1),
+    )
+
+
+def project_names() -> strategies.SearchStrategy[str]:
+    return constrained_str_inputs(ProjectName)
+
+
+def versions() -> strategies.SearchStrategy[str]:
+    return constrained_str_inputs(VersionStr)
+
+
+# endregion
+
+
+# region Project data
+def _mutate(data: Dict[str, Any], key: str, value: Any) -> Dict[str, Any]:
+    return {**data, key: value}
+
+
+def project_data(max_parts: int = 200) -> strategies.SearchStrategy[Dict[str, Any]]:
+    """Valid projects and projects with a few mistakes in them."""
+    parts = strategies.dictionaries(
+        strategies.from_regex(r"[a-z][a-z0-9-]{0,20}", fullmatch=True),
+        strategies.one_of(
+            strategies.just(VALID_PART),
+            strategies.fixed_dictionaries(
+                {"plugin": strategies.sampled_from(["nil", "dump", "not-a-plugin"])},
+                optional={
+                    "source": strategies.just("."),
+                    "build-packages": strategies.lists(
+                        strategies.text(max_size=20), max_size=5
+                    ),
+                    "invalid-key": strategies.integers(),
+                },
+            ),
+            strategies.integers(),
+        ),
+        max_size=max_parts,
+    )
+    valid = strategies.builds(
+        lambda name, version, parts: {
+            **VALID_PROJECT,
+            "name": name,
+            "version": version,
+            "parts": parts,
+        },
+        project_names(),
+        versions(),
+        parts,
+    )
+    near_valid = strategies.builds(
+        _mutate,
+        valid,
+        strategies.sampled_from(
+            [
+                "name",
+                "version",
+                "title",
+                "summary",
+                "source-code",
+                "contact",
+                "parts",
+                "unknown",
+            ]
+        ),
+        strategies.one_of(
+            strategies.none(),
+            strategies.integers(),
+            strategies.text(max_size=200),
+            strategies.lists(strategies.text(max_size=10), max_size=10),
+            strategies.dictionaries(
+                strategies.text(max_size=10), strategies.integers(), max_size=10
+            ),
+        ),
+    )
+    return strategies.one_of(valid, near_valid)
+
+
+# endregion
+
+
+# region YAML documents
+def _alias_bomb(levels: int, fanout: int) -> str:
+    lines = ["l0: &l0 [x]"]
+    for level in range(1, levels + 1):
+        aliases = ", ".join([f"*l{level - 1}"] * fanout)
+        lines.append(f"l{level}: &l{level} [{aliases}]")
+    return "\n".join(lines)
+
+
+def _merge_bomb(levels: int) -> str:
+    lines = ["m0: &m0 {a: 1, b: 2}"]
+    for level in range(1, levels + 1):
+        lines.append(f"m{level}: &m{level} {{<<: [*m{level - 1}, *m{level - 1}]}}")
+    return "\n".join(lines)
+
+
+def _deep_nesting(depth: int, flow: bool) -> str:  # noqa: FBT001
+    if flow:
+        return "a: " + "[" * depth + "]" * depth
+    # Block nesting is quadratic in size, so it's kept shallower.
+    depth //= 4
+    return "\n".join(f"{'  ' * level}k{level}:" for level in range(depth)) + " x"
+
+
+def _long_key(length: int) -> str:
+    return f"{'k' * length}: value\n"
+
+
+def _duplicate_keys(count: int, nested: bool) -> str:  # noqa: FBT001
+    lines = [f"key-{index}: {index}" for index in range(count)] + ["key-0: again"]
+    if nested:
+        return "outer:\n" + "\n".join(f"  {line}" for line in lines)
+    return "\n".join(lines)
+
+
+def _many_keys(count: int) -> str:
+    return "\n".join(f"key-{index}: [{index}, {{a: b}}]" for index in range(count))
+
+
+def nasty_yaml() -> strategies.SearchStrategy[str]:
+    """YAML documents designed to be expensive or awkward to load."""
+    return strategies.one_of(
+        strategies.builds(
+            _alias_bomb,
+            strategies.integers(min_value=1, max_value=12),
+            strategies.integers(min_value=2, max_value=10),
+        ),
+        strategies.builds(_merge_bomb, strategies.integers(min_value=1, max_value=24)),
+        strategies.builds(
+            _deep_nesting,
+            strategies.integers(min_value=1, max_value=500),
+            strategies.booleans(),
+        ),
+        strategies.builds(
+            _long_key, strategies.integers(min_value=1, max_value=100_000)
+        ),
+        strategies.builds(
+            _duplicate_keys,
+            strategies.integers(min_value=1, max_value=2000),
+            strategies.booleans(),
+        ),
+        strategies.builds(_many_keys, strategies.integers(min_value=1, max_value=2000)),
+    )
+
+
+# endregion
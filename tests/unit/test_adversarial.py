@@ -0,0 +1,128 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Performance bounds for loading and validating adversarial inputs.
+
+The bounds are generous enough not to be flaky on slow CI runners, but low
+enough that super-linear behaviour (e.g. exponential regex backtracking or
+unbounded alias expansion) fails the tests.
+"""
+import io
+import time
+import tracemalloc
+from typing import Any, Callable
+
+import pydantic
+import pytest
+import yaml
+from craft_application.errors import CraftValidationError
+from craft_application.models import Project, ProjectName, VersionStr
+from craft_application.util import safe_yaml_load
+from craft_application.util.error_formatting import format_pydantic_errors
+from hypothesis import HealthCheck, given, settings
+
+from tests.unit import strategies
+
+MAX_SECONDS = 2.0
+MAX_CONSTRAINED_STR_SECONDS = 0.05
+# Memory allowed for each character of a document, on top of a fixed allowance.
+MAX_BYTES_PER_CHAR = 200
+MAX_FIXED_BYTES = 64 * 1024 * 1024
+
+adversarial_settings = settings(
+    deadline=None,
+    max_examples=50,
+    suppress_health_check=[HealthCheck.too_slow, HealthCheck.data_too_large],
+)
+
+
+def _call(function: Callable[..., Any], *args: Any) -> None:
+    """Call a function, ignoring errors from rejecting its input."""
+    try:
+        function(*args)
+    except (CraftValidationError, pydantic.ValidationError, yaml.YAMLError):
+        pass
+
+
+def measure_time(function: Callable[..., Any], *args: Any) -> float:
+    """Measure how long a function takes, in seconds."""
+    start = time.perf_counter()
+    _call(function, *args)
+    return time.perf_counter() - start
+
+
+def measure_peak_memory(function: Callable[..., Any], *args: Any) -> int:
+    """Measure the peak memory a function allocates, in bytes.
+
+    Tracing memory slows the function down, so this is measured separately.
+    """
+    tracemalloc.start()
+    try:
+        _call(function, *args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+@given(document=strategies.nasty_yaml())
+@adversarial_settings
+def test_safe_yaml_load_bounded(document):
+    def load():
+        return safe_yaml_load(io.StringIO(document))
+
+    assert measure_time(load) < MAX_SECONDS
+    assert measure_peak_memory(load) < (
+        MAX_FIXED_BYTES + MAX_BYTES_PER_CHAR * len(document)
+    )
+
+
+@given(data=strategies.project_data())
+@adversarial_settings
+def test_unmarshal_bounded(data):
+    assert measure_time(Project.unmarshal, data) < MAX_SECONDS
+
+
+@given(data=strategies.project_data())
+@adversarial_settings
+def test_format_pydantic_errors_bounded(data):
+    try:
+        Project.unmarshal(data)
+    except pydantic.ValidationError as exc:
+        errors = exc.errors()
+    else:
+        return
+
+    assert measure_time(format_pydantic_errors, errors) < MAX_SECONDS
+
+
+@pytest.mark.parametrize(
+    ("type_", "strategy"),
+    [
+        (ProjectName, strategies.project_names()),
+        (VersionStr, strategies.versions()),
+    ],
+)
+def test_constrained_str_regex_bounded(type_, strategy):
+    @given(value=strategy)
+    @adversarial_settings
+    def check(value):
+        start = time.perf_counter()
+        type_.regex.match(value)
+        duration = time.perf_counter() - start
+
+        assert duration < MAX_CONSTRAINED_STR_SECONDS
+
+    check()
@@ -14,10 +14,15 @@
 # You should have received a copy of the GNU General Public License along
 # with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Tests for craft-application app classes."""
+import sys
+import textwrap
+
 import craft_application
 import pytest
 import pytest_check
-from craft_application.app import AppMetadata
+from craft_application.app import Application, AppMetadata, CommandGroup, LazyCommand
+
+EXIT_USAGE = 64  # Command line usage error, as in sysexits.h
 
 
 @pytest.mark.parametrize("summary", ["A summary", None])
@@ -26,3 +31,120 @@ def test_app_metadata_post_init_correct(summary):
 
     pytest_check.equal(app.version, craft_application.__version__)
     pytest_check.is_not_none(app.summary)
+
+
+@pytest.fixture()
+def command_module(tmp_path, monkeypatch):
+    """A module with a command that records how it was run."""
+    module_name = f"lazy_commands_{tmp_path.name}"
+    (tmp_path / f"{module_name}.py").write_text(
+        textwrap.dedent(
+            """\
+            import craft_cli
+
+            class BuildCommand(craft_cli.BaseCommand):
+                name = "build"
+                help_msg = "Build the thing"
+                overview = "Build the thing, in detail."
+
+                def fill_parser(self, parser):
+                    parser.add_argument("--fast", action="store_true", help="Go fast")
+
+                def run(self, parsed_args):
+                    self.config["calls"].append(parsed_args.fast)
+                    return 3 if parsed_args.fast else None
+            """
+        )
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield module_name
+    sys.modules.pop(module_name, None)
+
+
+@pytest.fixture()
+def application(command_module):
+    command = LazyCommand("build", "Build the thing", f"{command_module}:BuildCommand")
+    app = AppMetadata("craft-application", "A craft application")
+    return Application(app, [CommandGroup("Lifecycle", [command])])
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [["--version"], ["-V"], ["--verbose", "-V"], ["--verbosity", "brief", "-V"]],
+)
+def test_application_version(capsys, application, command_module, argv):
+    assert application.run(argv) == 0
+
+    assert (
+        f"craft-application {craft_application.__version__}" in capsys.readouterr().out
+    )
+    assert command_module not in sys.modules
+
+
+def test_application_version_after_command(capsys, application, command_module):
+    application.run(["build", "--version"])
+
+    assert craft_application.__version__ not in capsys.readouterr().out
+    assert command_module in sys.modules
+
+
+@pytest.mark.parametrize("argv", [["--help"], ["help"], []])
+def test_application_help(capsys, application, command_module, argv):
+    application.run(argv)
+
+    help_text = capsys.readouterr().err
+    pytest_check.is_in("Lifecycle:  build", help_text)
+    pytest_check.is_in("--version", help_text)
+    pytest_check.is_not_in(command_module, sys.modules)
+
+
+def test_application_help_all(capsys, application, command_module):
+    assert application.run(["help", "--all"]) == 0
+
+    pytest_check.is_in("Build the thing", capsys.readouterr().err)
+    pytest_check.is_not_in(command_module, sys.modules)
+
+
+def test_application_command_help_loads_command(capsys, application, command_module):
+    assert application.run(["help", "build"]) == 0
+
+    help_text = capsys.readouterr().err
+    pytest_check.is_in("Build the thing, in detail.", help_text)
+    pytest_check.is_in("--fast", help_text)
+    pytest_check.is_in(command_module, sys.modules)
+
+
+@pytest.mark.parametrize(
+    ("argv", "return_code"), [(["build"], 0), (["build", "--fast"], 3)]
+)
+def test_application_run_command(monkeypatch, application, argv, return_code):
+    calls = []
+    original_load = LazyCommand.load
+
+    def load(self):
+        command_class = original_load(self)
+        return lambda config: command_class({**config, "calls": calls})
+
+    monkeypatch.setattr(LazyCommand, "load", load)
+
+    assert application.run(argv) == return_code
+    assert calls == [argv[1:] == ["--fast"]]
+
+
+def test_application_unknown_command(application):
+    assert application.run(["bulid"]) == EXIT_USAGE
+
+
+def test_lazy_command_load_wrong_name(command_module):
+    command = LazyCommand("pack", "Pack the thing", f"{command_module}:BuildCommand")
+
+    with pytest.raises(ValueError, match="which is the 'build' command"):
+        command.load()
+
+
+@pytest.mark.parametrize("import_path", ["module", ":Class", "module:"])
+def test_lazy_command_load_invalid_path(import_path):
+    command = LazyCommand("build", "Build the thing", import_path)
+
+    with pytest.raises(ValueError, match="not in the form 'module:Class'"):
+        command.load()
@@ -0,0 +1,172 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Tests for the project catalog."""
+import pytest
+import pytest_check
+from craft_application.catalog import ProjectCatalog
+from craft_application.models import Project, ProjectHeader
+
+
+def make_project(name, version, base="core22", plugins=("nil",)):
+    return Project(
+        name=name,
+        version=version,
+        base=base,
+        parts={
+            f"part-{plugin}": {"plugin": plugin, "source": "."} for plugin in plugins
+        },
+    )
+
+
+@pytest.fixture()
+def projects():
+    return [
+        make_project("hello", "1.0"),
+        make_project("hello", "1.10", plugins=("dump",)),
+        make_project("hello", "1.9", base="core24"),
+        make_project("world", "2.0~rc1", base="core24", plugins=("nil", "dump")),
+        make_project("world", "2.0", plugins=()),
+    ]
+
+
+@pytest.fixture()
+def catalog(projects):
+    return ProjectCatalog(projects)
+
+
+@pytest.mark.parametrize(
+    ("query", "expected"),
+    [
+        ({}, [0, 1, 2, 3, 4]),
+        ({"name": "hello"}, [0, 1, 2]),
+        ({"effective_base": "core24"}, [2, 3]),
+        ({"version": "2.0"}, [4]),
+        ({"plugin": "dump"}, [1, 3]),
+        ({"name": "hello", "plugin": "nil"}, [0, 2]),
+        ({"name": "world", "effective_base": "core22", "plugin": "nil"}, []),
+        ({"name": "nothing"}, []),
+    ],
+)
+def test_find(catalog, projects, query, expected):
+    pytest_check.equal(catalog.find_rows(**query), expected)
+    pytest_check.equal(catalog.find(**query), [projects[row] for row in expected])
+
+
+@pytest.mark.parametrize(
+    ("name", "expected"), [("hello", 1), ("world", 4), ("nothing", None)]
+)
+def test_latest(catalog, projects, name, expected):
+    latest = catalog.latest(name)
+
+    assert latest is (None if expected is None else projects[expected])
+
+
+def test_where(catalog, projects):
+    calls = []
+
+    def predicate(version):
+        calls.append(version)
+        return version.startswith("1.")
+
+    pytest_check.equal(catalog.where("version", predicate), projects[:3])
+    pytest_check.equal(sorted(calls), ["1.0", "1.10", "1.9", "2.0", "2.0~rc1"])
+
+
+def test_where_unknown_field(catalog):
+    with pytest.raises(ValueError, match="Unknown catalog field: 'parts'"):
+        catalog.where("parts", bool)
+
+
+def test_field_values(catalog):
+    pytest_check.equal(catalog.field_values("name"), {"hello": 3, "world": 2})
+    pytest_check.equal(catalog.field_values("plugin"), {"nil": 3, "dump": 2})
+
+
+def test_remove(catalog, projects):
+    removed = catalog.remove(1)
+
+    pytest_check.is_(removed, projects[1])
+    pytest_check.equal(len(catalog), 4)
+    pytest_check.is_not_in(1, catalog)
+    pytest_check.equal(list(catalog), [projects[index] for index in (0, 2, 3, 4)])
+    pytest_check.equal(catalog.find_rows(plugin="dump"), [3])
+    pytest_check.is_(catalog.latest("hello"), projects[2])
+    pytest_check.equal(catalog.where("name", lambda name: name is None), [])
+    with pytest.raises(KeyError):
+        catalog[1]
+
+
+def test_remove_last_of_name(catalog):
+    for row in (3, 4):
+        catalog.remove(row)
+
+    pytest_check.is_none(catalog.latest("world"))
+    pytest_check.equal(catalog.field_values("name"), {"hello": 3})
+
+
+def test_remove_forgets_values(catalog):
+    for row in (3, 4):
+        catalog.remove(row)
+    calls = []
+
+    def predicate(version):
+        calls.append(version)
+        return version == "3.0"
+
+    pytest_check.equal(catalog.where("version", predicate), [])
+    pytest_check.equal(sorted(calls), ["1.0", "1.10", "1.9"])
+
+    project = make_project("again", "3.0")
+    catalog.add(project)
+
+    pytest_check.equal(catalog.where("version", predicate), [project])
+    pytest_check.equal(catalog.find(version="1.0"), [catalog[0]])
+
+
+def test_remove_missing(catalog):
+    catalog.remove(0)
+
+    with pytest.raises(KeyError):
+        catalog.remove(0)
+
+
+def test_add_reuses_rows(catalog):
+    catalog.remove(2)
+    project = make_project("again", "3.0", plugins=("make",))
+
+    row = catalog.add(project)
+
+    pytest_check.equal(row, 2)
+    pytest_check.is_(catalog[row], project)
+    pytest_check.equal(catalog.find_rows(plugin="make"), [2])
+    pytest_check.equal(catalog.find_rows(effective_base="core24"), [3])
+
+
+def test_headers(tmp_path):
+    project_file = tmp_path / "project.yaml"
+    project_file.write_text(
+        "name: hello\nversion: '1.0'\nbase: core22\nparts: {my-part: {plugin: nil}}\n"
+    )
+    header = Project.peek_yaml_file(project_file)
+    without_base = ProjectHeader(name="world")
+
+    catalog = ProjectCatalog([header, without_base])
+
+    pytest_check.equal(catalog.find(effective_base="core22"), [header])
+    pytest_check.equal(catalog.find(plugin="nil"), [])
+    pytest_check.is_(catalog.latest("hello"), header)
+    pytest_check.is_none(catalog.latest("world"))
+    pytest_check.equal(catalog.field_values("effective_base"), {"core22": 1, None: 1})
@@ -0,0 +1,543 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Tests for the project file language server."""
+import io
+import json
+import textwrap
+from typing import Optional
+
+import pydantic
+import pytest
+from craft_application import lsp
+from craft_application.lsp import Diagnostic, LanguageServer, ProjectDocument
+from craft_application.models import Project
+
+VALID_TEXT = textwrap.dedent(
+    """\
+    name: my-project
+    version: "1.0"
+    # A comment
+    parts:
+      my-part:
+        plugin: nil
+      other-part:
+        plugin: dump
+        source: .
+    """
+)
+
+
+def _part_text(count: int) -> str:
+    return "".join(
+        f"  part-{index}:\n"
+        "    plugin: dump\n"
+        "    source: .\n"
+        "    build-packages:\n"
+        "      - gcc\n"
+        "      - make\n"
+        for index in range(count)
+    )
+
+
+# region ProjectDocument
+def test_validate_valid():
+    document = ProjectDocument(VALID_TEXT)
+
+    assert document.validate() == []
+    assert document.project is not None
+    assert document.project.name == "my-project"
+    assert document.project.version == "1.0"
+    assert list(document.project.parts) == ["my-part", "other-part"]
+    assert document.project == Project.unmarshal(
+        {
+            "name": "my-project",
+            "version": "1.0",
+            "parts": {
+                "my-part": {"plugin": "nil"},
+                "other-part": {"plugin": "dump", "source": "."},
+            },
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        pytest.param(
+            VALID_TEXT.replace("name: my-project", "name: -invalid"),
+            [
+                Diagnostic(
+                    0,
+                    0,
+                    'string does not match regex "^([a-z0-9][a-z0-9-]?)?[a-z]'
+                    "(-?[a-z0-9])*$\" (in field 'name')",
+                )
+            ],
+            id="bad-field",
+        ),
+        pytest.param(
+            VALID_TEXT.replace('version: "1.0"', "version: [1]"),
+            [Diagnostic(1, 0, "string type expected (in field 'version')")],
+            id="wrong-type",
+        ),
+        pytest.param(
+            VALID_TEXT.replace('version: "1.0"\n', ""),
+            [Diagnostic(0, 0, "field version required in top-level configuration")],
+            id="missing-field",
+        ),
+        pytest.param(
+            VALID_TEXT + "unknown: 1\n",
+            [
+                Diagnostic(
+                    9, 0, "extra field unknown not permitted in top-level configuration"
+                )
+            ],
+            id="extra-field",
+        ),
+        pytest.param(
+            VALID_TEXT + "name: again\n",
+            [Diagnostic(9, 0, "found duplicate key 'name'")],
+            id="duplicate-key",
+        ),
+        pytest.param(
+            VALID_TEXT + "  my-part:\n    plugin: nil\n",
+            [Diagnostic(9, 2, "found duplicate key 'my-part'")],
+            id="duplicate-part",
+        ),
+        pytest.param(
+            VALID_TEXT.replace("plugin: nil", "plugin: [nil"),
+            [
+                Diagnostic(
+                    6,
+                    2,
+                    "while parsing a flow sequence expected ',' or ']', "
+                    "but got '<stream end>'",
+                )
+            ],
+            id="yaml-error",
+        ),
+        pytest.param(
+            "name: [my-project\n",
+            [
+                Diagnostic(
+                    1,
+                    0,
+                    "while parsing a flow sequence expected ',' or ']', "
+                    "but got '<stream end>'",
+                )
+            ],
+            id="yaml-error-unsplittable",
+        ),
+        pytest.param(
+            VALID_TEXT + "1: 2\n",
+            [
+                Diagnostic(
+                    9, 0, "extra field 1 not permitted in top-level configuration"
+                )
+            ],
+            id="non-string-key",
+        ),
+    ],
+)
+def test_validate_diagnostics(text, expected):
+    document = ProjectDocument(text)
+
+    assert document.validate() == expected
+    assert document.project is None
+
+
+def test_validate_bad_part():
+    text = VALID_TEXT.replace("source: .", "source: .\n    invalid-key: 1")
+    document = ProjectDocument(text)
+
+    diagnostics = document.validate()
+
+    assert diagnostics == [
+        Diagnostic(
+            9,
+            4,
+            "extra field invalid-key not permitted in parts.other-part configuration",
+        )
+    ]
+
+
+def test_validate_anchors_fall_back_to_whole_document():
+    text = textwrap.dedent(
+        """\
+        name: my-project
+        version: &version "1.0"
+        title: *version
+        parts:
+          my-part:
+            plugin: nil
+        """
+    )
+    document = ProjectDocument(text)
+
+    assert lsp._split_document(text) is None
+    assert document.validate() == []
+    assert document.project is not None
+    assert document.project.title == "1.0"
+
+
+class BuildBaseProject(Project):
+    build_base: Optional[str]
+
+    @pydantic.validator("build_base")
+    @classmethod
+    def _check_build_base(cls, value, values):
+        if value is not None and value == values.get("base"):
+            raise ValueError("build-base must differ from base")
+        return value
+
+
+@pytest.mark.parametrize(
+    ("build_base", "expected"),
+    [
+        ("core24", []),
+        (
+            "core22",
+            [
+                Diagnostic(
+                    10,
+                    0,
+                    "build-base must differ from base (in field 'build-base')",
+                )
+            ],
+        ),
+    ],
+)
+def test_validate_values_validator(build_base, expected):
+    text = f"{VALID_TEXT}base: core22\nbuild-base: {build_base}\n"
+    document = ProjectDocument(text, BuildBaseProject)
+
+    assert document.validate() == expected
+
+
+def test_validate_reuses_unchanged_blocks(mocker):
+    document = ProjectDocument(VALID_TEXT)
+    document.validate()
+    spy = mocker.spy(document, "_check")
+
+    document.apply_change(
+        {
+            "range": {
+                "start": {"line": 8, "character": 12},
+                "end": {"line": 8, "character": 13},
+            },
+            "text": "src",
+        }
+    )
+
+    assert "source: src" in document.text
+    assert document.validate() == []
+    assert spy.call_count == 1
+    assert document.project is not None
+    assert document.project.parts["other-part"] == {"plugin": "dump", "source": "src"}
+
+
+def test_validate_drops_unused_results():
+    document = ProjectDocument(VALID_TEXT)
+    document.validate()
+
+    document.apply_change({"text": "name: my-project\nversion: '2'\nparts: {}\n"})
+    document.validate()
+
+    assert set(document._results) == {
+        ("top-level", "name: my-project\n"),
+        ("top-level", "version: '2'\n"),
+        ("top-level", "parts: {}\n"),
+    }
+
+
+@pytest.mark.parametrize(
+    ("text", "change", "expected"),
+    [
+        pytest.param(
+            "abc\ndef\n",
+            {
+                "range": {
+                    "start": {"line": 1, "character": 1},
+                    "end": {"line": 1, "character": 2},
+                },
+                "text": "X",
+            },
+            "abc\ndXf\n",
+            id="replace",
+        ),
+        pytest.param(
+            "abc\ndef",
+            {
+                "range": {
+                    "start": {"line": 0, "character": 3},
+                    "end": {"line": 1, "character": 0},
+                },
+                "text": "",
+            },
+            "abcdef",
+            id="join-lines",
+        ),
+        pytest.param(
+            "a😀b\n",
+            {
+                "range": {
+                    "start": {"line": 0, "character": 3},
+                    "end": {"line": 0, "character": 4},
+                },
+                "text": "c",
+            },
+            "a😀c\n",
+            id="utf-16",
+        ),
+        pytest.param(
+            "abc",
+            {
+                "range": {
+                    "start": {"line": 5, "character": 0},
+                    "end": {"line": 5, "character": 0},
+                },
+                "text": "d",
+            },
+            "abcd",
+            id="past-end",
+        ),
+        pytest.param("abc", {"text": "xyz"}, "xyz", id="full"),
+    ],
+)
+def test_apply_change(text, change, expected):
+    document = ProjectDocument(text)
+
+    document.apply_change(change)
+
+    assert document.text == expected
+
+
+def _edit(line: int, start: int, end: int, text: str) -> dict:
+    return {
+        "range": {
+            "start": {"line": line, "character": start},
+            "end": {"line": line, "character": end},
+        },
+        "text": text,
+    }
+
+
+def test_validate_splits_only_edited_lines(mocker):
+    text = VALID_TEXT + _part_text(100)
+    document = ProjectDocument(text)
+    assert document.validate() == []
+    split_document = mocker.spy(lsp, "_split_document")
+    line = text.splitlines().index("  part-50:") + 1
+
+    document.apply_change(_edit(line, 12, 16, "nil"))
+    document.apply_change(_edit(line + 1, 0, 0, "    source-tag: v1\n"))
+
+    assert document.validate() == []
+    assert split_document.call_count == 0
+    assert document.project is not None
+    assert document.project.parts["part-50"]["source-tag"] == "v1"
+    new_document = ProjectDocument(document.text)
+    new_document.validate()
+    assert document._layout == new_document._layout
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        pytest.param([_edit(4, 0, 2, "")], id="part-to-top-level"),
+        pytest.param([_edit(3, 0, 6, "")], id="remove-parts-header"),
+        pytest.param([_edit(1, 0, 0, "  ")], id="indent-top-level"),
+        pytest.param([_edit(9, 0, 0, "  new-part:\n    plugin: nil\n")], id="append"),
+        pytest.param([_edit(8, 12, 13, "*src")], id="alias"),
+        pytest.param([_edit(6, 0, 0, "\t")], id="tab"),
+        pytest.param([_edit(5, 0, 0, "x\r")], id="carriage-return"),
+        pytest.param(
+            [_edit(0, 0, 0, "summary: s\n"), _edit(8, 0, 0, "# comment\n")],
+            id="several",
+        ),
+    ],
+)
+def test_validate_edits_match_new_document(changes):
+    document = ProjectDocument(VALID_TEXT)
+    document.validate()
+
+    for change in changes:
+        document.apply_change(change)
+    new_document = ProjectDocument(document.text)
+
+    assert document.validate() == new_document.validate()
+    assert document._layout == new_document._layout
+    assert document.project == new_document.project
+
+
+# endregion
+# region LanguageServer
+def _frame(*messages):
+    stream = io.BytesIO()
+    for message in messages:
+        body = json.dumps(message).encode()
+        stream.write(f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    stream.seek(0)
+    return stream
+
+
+def _unframe(stream):
+    stream.seek(0)
+    messages = []
+    while stream.read(len(b"Content-Length: ")):
+        length = int(stream.readline())
+        stream.readline()
+        messages.append(json.loads(stream.read(length)))
+    return messages
+
+
+def test_language_server_session():
+    uri = "file:///project/testcraft.yaml"
+    reader = _frame(
+        {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}},
+        {"jsonrpc": "2.0", "method": "initialized", "params": {}},
+        {
+            "jsonrpc": "2.0",
+            "method": "textDocument/didOpen",
+            "params": {
+                "textDocument": {
+                    "uri": uri,
+                    "languageId": "yaml",
+                    "version": 1,
+                    "text": VALID_TEXT,
+                }
+            },
+        },
+        {
+            "jsonrpc": "2.0",
+            "method": "textDocument/didChange",
+            "params": {
+                "textDocument": {"uri": uri, "version": 2},
+                "contentChanges": [
+                    {
+                        "range": {
+                            "start": {"line": 0, "character": 6},
+                            "end": {"line": 0, "character": 6},
+                        },
+                        "text": "-",
+                    }
+                ],
+            },
+        },
+        {
+            "jsonrpc": "2.0",
+            "method": "textDocument/didClose",
+            "params": {"textDocument": {"uri": uri}},
+        },
+        {"jsonrpc": "2.0", "id": 2, "method": "shutdown"},
+        {"jsonrpc": "2.0", "method": "exit"},
+    )
+    writer = io.BytesIO()
+    server = LanguageServer(reader=reader, writer=writer)
+
+    assert server.serve() == 0
+
+    initialize, opened, changed, closed, shutdown = _unframe(writer)
+    assert initialize["id"] == 1
+    assert initialize["result"]["capabilities"]["textDocumentSync"] == {
+        "openClose": True,
+        "change": 2,
+    }
+    assert opened["params"] == {"uri": uri, "diagnostics": [], "version": 1}
+    assert changed["params"] == {
+        "uri": uri,
+        "version": 2,
+        "diagnostics": [
+            {
+                "range": {
+                    "start": {"line": 0, "character": 0},
+                    "end": {"line": 0, "character": 17},
+                },
+                "severity": 1,
+                "source": "craft-application",
+                "message": (
+                    'string does not match regex "^([a-z0-9][a-z0-9-]?)?[a-z]'
+                    "(-?[a-z0-9])*$\" (in field 'name')"
+                ),
+            }
+        ],
+    }
+    assert closed["params"] == {"uri": uri, "diagnostics": []}
+    assert shutdown == {"jsonrpc": "2.0", "id": 2, "result": None}
+    assert server.documents == {}
+
+
+@pytest.mark.parametrize(
+    ("messages", "expected_code"),
+    [
+        pytest.param([{"jsonrpc": "2.0", "method": "exit"}], 1, id="no-shutdown"),
+        pytest.param([], 1, id="end-of-stream"),
+    ],
+)
+def test_language_server_exit_code(messages, expected_code):
+    server = LanguageServer(reader=_frame(*messages), writer=io.BytesIO())
+
+    assert server.serve() == expected_code
+
+
+@pytest.mark.parametrize(
+    ("initialized", "expected_code"),
+    [(False, lsp._SERVER_NOT_INITIALIZED), (True, lsp._METHOD_NOT_FOUND)],
+)
+def test_language_server_errors(mocker, initialized, expected_code):
+    writer = io.BytesIO()
+    server = LanguageServer(reader=io.BytesIO(), writer=writer)
+    if initialized:
+        server.handle({"jsonrpc": "2.0", "id": 1, "method": "initialize"})
+        writer.seek(0)
+        writer.truncate()
+
+    server.handle({"jsonrpc": "2.0", "id": 2, "method": "unknown"})
+    server.handle({"jsonrpc": "2.0", "method": "unknown-notification"})
+
+    (response,) = _unframe(writer)
+    assert response == {
+        "jsonrpc": "2.0",
+        "id": 2,
+        "error": {"code": expected_code, "message": mocker.ANY},
+    }
+
+
+@pytest.mark.parametrize("message_id", [3, None])
+def test_language_server_handler_error(message_id):
+    writer = io.BytesIO()
+    server = LanguageServer(reader=io.BytesIO(), writer=writer)
+    server.handle({"jsonrpc": "2.0", "id": 1, "method": "initialize"})
+    message = {
+        "jsonrpc": "2.0",
+        "method": "textDocument/didChange",
+        "params": {"textDocument": {"uri": "file:///unknown"}, "contentChanges": []},
+    }
+    if message_id is not None:
+        message["id"] = message_id
+
+    server.handle(message)
+
+    _, response = _unframe(writer)
+    if message_id is None:
+        assert response["method"] == "window/logMessage"
+        assert "file:///unknown" in response["params"]["message"]
+    else:
+        assert response["id"] == message_id
+        assert response["error"]["code"] == lsp._INTERNAL_ERROR
+
+
+# endregion
@@ -0,0 +1,160 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Tests for the metadata index."""
+import os
+
+import pytest
+import pytest_check
+from craft_application.metadata_index import MetadataIndex
+from craft_application.models import BaseMetadata
+
+
+@pytest.fixture()
+def metadata_dir(tmp_path):
+    directory = tmp_path / "outputs"
+    for number in range(3):
+        output = directory / f"output-{number}"
+        output.mkdir(parents=True)
+        (output / "metadata.yaml").write_text(
+            f"name: package-{number}\nversion: '1.{number}'\nbase: core22\n"
+        )
+    return directory
+
+
+@pytest.fixture()
+def index(tmp_path):
+    with MetadataIndex(tmp_path / "index.db") as metadata_index:
+        yield metadata_index
+
+
+def test_update_directory(index, metadata_dir):
+    result = index.update_directory(metadata_dir)
+
+    pytest_check.equal(len(result.added), 3)
+    pytest_check.equal(len(index), 3)
+    pytest_check.equal(index.find({"base": "core22"}), result.added)
+
+
+def test_update_unchanged(index, metadata_dir):
+    index.update_directory(metadata_dir)
+
+    result = index.update_directory(metadata_dir)
+
+    pytest_check.equal(len(result.unchanged), 3)
+    pytest_check.equal(result.added + result.updated + result.removed, [])
+
+
+def test_update_touched_same_content(index, metadata_dir):
+    path = metadata_dir / "output-0" / "metadata.yaml"
+    index.update([path])
+    os.utime(path, ns=(0, 0))
+
+    result = index.update([path])
+
+    assert result.unchanged == [path.resolve()]
+
+
+def test_update_changed(index, metadata_dir):
+    path = metadata_dir / "output-0" / "metadata.yaml"
+    index.update_directory(metadata_dir)
+    path.write_text("name: package-0\nversion: '2.0'\nbase: core24\n")
+
+    result = index.update_directory(metadata_dir)
+
+    pytest_check.equal(result.updated, [path.resolve()])
+    pytest_check.equal(index.find({"base": "core24"}), [path.resolve()])
+    pytest_check.equal(len(index.find({"base": "core22"})), 2)
+
+
+def test_update_removed(index, metadata_dir):
+    path = metadata_dir / "output-1" / "metadata.yaml"
+    index.update_directory(metadata_dir)
+    path.unlink()
+
+    result = index.update_directory(metadata_dir)
+
+    pytest_check.equal(result.removed, [path.resolve()])
+    pytest_check.equal(len(index), 2)
+
+
+@pytest.mark.parametrize(
+    "content", ["name: [unclosed", "- not a mapping", "a: 1\na: 2\n"]
+)
+def test_update_failed(index, tmp_path, content):
+    path = tmp_path / "metadata.yaml"
+    path.write_text(content)
+
+    result = index.update([path])
+
+    pytest_check.is_in(path.resolve(), result.failed)
+    pytest_check.equal(len(index), 0)
+
+
+def test_persistence(tmp_path, metadata_dir):
+    with MetadataIndex(tmp_path / "index.db") as first:
+        added = first.update_directory(metadata_dir).added
+
+    with MetadataIndex(tmp_path / "index.db") as second:
+        result = second.update_directory(metadata_dir)
+
+    assert result.unchanged == added
+
+
+@pytest.mark.parametrize(
+    ["fields", "expected"],
+    [
+        ({"name": "package-1"}, ["output-1"]),
+        ({"name": "package-1", "version": "1.1"}, ["output-1"]),
+        ({"name": "package-1", "version": "1.2"}, []),
+        ({"base": "core22"}, ["output-0", "output-1", "output-2"]),
+        ({"not-a-field": None}, []),
+    ],
+)
+def test_find(index, metadata_dir, fields, expected):
+    index.update_directory(metadata_dir)
+
+    actual = index.find(fields)
+
+    assert [path.parent.name for path in actual] == expected
+
+
+def test_field_values(index, metadata_dir):
+    index.update_directory(metadata_dir)
+
+    assert index.field_values("base") == {"core22": 3}
+
+
+def test_export(index, metadata_dir):
+    index.update_directory(metadata_dir)
+
+    exported = dict(index.export())
+
+    for path, metadata in exported.items():
+        pytest_check.is_instance(metadata, BaseMetadata)
+        pytest_check.equal(
+            metadata.marshal()["name"], f"package-{path.parent.name[-1]}"
+        )
+
+
+def test_export_paths(index, metadata_dir):
+    path = metadata_dir / "output-2" / "metadata.yaml"
+    index.update_directory(metadata_dir)
+
+    exported = list(index.export([path]))
+
+    assert exported == [
+        (path.resolve(), BaseMetadata(name="package-2", version="1.2", base="core22"))
+    ]
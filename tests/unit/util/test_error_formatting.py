@@ -21,6 +21,7 @@ from craft_application.util.error_formatting import (
     format_pydantic_error,
     format_pydantic_errors,
 )
+from craft_application.util.yaml import YamlPosition, YamlPositions
 
 
 @pytest.mark.parametrize(
@@ -96,3 +97,27 @@ def test_format_pydantic_errors(errors, file_name, expected):
     actual = format_pydantic_errors(errors, file_name=file_name)
 
     assert actual == expected
+
+
+def test_format_pydantic_errors_positions():
+    errors = [
+        {"loc": ("name",), "msg": "invalid name"},
+        {"loc": ("parts", "my-part", "source"), "msg": "field required"},
+        {"loc": ("unknown",), "msg": "extra fields not permitted"},
+    ]
+    positions = YamlPositions(
+        {
+            (): YamlPosition(1, 1),
+            ("name",): YamlPosition(1, 1),
+            ("parts", "my-part"): YamlPosition(4, 3),
+        }
+    )
+
+    actual = format_pydantic_errors(errors, file_name="this.yaml", positions=positions)
+
+    assert actual == (
+        "Bad this.yaml content:\n"
+        "- invalid name (in field 'name') (this.yaml:1:1)\n"
+        "- field source required in parts.my-part configuration (this.yaml:4:3)\n"
+        "- extra field unknown not permitted in top-level configuration (this.yaml:1:1)"
+    )
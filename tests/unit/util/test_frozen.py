@@ -0,0 +1,105 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Tests for frozen data helpers."""
+import copy
+import pickle
+
+import pytest
+import pytest_check
+from craft_application.util import FrozenDict, freeze, thaw
+from hypothesis import given, strategies
+
+json_values = strategies.recursive(
+    strategies.none()
+    | strategies.booleans()
+    | strategies.integers()
+    | strategies.text(),
+    lambda children: strategies.lists(children)
+    | strategies.dictionaries(strategies.text(), children),
+)
+
+
+@pytest.mark.parametrize(
+    ["value", "expected"],
+    [
+        (1, 1),
+        ("str", "str"),
+        ([1, [2]], (1, (2,))),
+        (
+            {"a": [1, {"b": {2}}]},
+            FrozenDict({"a": (1, FrozenDict({"b": frozenset({2})}))}),
+        ),
+    ],
+)
+def test_freeze(value, expected):
+    actual = freeze(value)
+
+    pytest_check.equal(actual, expected)
+    pytest_check.is_instance(actual, type(expected))
+    pytest_check.equal(thaw(actual), value)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [(1, 2), ([1], {2}), frozenset({3}), {"a": (1, frozenset({(2, 3)}))}],
+)
+def test_thaw_keeps_tuples_and_frozensets(value):
+    thawed = thaw(freeze(value))
+
+    pytest_check.equal(thawed, value)
+    pytest_check.equal(repr(thawed), repr(value))
+
+
+@given(value=json_values)
+def test_freeze_thaw_round_trip(value):
+    frozen = freeze(value)
+
+    pytest_check.equal(hash(frozen), hash(freeze(value)))
+    pytest_check.equal(thaw(frozen), value)
+
+
+@pytest.mark.parametrize(
+    "modify",
+    [
+        lambda d: d.__setitem__("b", 2),
+        lambda d: d.__delitem__("a"),
+        lambda d: d.update({"b": 2}),
+        lambda d: d.setdefault("b", 2),
+        lambda d: d.pop("a"),
+        lambda d: d.popitem(),
+        lambda d: d.clear(),
+    ],
+)
+def test_frozen_dict_immutable(modify):
+    frozen = FrozenDict({"a": 1})
+
+    with pytest.raises(TypeError, match="immutable"):
+        modify(frozen)
+
+    assert frozen == {"a": 1}
+
+
+def test_frozen_dict_copies():
+    frozen = freeze({"a": [1, {"b": 2}]})
+
+    pytest_check.is_(copy.copy(frozen), frozen)
+    pytest_check.is_(copy.deepcopy(frozen), frozen)
+    pytest_check.equal(pickle.loads(pickle.dumps(frozen)), frozen)
+    pytest_check.equal(hash(pickle.loads(pickle.dumps(frozen))), hash(frozen))
+
+
+def test_frozen_dict_hash_order_independent():
+    assert hash(FrozenDict(a=1, b=2)) == hash(FrozenDict(b=2, a=1))
@@ -0,0 +1,142 @@
+# This file is part of craft-application.
+#
+# Copyright 2023 Canonical Ltd.
+#
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License version 3, as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranties of MERCHANTABILITY,
+# SATISFACTORY QUALITY, or FITNESS FOR A PARTICULAR PURPOSE.
+# See the GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Tests for JSON helpers."""
+import io
+import json
+
+import pytest
+from craft_application.errors import CraftValidationError
+from craft_application.util import (
+    YamlLimits,
+    looks_like_json,
+    safe_json_load,
+    safe_yaml_load,
+)
+from hypothesis import given, strategies
+
+# Characters that YAML accepts unescaped.
+texts = strategies.text(
+    alphabet=strategies.characters(blacklist_categories=("Cs", "Cc", "Zl", "Zp"))
+)
+json_values = strategies.recursive(
+    strategies.none()
+    | strategies.booleans()
+    | strategies.integers()
+    | strategies.floats(allow_nan=False, allow_infinity=False)
+    | texts,
+    lambda children: strategies.lists(children)
+    | strategies.dictionaries(texts, children),
+)
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        '{"a": 1, "b": [true, false, null], "c": {"d": "e"}}',
+        '{"a": 1.5, "b": -0.0, "c": 1.5E+3, "d": 12345678901234567890}',
+        '{"a": 1e5, "b": 1.0e5, "c": 1E-5}',
+        '{"a": "x\\/y\\u00e9\\n"}',
+        "{}",
+    ],
+)
+def test_safe_json_load_matches_yaml(content):
+    assert safe_json_load(io.StringIO(content)) == safe_yaml_load(io.StringIO(content))
+
+
+@given(value=strategies.dictionaries(texts, json_values))
+def test_safe_json_load_matches_yaml_hypothesis(value):
+    content = json.dumps(value, ensure_ascii=False)
+
+    assert safe_json_load(io.StringIO(content)) == safe_yaml_load(io.StringIO(content))
+
+
+@pytest.mark.parametrize(
+    "content",
+    ['{"a": 1, "a": 2}', '{"a": {"b": 1, "c": 2, "b": 3}}', '[{"a": 1, "a": 1}]'],
+)
+def test_safe_json_load_duplicate_keys(content):
+    with pytest.raises(CraftValidationError, match="duplicate key"):
+        safe_json_load(io.StringIO(content))
+
+
+@pytest.mark.parametrize(
+    "content", ['{"a": NaN}', '{"a": Infinity}', '{"a": 1,}', "{a: 1}", ""]
+)
+def test_safe_json_load_invalid(content):
+    with pytest.raises(ValueError):
+        safe_json_load(io.StringIO(content))
+
+
+@pytest.mark.parametrize(
+    ("content", "limits", "limit_name"),
+    [
+        ('{"a": [1, 2, 3]}', YamlLimits(max_size=15), "maximum size"),
+        ('{"a": [[[1]]]}', YamlLimits(max_depth=4), "maximum nesting depth"),
+        ("[" * 500 + "]" * 500, YamlLimits(), "maximum nesting depth"),
+        ('{"a": [1, 2, 3]}', YamlLimits(max_nodes=5), "maximum number of nodes"),
+    ],
+)
+def test_safe_json_load_limits_exceeded(content, limits, limit_name):
+    with pytest.raises(CraftValidationError, match=limit_name):
+        safe_json_load(io.StringIO(content), limits=limits)
+    with pytest.raises(CraftValidationError, match=limit_name):
+        safe_yaml_load(io.StringIO(content), limits=limits)
+
+
+@pytest.mark.parametrize(
+    ("content", "limits"),
+    [
+        ('{"a": [[[]]]}', YamlLimits(max_depth=4)),
+        ('{"a": "[[[[", "b": "\\"{{"}', YamlLimits(max_depth=2)),
+        ('{"a": [1, 2]}', YamlLimits(max_nodes=5)),
+    ],
+)
+def test_safe_json_load_limits_not_exceeded(content, limits):
+    assert safe_json_load(io.StringIO(content), limits=limits) == safe_yaml_load(
+        io.StringIO(content), limits=limits
+    )
+
+
+def test_safe_json_load_recursion():
+    content = "[" * 100_000 + "]" * 100_000
+    limits = YamlLimits(max_depth=None)
+
+    with pytest.raises(CraftValidationError, match="too deeply nested"):
+        safe_json_load(io.StringIO(content), limits=limits)
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ('{"a": 1}', True),
+        ('  \n {"a": 1}', True),
+        ("{a: 1}", True),
+        ("a: 1", False),
+        ("# {}\n", False),
+        ("[1]", False),
+        ("", False),
+        ('{\n\t"a": 1}', False),
+        ('{"a": "\x7f"}', False),
+        ('{"a": "\x85"}', False),
+        ('{"a": "\u2029"}', False),
+        ('{"a": "\\ud83d\\ude00"}', False),
+        ('{"a"\n: 1}', False),
+        ('{"' + "a" * 1022 + '": 1}', True),
+        ('{"' + "a" * 1023 + '": 1}', False),
+    ],
+)
+def test_looks_like_json(text, expected):
+    assert looks_like_json(text) == expected
@@ -14,13 +14,26 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Tests for internal model utilities."""
+import concurrent.futures
+import io
 import pathlib
+import time
+import tracemalloc
 
 import pytest
+import pytest_check
+import yaml as pyyaml
+from craft_application.errors import CraftValidationError
 from craft_application.util import yaml
 from yaml.error import YAMLError
 
 TEST_DIR = pathlib.Path(__file__).parent
+MAPPING_PATHS = [
+    file
+    for file in sorted((TEST_DIR / "valid_yaml").glob("*.yaml"))
+    if file.name != "empty.yaml"
+]
+MAPPING_FILES = [pytest.param(file, id=file.name) for file in MAPPING_PATHS]
 
 
 @pytest.mark.parametrize("file", (TEST_DIR / "valid_yaml").glob("*.yaml"))
@@ -40,3 +53,588 @@ def test_safe_yaml_loader_invalid(file):
     with pytest.raises(YAMLError):
         with file.open() as f:
             yaml.safe_yaml_load(f)
+
+
+@pytest.mark.parametrize(
+    ["content", "keys", "expected"],
+    [
+        ("a: 1\nb: 2\n", ["a"], {"a": 1}),
+        ("a: 1\nb: 2\n", ["a", "b", "c"], {"a": 1, "b": 2}),
+        ("a: &anchor [1, 2]\nb: *anchor\n", ["b"], {"b": [1, 2]}),
+        ("x: &x {a: 1, b: 2}\n<<: *x\nb: 3\n", ["a", "b"], {"a": 1, "b": 3}),
+        ("1: 2\na: 3\n", ["1", "a"], {"a": 3}),
+        # Loading stops once all keys are found, so later errors are not seen.
+        ("a: 1\nb: [unclosed\n", ["a"], {"a": 1}),
+    ],
+)
+def test_safe_yaml_load_keys(content, keys, expected):
+    assert yaml.safe_yaml_load_keys(io.StringIO(content), keys) == expected
+
+
+def test_safe_yaml_load_keys_superseded():
+    content = "source-code: https://example.com\nsource_code: [unclosed\n"
+
+    actual = yaml.safe_yaml_load_keys(
+        io.StringIO(content),
+        ["source-code", "source_code"],
+        superseded_by={"source_code": "source-code"},
+    )
+
+    assert actual == {"source-code": "https://example.com"}
+
+
+@pytest.mark.parametrize("content", ["a: 1\na: 2\n", "a: 1\nb: 2\na: 3\n"])
+def test_safe_yaml_load_keys_duplicate(content):
+    with pytest.raises(YAMLError, match="found duplicate key 'a'"):
+        yaml.safe_yaml_load_keys(io.StringIO(content), ["b", "c"])
+
+
+@pytest.mark.parametrize("content", ["", "- a\n- b\n", "just a string"])
+def test_safe_yaml_load_keys_not_mapping(content):
+    with pytest.raises(TypeError):
+        yaml.safe_yaml_load_keys(io.StringIO(content), ["a"])
+
+
+@pytest.mark.parametrize(
+    ["content", "expected"],
+    [
+        ("a: 1\nb: [2]\n", [(("a",), 1), (("b",), [2])]),
+        (
+            "a: 1\nparts:\n  p1: {x: 1}\n  p2: {x: 2}\n",
+            [
+                (("a",), 1),
+                (("parts",), {}),
+                (("parts", "p1"), {"x": 1}),
+                (("parts", "p2"), {"x": 2}),
+            ],
+        ),
+        ("parts: {}\n", [(("parts",), {})]),
+        ("parts: [1]\n", [(("parts",), [1])]),
+        ("parts: &p {a: 1}\n", [(("parts",), {"a": 1})]),
+        (
+            "x: &x {a: 1, b: 2}\n<<: *x\nb: 3\n",
+            [(("x",), {"a": 1, "b": 2}), (("b",), 3), (("a",), 1)],
+        ),
+        (
+            "x: &x {a: 1}\nparts:\n  <<: {p1: 1, p2: 2}\n  p1: *x\n",
+            [
+                (("x",), {"a": 1}),
+                (("parts",), {}),
+                (("parts", "p1"), {"a": 1}),
+                (("parts", "p2"), 2),
+            ],
+        ),
+    ],
+)
+def test_safe_yaml_load_items(content, expected):
+    items = yaml.safe_yaml_load_items(io.StringIO(content), split=["parts"])
+
+    assert list(items) == expected
+
+
+@pytest.mark.parametrize("file", MAPPING_FILES)
+def test_safe_yaml_load_items_matches_safe_yaml_load(file):
+    with file.open() as f:
+        expected = yaml.safe_yaml_load(f)
+
+    with file.open() as f:
+        actual = {path[0]: value for path, value in yaml.safe_yaml_load_items(f)}
+
+    assert actual == expected
+
+
+@pytest.mark.parametrize("file", MAPPING_FILES)
+def test_safe_yaml_load_items_split_matches_safe_yaml_load(file):
+    with file.open() as f:
+        expected = yaml.safe_yaml_load(f)
+
+    actual: dict = {}
+    with file.open() as f:
+        for path, value in yaml.safe_yaml_load_items(f, split=["parts"]):
+            if len(path) == 1:
+                actual[path[0]] = value
+            else:
+                actual[path[0]][path[1]] = value
+
+    assert actual == expected
+
+
+def test_safe_yaml_load_does_not_register_constructors(mocker):
+    add_constructor = mocker.spy(pyyaml.SafeLoader, "add_constructor")
+
+    yaml.safe_yaml_load(io.StringIO("a: {b: 1}"))
+
+    assert add_constructor.call_count == 0
+    assert (
+        pyyaml.SafeLoader.yaml_constructors["tag:yaml.org,2002:map"]
+        is pyyaml.constructor.SafeConstructor.construct_yaml_map
+    )
+
+
+def test_safe_yaml_load_threads():
+    files = MAPPING_PATHS * 20
+    expected = {
+        file: yaml.safe_yaml_load(io.StringIO(file.read_text())) for file in files
+    }
+
+    def load(file):
+        with file.open() as f:
+            return file, yaml.safe_yaml_load(f)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        for file, data in executor.map(load, files):
+            assert data == expected[file]
+
+
+def test_safe_yaml_load_items_lazy():
+    items = yaml.safe_yaml_load_items(io.StringIO("a: 1\nb: [unclosed\n"))
+
+    assert next(items) == (("a",), 1)
+    with pytest.raises(YAMLError):
+        next(items)
+
+
+@pytest.mark.parametrize(
+    ["content", "match"],
+    [
+        ("a: 1\na: 2\n", "found duplicate key 'a'"),
+        ("parts:\n  a: 1\n  a: 2\n", "found duplicate key 'a'"),
+        ("? [a]\n: 1\n", "found unhashable key"),
+        ("a: 1\n---\nb: 2\n", "expected a single document"),
+    ],
+)
+def test_safe_yaml_load_items_invalid(content, match):
+    with pytest.raises(YAMLError, match=match):
+        list(yaml.safe_yaml_load_items(io.StringIO(content), split=["parts"]))
+
+
+@pytest.mark.parametrize("content", ["", "- a\n- b\n", "just a string"])
+def test_safe_yaml_load_items_not_mapping(content):
+    with pytest.raises(TypeError):
+        list(yaml.safe_yaml_load_items(io.StringIO(content)))
+
+
+def test_safe_yaml_load_items_positions():
+    content = "a: 1\nparts:\n  p1:\n    x: [1, 2]\n"
+    expected = yaml.YamlPositions()
+    yaml.safe_yaml_load(io.StringIO(content), positions=expected)
+    actual = yaml.YamlPositions()
+
+    list(
+        yaml.safe_yaml_load_items(
+            io.StringIO(content), split=["parts"], positions=actual
+        )
+    )
+
+    assert actual == expected
+
+
+MAX_LOAD_SECONDS = 5
+MAX_LOAD_MEMORY = 10 * 1024 * 1024
+
+
+def billion_laughs(levels: int = 9) -> str:
+    lines = ['lol0: &lol0 ["lol", "lol", "lol", "lol", "lol", "lol", "lol", "lol"]']
+    for level in range(1, levels + 1):
+        aliases = ", ".join([f"*lol{level - 1}"] * 10)
+        lines.append(f"lol{level}: &lol{level} [{aliases}]")
+    return "\n".join(lines)
+
+
+def merge_bomb(levels: int = 20) -> str:
+    lines = ["m0: &m0 {a: 1, b: 2}"]
+    for level in range(1, levels + 1):
+        lines.append(f"m{level}: &m{level} {{<<: [*m{level - 1}, *m{level - 1}]}}")
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize(
+    ["content", "limit_name"],
+    [
+        pytest.param(billion_laughs(), "after expanding aliases", id="billion-laughs"),
+        pytest.param(merge_bomb(), "after expanding aliases", id="merge-bomb"),
+        pytest.param("[" * 10_000 + "]" * 10_000, "nesting depth", id="deep-list"),
+        pytest.param(
+            "{a: " * 10_000 + "b" + "}" * 10_000, "nesting depth", id="deep-mapping"
+        ),
+    ],
+)
+def test_safe_yaml_load_limits_default(content, limit_name):
+    tracemalloc.start()
+    start = time.monotonic()
+    try:
+        with pytest.raises(CraftValidationError, match=limit_name):
+            yaml.safe_yaml_load(io.StringIO(content))
+        duration = time.monotonic() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert duration < MAX_LOAD_SECONDS
+    assert peak < MAX_LOAD_MEMORY
+
+
+def test_safe_yaml_load_limits_size():
+    content = "x" * (yaml.DEFAULT_YAML_LIMITS.max_size + 1)  # type: ignore[operator]
+
+    with pytest.raises(CraftValidationError, match="maximum size"):
+        yaml.safe_yaml_load(io.StringIO(content))
+
+
+@pytest.mark.parametrize(
+    ["content", "limits", "limit_name"],
+    [
+        ("a: [1, 2, 3]", yaml.YamlLimits(max_size=11), "maximum size"),
+        ("a: [[[1]]]", yaml.YamlLimits(max_depth=4), "maximum nesting depth"),
+        ("a: [1, 2, 3]", yaml.YamlLimits(max_nodes=5), "maximum number of nodes"),
+        (
+            "a: &a [1, 2]\nb: *a",
+            yaml.YamlLimits(max_expanded_nodes=8),
+            "after expanding aliases",
+        ),
+        (
+            "a: &a {x: 1}\nb: {<<: *a}",
+            yaml.YamlLimits(max_expanded_nodes=9),
+            "after expanding aliases",
+        ),
+    ],
+)
+def test_safe_yaml_load_limits_exceeded(content, limits, limit_name):
+    with pytest.raises(CraftValidationError, match=limit_name):
+        yaml.safe_yaml_load(io.StringIO(content), limits=limits)
+
+    with pytest.raises(CraftValidationError, match=limit_name):
+        yaml.safe_yaml_load_keys(io.StringIO(content), ["b"], limits=limits)
+
+
+@pytest.mark.parametrize(
+    ["content", "limits"],
+    [
+        ("a: [1, 2, 3]", yaml.YamlLimits(max_size=12)),
+        ("a: [[[1]]]", yaml.YamlLimits(max_depth=5)),
+        ("a: [1, 2, 3]", yaml.YamlLimits(max_nodes=6)),
+        ("a: &a [1, 2]\nb: *a", yaml.YamlLimits(max_expanded_nodes=9)),
+        (billion_laughs(), yaml.YamlLimits(None, None, None, None)),
+    ],
+)
+def test_safe_yaml_load_limits_not_exceeded(content, limits):
+    yaml.safe_yaml_load(io.StringIO(content), limits=limits)
+
+
+POSITIONS_DOCUMENT = """\
+name: my-project
+defaults: &defaults
+  plugin: nil
+  source: .
+parts:
+  part-1:
+    <<: *defaults
+    plugin: dump
+  part-2: *defaults
+  part-3:
+    build-packages:
+      - gcc
+      - {name: make}
+"""
+
+
+@pytest.mark.parametrize(
+    ["loc", "expected"],
+    [
+        ((), (1, 1)),
+        (("name",), (1, 1)),
+        (("defaults", "source"), (4, 3)),
+        (("parts",), (5, 1)),
+        (("parts", "part-1"), (6, 3)),
+        (("parts", "part-1", "plugin"), (8, 5)),
+        (("parts", "part-1", "source"), (4, 3)),
+        (("parts", "part-2"), (9, 3)),
+        (("parts", "part-2", "plugin"), (9, 3)),
+        (("parts", "part-3", "build-packages", 0), (12, 9)),
+        (("parts", "part-3", "build-packages", 1, "name"), (13, 10)),
+        (("parts", "part-3", "build-packages", 2), (11, 5)),
+        (("parts", "part-4", "__root__"), (5, 1)),
+        (("__root__",), (1, 1)),
+    ],
+)
+def test_safe_yaml_load_positions(loc, expected):
+    positions = yaml.YamlPositions()
+
+    yaml.safe_yaml_load(io.StringIO(POSITIONS_DOCUMENT), positions=positions)
+
+    assert positions.find(loc) == expected
+
+
+def test_safe_yaml_load_items_positions_aliases():
+    expected = yaml.YamlPositions()
+    yaml.safe_yaml_load(io.StringIO(POSITIONS_DOCUMENT), positions=expected)
+    actual = yaml.YamlPositions()
+
+    list(
+        yaml.safe_yaml_load_items(
+            io.StringIO(POSITIONS_DOCUMENT), split=["parts"], positions=actual
+        )
+    )
+
+    assert actual == expected
+
+
+def test_safe_yaml_load_shares_anchors(mocker):
+    flatten = mocker.spy(pyyaml.constructor.SafeConstructor, "flatten_mapping")
+    content = "base: &base {x: [1], y: 2}\n" + "".join(
+        f"m{index}: {{<<: *base, z: {index}}}\n" for index in range(100)
+    )
+
+    data = yaml.safe_yaml_load(io.StringIO(content))
+
+    assert all(data[f"m{index}"]["x"] is data["base"]["x"] for index in range(100))
+    # The document, the anchor and each mapping it's merged into.
+    assert flatten.call_count == 102  # noqa: PLR2004
+
+
+def test_safe_yaml_load_positions_recursive():
+    positions = yaml.YamlPositions()
+
+    yaml.safe_yaml_load(io.StringIO("a: &a [*a, 1]"), positions=positions)
+
+    pytest_check.equal(positions.find(("a", 1)), (1, 12))
+    pytest_check.equal(positions.find(("a", 0, 1)), (1, 4))
+
+
+def test_yaml_positions_find_empty():
+    assert yaml.YamlPositions().find(("a", "b")) is None
+
+
+PATCH_DOCUMENT = """\
+# A comment.
+name: hello  # The name.
+base: &base core22
+build-base: *base
+parts:
+  a:
+    plugin: nil  # Nothing.
+    list:
+    - x
+  b: {plugin: dump, source: .}
+empty:
+text: |
+  Some text.
+"""
+
+
+@pytest.mark.parametrize(
+    ("changes", "expected"),
+    [
+        pytest.param(
+            {("name",): "world"},
+            PATCH_DOCUMENT.replace("hello", "world"),
+            id="scalar",
+        ),
+        pytest.param(
+            {("parts", "a", "list"): ["y", "z"]},
+            PATCH_DOCUMENT.replace("    - x\n", "      - y\n      - z\n"),
+            id="block",
+        ),
+        pytest.param(
+            {("parts", "a", "list"): []},
+            PATCH_DOCUMENT.replace("list:\n    - x\n", "list: []\n"),
+            id="block-to-flow",
+        ),
+        pytest.param(
+            {("parts", "b", "source"): "src", ("parts", "b", "new"): 1},
+            PATCH_DOCUMENT.replace("source: .}", "source: src, new: 1}"),
+            id="flow",
+        ),
+        pytest.param(
+            {("parts", "b", "plugin"): yaml.YAML_DELETE},
+            PATCH_DOCUMENT.replace("plugin: dump, ", ""),
+            id="delete-flow",
+        ),
+        pytest.param(
+            {("parts", "b", "source"): yaml.YAML_DELETE},
+            PATCH_DOCUMENT.replace(", source: .", ""),
+            id="delete-flow-last",
+        ),
+        pytest.param(
+            {("parts", "a"): yaml.YAML_DELETE},
+            PATCH_DOCUMENT.replace(
+                "  a:\n    plugin: nil  # Nothing.\n    list:\n    - x\n", ""
+            ),
+            id="delete-block",
+        ),
+        pytest.param(
+            {("parts", "a"): yaml.YAML_DELETE, ("parts", "b"): yaml.YAML_DELETE},
+            PATCH_DOCUMENT.replace(
+                "parts:\n  a:\n    plugin: nil  # Nothing.\n    list:\n    - x\n"
+                "  b: {plugin: dump, source: .}\n",
+                "parts: {}\n",
+            ),
+            id="delete-all",
+        ),
+        pytest.param(
+            {("parts", "c"): yaml.YAML_DELETE, ("missing", "c"): yaml.YAML_DELETE},
+            PATCH_DOCUMENT,
+            id="delete-missing",
+        ),
+        pytest.param(
+            {("parts", "c", "plugin"): "nil"},
+            PATCH_DOCUMENT.replace(
+                "source: .}\n", "source: .}\n  c:\n    plugin: nil\n"
+            ),
+            id="add-nested",
+        ),
+        pytest.param(
+            {("empty", "x"): 1, ("empty", "y"): 2},
+            PATCH_DOCUMENT.replace("empty:\n", "empty:\n  x: 1\n  y: 2\n"),
+            id="add-to-empty",
+        ),
+        pytest.param(
+            {("text",): "Other\ntext."},
+            PATCH_DOCUMENT.replace("|\n  Some text.\n", '"Other\\ntext."\n'),
+            id="block-scalar",
+        ),
+        pytest.param(
+            {("version",): "1.0"},
+            PATCH_DOCUMENT + "version: '1.0'\n",
+            id="add",
+        ),
+    ],
+)
+def test_safe_yaml_patch(changes, expected):
+    assert yaml.safe_yaml_patch(PATCH_DOCUMENT, changes) == expected
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        pytest.param({("parts", "c"): {"plugin": "nil"}}, id="add-block"),
+        pytest.param({("parts", "a", "list"): ["y", "z"]}, id="block"),
+        pytest.param({("text",): "Other\ntext."}, id="block-scalar"),
+        pytest.param({("parts", "a"): yaml.YAML_DELETE}, id="delete-block"),
+        pytest.param({("version",): "1.0"}, id="add"),
+    ],
+)
+def test_safe_yaml_patch_crlf(changes):
+    text = PATCH_DOCUMENT.replace("\n", "\r\n")
+
+    patched = yaml.safe_yaml_patch(text, changes)
+
+    assert patched == yaml.safe_yaml_patch(PATCH_DOCUMENT, changes).replace(
+        "\n", "\r\n"
+    )
+
+
+@pytest.mark.parametrize(
+    ("changes", "match"),
+    [
+        ({("base",): "core24"}, "Can't change base: its value has an anchor"),
+        (
+            {("build-base",): "core24"},
+            "Can't change build-base: its value is an alias",
+        ),
+        ({("name", "first"): "x"}, "Can't change name.first: name is not a mapping"),
+        ({(): "x"}, r"Invalid path for a YAML change: \(\)"),
+        ({("parts", 0): "x"}, "Invalid path for a YAML change"),
+        (
+            {("parts",): {"c": {}}, ("parts", "a"): {}},
+            "Can't make overlapping changes",
+        ),
+    ],
+)
+def test_safe_yaml_patch_error(changes, match):
+    with pytest.raises(ValueError, match=match):
+        yaml.safe_yaml_patch(PATCH_DOCUMENT, changes)
+
+
+@pytest.mark.parametrize("text", ["", "- a\n"])
+def test_safe_yaml_patch_not_mapping(text):
+    with pytest.raises(TypeError):
+        yaml.safe_yaml_patch(text, {("a",): 1})
+
+
+def test_safe_yaml_patch_merged_key():
+    text = "base: &base {x: 1}\nmerged:\n  <<: *base\n  y: 2\n"
+
+    patched = yaml.safe_yaml_patch(text, {("merged", "x"): 3})
+
+    pytest_check.equal(patched, text + "  x: 3\n")
+    pytest_check.equal(
+        yaml.safe_yaml_load(io.StringIO(patched)),
+        {"base": {"x": 1}, "merged": {"x": 3, "y": 2}},
+    )
+
+
+@pytest.mark.parametrize("content", [billion_laughs(), "a: " + "[" * 200 + "]" * 200])
+def test_safe_yaml_patch_limits(content):
+    with pytest.raises(CraftValidationError, match="YAML document exceeds"):
+        yaml.safe_yaml_patch(content, {("b",): 1})
+
+
+@pytest.mark.parametrize(
+    ("changes", "loaded"),
+    [
+        pytest.param({("name",): "world"}, ["name: world  # The name.\n"], id="scalar"),
+        pytest.param(
+            {("parts", "a", "plugin"): "dump", ("parts", "b", "source"): "src"},
+            [
+                "    plugin: dump  # Nothing.\n",
+                "  b: {plugin: dump, source: src}\n",
+            ],
+            id="nested",
+        ),
+        pytest.param(
+            {("parts", "c"): {"plugin": "nil"}},
+            ["  b: {plugin: dump, source: .}\n  c:\n    plugin: nil\n"],
+            id="add",
+        ),
+    ],
+)
+def test_safe_yaml_patch_loads_changed_entries(mocker, changes, loaded):
+    load_part = mocker.spy(yaml._SafeYamlLoader, "load_part")
+    get_single_data = mocker.spy(yaml._FastSafeYamlLoader, "get_single_data")
+
+    yaml.safe_yaml_patch(PATCH_DOCUMENT, changes)
+
+    assert [call.args[1] for call in load_part.call_args_list] == loaded
+    assert get_single_data.call_count == len(loaded)
+
+
+@pytest.mark.parametrize(
+    ("text", "changes", "expected"),
+    [
+        pytest.param(
+            "base: &b core22\nparts:\n  a: {plugin: nil, base: *b}\n",
+            {("parts", "a", "plugin"): "dump"},
+            "base: &b core22\nparts:\n  a: {plugin: dump, base: *b}\n",
+            id="outside-alias",
+        ),
+        pytest.param(
+            "a:\n  x: 1\nb: 2\n",
+            {("a", "y"): {"z": [1, 2]}},
+            "a:\n  x: 1\n  y:\n    z:\n    - 1\n    - 2\nb: 2\n",
+            id="inside-mapping",
+        ),
+    ],
+)
+def test_safe_yaml_patch_changed_entries_same_as_document(text, changes, expected):
+    patched = yaml.safe_yaml_patch(text, changes)
+
+    pytest_check.equal(patched, expected)
+    pytest_check.equal(
+        yaml.safe_yaml_load(io.StringIO(patched)),
+        yaml.safe_yaml_load(io.StringIO(expected)),
+    )
+
+
+def test_safe_yaml_patch_merged_key_removed():
+    text = "base: &base {x: 1}\nmerged:\n  <<: *base\n  x: 2\n"
+
+    with pytest.raises(ValueError, match="without changing other values"):
+        yaml.safe_yaml_patch(text, {("merged", "x"): yaml.YAML_DELETE})
+
+
+def test_safe_yaml_patch_limits_changed_entries():
+    limits = yaml.YamlLimits(max_nodes=3)
+
+    with pytest.raises(CraftValidationError, match="maximum number of nodes"):
+        yaml.safe_yaml_patch("a: 1\n", {("b",): [1, 2, 3]}, limits=limits)